@@ -33,11 +33,14 @@ async def cmd_start(
     await message.answer(text)
 
     if message.from_user is not None:
+        # Reaching /start means the user (again) accepts messages from the bot.
+        await repos.unblock_user(user_id=message.from_user.id)
         await repos.log_message(
             user_id=message.from_user.id,
             direction="out",
             msg_type="text",
             text=text,
+            template=True,
         )
 
 
@@ -57,6 +60,7 @@ async def cmd_help(message: Message, repos: Repositories) -> None:
             direction="out",
             msg_type="text",
             text=text,
+            template=True,
         )
 
 
@@ -79,6 +83,7 @@ async def cmd_cancel(
                 direction="out",
                 msg_type="text",
                 text=text,
+                template=True,
             )
         return
 
@@ -91,6 +96,7 @@ async def cmd_cancel(
             direction="out",
             msg_type="text",
             text=text,
+            template=True,
         )
 
 
@@ -1,10 +1,28 @@
+import asyncio
 import logging
+from pathlib import Path
 
+from aiogram import F
 from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.filters import Command
 from aiogram.types import CallbackQuery
+from aiogram.types import InlineKeyboardButton
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.types import Message
 
+from services.broadcaster import Broadcaster
+from services.broadcaster import format_delivery_counts
+from services.faq_service import FaqService
+from services.job_runner import JobRunner
+from services.outbound_limiter import OutboundLimiter
+from services.overload import OverloadController
+from services.practice_queue import PracticeQueue
+from services.practice_service import PracticeService
+from services.practice_service import PracticeServiceError
+from services.prompt_voices import PromptVoiceCache
+from storage.repositories import DailyStats
 from storage.repositories import Repositories
 from utils.config import Settings
 
@@ -14,6 +32,13 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 CB_CLOSE_PREFIX = "close_ticket:"
+CB_BROADCAST_SEND = "broadcast_send:"
+CB_BROADCAST_DROP = "broadcast_drop:"
+
+# Telegram's limit for a text message.
+MAX_BROADCAST_LEN = 4096
+
+STATS_DAYS = 7
 
 
 def _parse_close_ticket_id(text: str) -> int | None:
@@ -51,25 +76,292 @@ async def cmd_close(
         await message.answer("Использование: /close <ticket_id>")
         return
 
-    ok = await repos.close_ticket(ticket_id=ticket_id)
-    if not ok:
+    user_id = await repos.close_ticket(ticket_id=ticket_id)
+    if user_id is None:
         await message.answer(f"Не нашёл тикет #{ticket_id}.")
         return
 
-    user_id = await repos.get_ticket_user_id(ticket_id=ticket_id)
-    if user_id is not None:
-        await message.bot.send_message(
-            user_id,
-            f"Тикет #{ticket_id} закрыт оператором. Если нужна помощь — /support.",
+    await message.bot.send_message(
+        user_id,
+        f"Тикет #{ticket_id} закрыт оператором. Если нужна помощь — /support.",
+    )
+    await repos.log_message(
+        user_id=user_id,
+        direction="out",
+        msg_type="text",
+        text=f"ticket_closed:{ticket_id}",
+    )
+
+    await message.answer(f"Ок. Тикет #{ticket_id} закрыт.")
+
+
+def _format_stats_block(title: str, days: list[DailyStats]) -> str:
+    messages: dict[tuple[str, str], int] = {}
+    for day in days:
+        for key, count in day.messages.items():
+            messages[key] = messages.get(key, 0) + count
+
+    attempts = sum(d.practice_attempts for d in days)
+    score_sum = sum(d.practice_score_sum for d in days)
+    faq_queries = sum(d.faq_queries for d in days)
+    faq_hits = sum(d.faq_hits for d in days)
+
+    lines = [title]
+    for (direction, msg_type), count in sorted(messages.items()):
+        lines.append(f"  {direction}/{msg_type}: {count}")
+    avg_score = f"{score_sum / attempts:.2f}" if attempts else "-"
+    lines.append(f"  practice: {attempts} попыток, средний score {avg_score}")
+    lines.append(
+        f"  тикеты: открыто {sum(d.tickets_opened for d in days)}, "
+        f"закрыто {sum(d.tickets_closed for d in days)}"
+    )
+    hit_rate = f"{faq_hits / faq_queries:.0%}" if faq_queries else "-"
+    lines.append(f"  FAQ: {faq_queries} вопросов, попаданий {hit_rate}")
+    return "\n".join(lines)
+
+
+@router.message(Command("stats"))
+async def cmd_stats(
+    message: Message,
+    repos: Repositories,
+    faq_service: FaqService,
+    practice_queue: PracticeQueue,
+    job_runner: JobRunner,
+    outbound_limiter: OutboundLimiter,
+    overload: OverloadController,
+    settings: Settings,
+    worker_index: int | None = None,
+) -> None:
+    if message.from_user is None or message.from_user.id != settings.operator_id:
+        return
+
+    days = await repos.get_daily_stats(days=STATS_DAYS)
+    # Everything below the DB aggregates lives in this process only; under
+    # supervisor.py that is the worker serving the operator.
+    if worker_index is None:
+        counters_title = "С запуска:"
+    else:
+        counters_title = (
+            f"С запуска, только воркер {worker_index + 1} из {settings.bot_workers} "
+            "(остальные не учтены):"
         )
-        await repos.log_message(
-            user_id=user_id,
-            direction="out",
-            msg_type="text",
-            text=f"ticket_closed:{ticket_id}",
+    text = (
+        _format_stats_block(f"Сегодня ({days[0].day}):", days[:1])
+        + "\n\n"
+        + _format_stats_block(f"За {STATS_DAYS} дней:", days)
+        + "\n\n"
+        + f"{counters_title}\n"
+        f"Кэш FAQ: попаданий {faq_service.answer_cache_hits}, "
+        f"промахов {faq_service.answer_cache_misses}\n"
+        f"Ответы Practice: обработано {practice_queue.processed}, "
+        f"вытеснено новыми {practice_queue.superseded}, "
+        f"отменено {practice_queue.cancelled}\n"
+        f"Фоновые задачи: в очереди {job_runner.depth}, "
+        f"выполнено {job_runner.completed}, ошибок {job_runner.failed}, "
+        f"повторов {job_runner.retried}\n"
+        f"Исходящие: отправлено {outbound_limiter.sent}, ждут {outbound_limiter.waiting}, "
+        f"flood-повторов {outbound_limiter.retried}, отказов {outbound_limiter.failed}\n"
+        f"Нагрузка распознавания: уровень {overload.level}/3, "
+        f"очередь {overload.practice_queue.depth}, "
+        f"время {overload.latency_ewma_ms:.0f} мс; принято {overload.admitted}, "
+        f"отклонено {overload.rejected}, лёгкая модель {overload.light_model}, "
+        f"обрезано {overload.clipped}"
+    )
+    await message.answer(text, parse_mode=None)
+
+
+@router.message(Command("warm_prompts"))
+async def cmd_warm_prompts(
+    message: Message,
+    practice_service: PracticeService,
+    prompt_voices: PromptVoiceCache,
+    settings: Settings,
+) -> None:
+    """
+    Upload every practice prompt not yet cached to this chat, so users get
+    them by file_id from the first send. Uploaded messages are deleted.
+    """
+    if message.from_user is None or message.from_user.id != settings.operator_id:
+        return
+
+    uploaded = cached = missing = 0
+    try:
+        # Walks every shard of a sharded catalog; the LRU keeps memory bounded.
+        for phrase in practice_service.catalog():
+            if not Path(phrase.file_path).exists():
+                missing += 1
+                continue
+            if prompt_voices.is_uploaded(phrase):
+                cached += 1
+                continue
+
+            while True:
+                try:
+                    sent = await prompt_voices.send(
+                        bot=message.bot,
+                        chat_id=message.chat.id,
+                        phrase=phrase,
+                    )
+                    break
+                except TelegramRetryAfter as exc:
+                    await asyncio.sleep(exc.retry_after)
+            uploaded += 1
+            try:
+                await sent.delete()
+            except TelegramBadRequest:
+                pass
+    except PracticeServiceError:
+        logger.exception("Failed to load practice sets")
+        await message.answer("Не удалось загрузить набор фраз для практики.")
+        return
+
+    await message.answer(
+        f"Voice prompts: загружено {uploaded}, уже в кэше {cached}, "
+        f"нет файла {missing}.",
+        parse_mode=None,
+    )
+
+
+def _broadcast_keyboard(broadcast_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="Отправить всем",
+                    callback_data=f"{CB_BROADCAST_SEND}{broadcast_id}",
+                ),
+                InlineKeyboardButton(
+                    text="Отмена",
+                    callback_data=f"{CB_BROADCAST_DROP}{broadcast_id}",
+                ),
+            ]
+        ]
+    )
+
+
+@router.message(Command("broadcast"))
+async def cmd_broadcast(
+    message: Message,
+    repos: Repositories,
+    settings: Settings,
+) -> None:
+    if message.from_user is None or message.from_user.id != settings.operator_id:
+        return
+
+    parts = (message.text or "").split(maxsplit=1)
+    text = parts[1].strip() if len(parts) == 2 else ""
+    if not text:
+        await message.answer(
+            "Формат: /broadcast текст сообщения\n"
+            "Бот покажет черновик и спросит подтверждение.",
+            parse_mode=None,
+        )
+        return
+    if len(text) > MAX_BROADCAST_LEN:
+        await message.answer(
+            f"Слишком длинный текст: {len(text)} символов, максимум {MAX_BROADCAST_LEN}.",
+            parse_mode=None,
         )
+        return
 
-    await message.answer(f"Ок. Тикет #{ticket_id} закрыт.")
+    broadcast_id = await repos.create_broadcast(text=text)
+    recipients = await repos.count_broadcast_recipients()
+    await message.answer(
+        f"Черновик рассылки #{broadcast_id}, получателей: {recipients}.\n\n{text}",
+        parse_mode=None,
+        reply_markup=_broadcast_keyboard(broadcast_id),
+    )
+
+
+@router.message(Command("broadcast_status"))
+async def cmd_broadcast_status(
+    message: Message,
+    repos: Repositories,
+    broadcaster: Broadcaster,
+    settings: Settings,
+) -> None:
+    if message.from_user is None or message.from_user.id != settings.operator_id:
+        return
+
+    broadcast = await repos.get_latest_broadcast()
+    if broadcast is None:
+        await message.answer("Рассылок ещё не было.")
+        return
+    counts = await repos.get_delivery_counts(broadcast_id=broadcast.id)
+    state = "идёт" if broadcaster.active_id == broadcast.id else broadcast.status
+    await message.answer(
+        f"Рассылка #{broadcast.id} ({state}): {format_delivery_counts(counts)}",
+        parse_mode=None,
+    )
+
+
+@router.message(Command("broadcast_cancel"))
+async def cmd_broadcast_cancel(
+    message: Message,
+    broadcaster: Broadcaster,
+    settings: Settings,
+) -> None:
+    if message.from_user is None or message.from_user.id != settings.operator_id:
+        return
+
+    broadcast_id = broadcaster.cancel()
+    if broadcast_id is None:
+        await message.answer("Сейчас рассылка не идёт.")
+        return
+    await message.answer(
+        f"Останавливаю рассылку #{broadcast_id}, итог придёт отдельным сообщением."
+    )
+
+
+@router.callback_query(
+    F.data.startswith(CB_BROADCAST_SEND) | F.data.startswith(CB_BROADCAST_DROP)
+)
+async def on_broadcast_callback(
+    callback: CallbackQuery,
+    repos: Repositories,
+    broadcaster: Broadcaster,
+    settings: Settings,
+) -> None:
+    if callback.from_user.id != settings.operator_id:
+        await callback.answer("Недостаточно прав.", show_alert=True)
+        return
+
+    data = callback.data or ""
+    send = data.startswith(CB_BROADCAST_SEND)
+    try:
+        broadcast_id = int(data.split(":", 1)[1])
+    except ValueError:
+        await callback.answer()
+        return
+
+    if not send:
+        dropped = await repos.set_broadcast_status(
+            broadcast_id=broadcast_id,
+            status="cancelled",
+            from_status="draft",
+        )
+        await callback.answer("Черновик удалён." if dropped else "Рассылка уже не черновик.")
+    elif broadcaster.active_id is not None:
+        await callback.answer(
+            f"Уже идёт рассылка #{broadcaster.active_id}, дождитесь её окончания.",
+            show_alert=True,
+        )
+        return
+    elif not await repos.set_broadcast_status(
+        broadcast_id=broadcast_id,
+        status="running",
+        from_status="draft",
+    ):
+        await callback.answer("Эта рассылка уже запущена или отменена.", show_alert=True)
+    else:
+        broadcaster.start(bot=callback.bot, broadcast_id=broadcast_id)
+        await callback.answer(f"Рассылка #{broadcast_id} запущена.")
+
+    if callback.message is not None:
+        try:
+            await callback.message.edit_reply_markup(reply_markup=None)
+        except Exception:
+            logger.exception("Failed to edit broadcast draft markup")
 
 
 @router.callback_query()
@@ -87,24 +379,22 @@ async def on_operator_callback(
         await callback.answer()
         return
 
-    ok = await repos.close_ticket(ticket_id=ticket_id)
-    if not ok:
+    user_id = await repos.close_ticket(ticket_id=ticket_id)
+    if user_id is None:
         await callback.answer("Тикет не найден.", show_alert=True)
         return
 
-    user_id = await repos.get_ticket_user_id(ticket_id=ticket_id)
-    if user_id is not None:
-        await callback.bot.send_message(
-            user_id,
-            f"Тикет #{ticket_id} закрыт оператором. Если нужна помощь — /support.",
-            parse_mode=None,
-        )
-        await repos.log_message(
-            user_id=user_id,
-            direction="out",
-            msg_type="text",
-            text=f"ticket_closed:{ticket_id}",
-        )
+    await callback.bot.send_message(
+        user_id,
+        f"Тикет #{ticket_id} закрыт оператором. Если нужна помощь — /support.",
+        parse_mode=None,
+    )
+    await repos.log_message(
+        user_id=user_id,
+        direction="out",
+        msg_type="text",
+        text=f"ticket_closed:{ticket_id}",
+    )
 
     await callback.answer(f"Тикет #{ticket_id} закрыт.")
     if callback.message is not None:
@@ -1,25 +1,37 @@
+import asyncio
 import logging
+import time
 from pathlib import Path
+from typing import Any
 
 from aiogram import Router
+from aiogram.enums import ChatAction
+from aiogram.exceptions import TelegramAPIError
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import KeyboardButton
 from aiogram.types import Message
 from aiogram.types import ReplyKeyboardMarkup
 from aiogram.types import ReplyKeyboardRemove
-from aiogram.types.input_file import FSInputFile
+from aiogram.utils.chat_action import ChatActionSender
 
 from handlers.states import Mode
 from services.audio_service import AudioService
 from services.audio_service import AudioServiceError
+from services.job_runner import PRIORITY_HIGH
+from services.job_runner import JobRunner
+from services.overload import OverloadController
+from services.practice_archive import PracticeArchive
+from services.practice_queue import PracticeQueue
+from services.practice_scheduler import PracticeScheduler
+from services.practice_service import AnyPracticeCatalog
 from services.practice_service import PracticePhrase
 from services.practice_service import PracticeService
 from services.practice_service import PracticeServiceError
+from services.prompt_voices import PromptVoiceCache
 from services.speech.base import SpeechRecognizer
 from services.speech.base import SpeechRecognizerError
 from storage.repositories import Repositories
-from utils.config import Settings
 
 
 logger = logging.getLogger(__name__)
@@ -30,6 +42,13 @@ BTN_NEXT = "Следующая"
 BTN_REPEAT = "Повтор"
 BTN_EXIT = "Выход"
 
+MSG_LOAD_FAILED = "Не удалось загрузить набор фраз для практики."
+MSG_EMPTY = "Набор фраз пуст. Проверьте assets/practice_sets.json."
+MSG_OVERLOADED = (
+    "Сейчас очень много ответов, я не успеваю их проверить. "
+    "Пожалуйста, отправьте голосовое ещё раз через минуту."
+)
+
 
 def _practice_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
@@ -43,15 +62,40 @@ def _practice_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+def _record_stage(timings_ms: dict[str, int], stage: str, started: float) -> float:
+    now = time.perf_counter()
+    timings_ms[stage] = int((now - started) * 1000)
+    return now
+
+
+def _current_phrase(
+    catalog: AnyPracticeCatalog,
+    data: dict[str, Any],
+) -> PracticePhrase:
+    """
+    Phrase the user is on: by stored id, else by the position older
+    sessions stored in practice_idx.
+    """
+    phrase = catalog.get(str(data.get("practice_phrase_id", "")))
+    if phrase is None:
+        phrase = catalog.at(int(data.get("practice_idx", 0)))
+    return phrase
+
+
 async def _send_practice_prompt(
     message: Message,
     *,
     repos: Repositories,
+    prompt_voices: PromptVoiceCache,
     phrase: PracticePhrase,
 ) -> None:
     voice_path = Path(phrase.file_path)
     if voice_path.exists():
-        await message.answer_voice(FSInputFile(str(voice_path)))
+        await prompt_voices.send(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            phrase=phrase,
+        )
         await repos.log_message(
             user_id=message.from_user.id,  # type: ignore[union-attr]
             direction="out",
@@ -75,28 +119,168 @@ async def _send_practice_prompt(
     )
 
 
+async def _process_voice(
+    message: Message,
+    *,
+    phrase: PracticePhrase,
+    repos: Repositories,
+    audio_service: AudioService,
+    speech_recognizer: SpeechRecognizer,
+    practice_service: PracticeService,
+    practice_scheduler: PracticeScheduler,
+    practice_archive: PracticeArchive,
+    job_runner: JobRunner,
+    overload: OverloadController,
+) -> None:
+    """
+    Download, transcribe and score one voice answer, then queue the feedback.
+
+    Runs as a background job in the user's PracticeQueue lane and may be
+    cancelled between stages when the user moves to another phrase; temp
+    files are removed either way.
+    """
+    assert message.from_user is not None and message.voice is not None
+    user_id = message.from_user.id
+    voice = message.voice
+
+    source_path = ""
+    wav_path = ""
+    timings_ms: dict[str, int] = {}
+    try:
+        async with ChatActionSender.typing(bot=message.bot, chat_id=message.chat.id):
+            started = time.perf_counter()
+            source_path = await audio_service.download_voice(
+                bot=message.bot,
+                file_id=voice.file_id,
+            )
+            started = _record_stage(timings_ms, "download", started)
+            # Under load: a smaller model, then clipped audio (see OverloadController).
+            # ffmpeg blocks, so it runs in a thread to keep updates flowing.
+            wav_path = await asyncio.to_thread(
+                audio_service.convert_to_wav,
+                source_path=source_path,
+                max_seconds=overload.max_seconds(voice.duration),
+            )
+            started = _record_stage(timings_ms, "convert", started)
+            recognizer = overload.pick_recognizer(speech_recognizer)
+            result = await recognizer.transcribe(wav_path=wav_path)
+            started = _record_stage(timings_ms, "transcribe", started)
+            overload.record_latency(timings_ms["transcribe"])
+
+            score = practice_service.score_phrase(
+                transcript=result.text,
+                phrase=phrase,
+            )
+            _record_stage(timings_ms, "score", started)
+
+        attempt_id = await repos.record_practice_attempt(
+            user_id=user_id,
+            phrase_id=phrase.phrase_id,
+            score=score.score,
+            found_keywords=score.found_keywords,
+            missing_keywords=score.missing_keywords,
+            transcript=result.text,
+            audio_duration_s=voice.duration,
+            timings_ms=timings_ms,
+        )
+        await practice_archive.store(attempt_id=attempt_id, source_path=source_path)
+        await practice_scheduler.record_result(
+            user_id=user_id,
+            phrase_id=phrase.phrase_id,
+            score=score.score,
+        )
+
+        hint = ""
+        if score.missing_keywords:
+            hint = " Подсказка (ключевые слова): " + ", ".join(score.missing_keywords[:6])
+
+        if score.score >= 0.8:
+            feedback = "Правильно! Отлично."
+        elif score.score >= 0.5:
+            feedback = "Почти! Попробуйте ещё раз."
+        else:
+            feedback = "Давайте повторим. Попробуйте сказать фразу точнее."
+
+        # Sent as its own job: a Telegram error here is retried without
+        # transcribing the answer again.
+        text = feedback + hint
+        job_runner.submit(
+            lambda: _answer(message, text, reply_markup=_practice_keyboard()),
+            priority=PRIORITY_HIGH,
+            name="practice_feedback",
+        )
+    except (AudioServiceError, SpeechRecognizerError) as exc:
+        logger.exception("Practice pipeline error")
+        job_runner.submit(
+            lambda: _answer(
+                message,
+                "Не удалось обработать голосовое сообщение. "
+                "Проверьте настройку ffmpeg и распознавания.",
+            ),
+            priority=PRIORITY_HIGH,
+            name="practice_error",
+        )
+        await repos.log_message(
+            user_id=user_id,
+            direction="error",
+            msg_type="text",
+            text=str(exc),
+        )
+    finally:
+        for path in (source_path, wav_path):
+            if not path:
+                continue
+            try:
+                Path(path).unlink(missing_ok=True)
+            except OSError:
+                logger.warning("Failed to delete temp file: %s", path)
+
+
+async def _answer(
+    message: Message,
+    text: str,
+    reply_markup: ReplyKeyboardMarkup | None = None,
+) -> None:
+    await message.answer(text, reply_markup=reply_markup)
+
+
 @router.message(Command("practice"))
 async def cmd_practice(
     message: Message,
     state: FSMContext,
     repos: Repositories,
-    settings: Settings,
+    practice_service: PracticeService,
+    practice_scheduler: PracticeScheduler,
+    practice_queue: PracticeQueue,
+    prompt_voices: PromptVoiceCache,
 ) -> None:
+    if message.from_user is None:
+        await message.answer("Не удалось определить пользователя.")
+        return
+
+    practice_queue.cancel(message.from_user.id)
     await state.set_state(Mode.practice_wait_answer)
 
-    service = PracticeService(practice_sets_path=settings.practice_sets_path)
     try:
-        phrases = service.load_phrases()
+        catalog = practice_service.catalog()
+        phrase = (
+            await practice_scheduler.next_phrase(
+                user_id=message.from_user.id,
+                catalog=catalog,
+            )
+            if len(catalog)
+            else None
+        )
     except PracticeServiceError:
         logger.exception("Failed to load practice sets")
-        await message.answer("Не удалось загрузить набор фраз для практики.")
+        await message.answer(MSG_LOAD_FAILED)
         return
 
-    if not phrases:
-        await message.answer("Набор фраз пуст. Проверьте assets/practice_sets.json.")
+    if phrase is None:
+        await message.answer(MSG_EMPTY)
         return
 
-    await state.update_data(practice_idx=0)
+    await state.update_data(practice_phrase_id=phrase.phrase_id)
 
     await message.answer(
         "Режим Practice включён.\n\n"
@@ -104,7 +288,12 @@ async def cmd_practice(
         "Распознанный текст я не показываю — только итоговый фидбек.",
         reply_markup=_practice_keyboard(),
     )
-    await _send_practice_prompt(message, repos=repos, phrase=phrases[0])
+    await _send_practice_prompt(
+        message,
+        repos=repos,
+        prompt_voices=prompt_voices,
+        phrase=phrase,
+    )
 
 
 @router.message(Mode.practice_wait_answer)
@@ -113,7 +302,13 @@ async def on_practice_message(
     repos: Repositories,
     audio_service: AudioService,
     speech_recognizer: SpeechRecognizer,
-    settings: Settings,
+    practice_service: PracticeService,
+    practice_scheduler: PracticeScheduler,
+    practice_archive: PracticeArchive,
+    practice_queue: PracticeQueue,
+    job_runner: JobRunner,
+    overload: OverloadController,
+    prompt_voices: PromptVoiceCache,
     state: FSMContext,
 ) -> None:
     if message.from_user is None:
@@ -121,25 +316,25 @@ async def on_practice_message(
         return
 
     user_id = message.from_user.id
+    data = await state.get_data()
 
-    service = PracticeService(practice_sets_path=settings.practice_sets_path)
     try:
-        phrases = service.load_phrases()
+        catalog = practice_service.catalog()
+        phrase = _current_phrase(catalog, data) if len(catalog) else None
     except PracticeServiceError:
         logger.exception("Failed to load practice sets")
-        await message.answer("Не удалось загрузить набор фраз для практики.")
+        await message.answer(MSG_LOAD_FAILED)
         return
 
-    if not phrases:
-        await message.answer("Набор фраз пуст. Проверьте assets/practice_sets.json.")
+    if phrase is None:
+        await message.answer(MSG_EMPTY)
         return
 
     if message.text:
         action = message.text.strip()
-        data = await state.get_data()
-        idx = int(data.get("practice_idx", 0))
 
         if action == BTN_EXIT:
+            practice_queue.cancel(user_id)
             await state.clear()
             await message.answer(
                 "Ок, выходим из Practice.",
@@ -148,13 +343,34 @@ async def on_practice_message(
             return
 
         if action == BTN_REPEAT:
-            await _send_practice_prompt(message, repos=repos, phrase=phrases[idx])
+            await _send_practice_prompt(
+                message,
+                repos=repos,
+                prompt_voices=prompt_voices,
+                phrase=phrase,
+            )
             return
 
         if action == BTN_NEXT:
-            idx = (idx + 1) % len(phrases)
-            await state.update_data(practice_idx=idx)
-            await _send_practice_prompt(message, repos=repos, phrase=phrases[idx])
+            # Answers to the old phrase no longer matter.
+            practice_queue.cancel(user_id)
+            await practice_scheduler.postpone(user_id=user_id, phrase_id=phrase.phrase_id)
+            try:
+                phrase = await practice_scheduler.next_phrase(
+                    user_id=user_id,
+                    catalog=catalog,
+                )
+            except PracticeServiceError:
+                logger.exception("Failed to load practice sets")
+                await message.answer(MSG_LOAD_FAILED)
+                return
+            await state.update_data(practice_phrase_id=phrase.phrase_id)
+            await _send_practice_prompt(
+                message,
+                repos=repos,
+                prompt_voices=prompt_voices,
+                phrase=phrase,
+            )
             return
 
     if message.voice is None:
@@ -164,58 +380,31 @@ async def on_practice_message(
         )
         return
 
-    data = await state.get_data()
-    idx = int(data.get("practice_idx", 0))
-    phrase = phrases[idx]
+    if not overload.admit():
+        await message.answer(MSG_OVERLOADED)
+        return
 
-    source_path = ""
-    wav_path = ""
+    # Acknowledge right away; the answer is processed in the background.
     try:
-        source_path = await audio_service.download_voice(
-            bot=message.bot,
-            file_id=message.voice.file_id,
-        )
-        wav_path = audio_service.convert_to_wav(source_path=source_path)
-        result = await speech_recognizer.transcribe(wav_path=wav_path)
-
-        await repos.log_message(
-            user_id=user_id,
-            direction="in_transcript",
-            msg_type="text",
-            text=f"practice:{phrase.phrase_id}:{result.text}",
-        )
-
-        score = service.score_keywords(transcript=result.text, keywords=phrase.keywords)
-        hint = ""
-        if score.missing_keywords:
-            hint = " Подсказка (ключевые слова): " + ", ".join(score.missing_keywords[:6])
-
-        if score.score >= 0.8:
-            feedback = "Правильно! Отлично."
-        elif score.score >= 0.5:
-            feedback = "Почти! Попробуйте ещё раз."
-        else:
-            feedback = "Давайте повторим. Попробуйте сказать фразу точнее."
-
-        await message.answer(feedback + hint, reply_markup=_practice_keyboard())
-    except (AudioServiceError, SpeechRecognizerError) as exc:
-        logger.exception("Practice pipeline error")
-        await message.answer(
-            "Не удалось обработать голосовое сообщение. "
-            "Проверьте настройку ffmpeg и распознавания."
+        await message.bot.send_chat_action(
+            chat_id=message.chat.id,
+            action=ChatAction.TYPING,
         )
-        await repos.log_message(
-            user_id=user_id,
-            direction="error",
-            msg_type="text",
-            text=str(exc),
-        )
-    finally:
-        for path in (source_path, wav_path):
-            if not path:
-                continue
-            try:
-                Path(path).unlink(missing_ok=True)
-            except OSError:
-                logger.warning("Failed to delete temp file: %s", path)
-
+    except TelegramAPIError:
+        logger.warning("Failed to send chat action to %s", message.chat.id)
+
+    practice_queue.submit(
+        user_id=user_id,
+        job=lambda: _process_voice(
+            message,
+            phrase=phrase,
+            repos=repos,
+            audio_service=audio_service,
+            speech_recognizer=speech_recognizer,
+            practice_service=practice_service,
+            practice_scheduler=practice_scheduler,
+            practice_archive=practice_archive,
+            job_runner=job_runner,
+            overload=overload,
+        ),
+    )
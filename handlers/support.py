@@ -26,8 +26,6 @@ router = Router()
 BTN_ESCALATE = "Передать оператору"
 BTN_BACK = "Назад"
 
-FAQ_MIN_SCORE = 0.34
-
 
 def _support_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
@@ -67,7 +65,7 @@ async def on_support_question(
     message: Message,
     state: FSMContext,
     repos: Repositories,
-    settings: Settings,
+    faq_service: FaqService,
 ) -> None:
     if message.from_user is None:
         await message.answer("Не удалось определить пользователя.")
@@ -83,9 +81,8 @@ async def on_support_question(
             )
             return
 
-        faq = FaqService(faq_path=settings.faq_path)
         try:
-            match = faq.find_best_answer(query=text)
+            match = await faq_service.find_answer_async(query=text)
         except FaqServiceError:
             logger.exception("FAQ load/search error")
             await message.answer(
@@ -95,7 +92,9 @@ async def on_support_question(
             )
             return
 
-        if match is not None and match.score >= FAQ_MIN_SCORE and match.item.answer:
+        await repos.record_faq_query(hit=match is not None)
+
+        if match is not None:
             await message.answer(match.item.answer, reply_markup=_support_keyboard())
             await repos.log_message(
                 user_id=message.from_user.id,
@@ -1,11 +1,21 @@
 import asyncio
 import logging
+import signal
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any
 
 from aiogram import Bot
 from aiogram import Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
 
 from handlers.common import router as common_router
 from handlers.operator import router as operator_router
@@ -14,11 +24,27 @@ from handlers.support import router as support_router
 from middlewares.db_logging import DbLoggingMiddleware
 from middlewares.services import ServicesMiddleware
 from services.audio_service import AudioService
+from services.broadcaster import Broadcaster
+from services.faq_semantic import build_semantic_index
+from services.faq_service import FaqService
+from services.faq_service import FaqServiceError
+from services.job_runner import JobRunner
+from services.outbound_limiter import OutboundLimiter
+from services.overload import OverloadController
+from services.practice_archive import PracticeArchive
+from services.practice_queue import PracticeQueue
+from services.practice_scheduler import PracticeScheduler
+from services.practice_service import PracticeService
+from services.practice_service import PracticeServiceError
+from services.prompt_voices import PromptVoiceCache
 from services.speech.factory import build_speech_recognizer
 from storage.db import Database
+from storage.fsm_storage import SqliteStorage
 from storage.repositories import Repositories
+from utils.config import Settings
 from utils.config import load_settings
 from utils.logging_config import setup_logging
+from utils.text_norm import configure_stemmer
 
 
 logger = logging.getLogger(__name__)
@@ -26,34 +52,229 @@ logger = logging.getLogger(__name__)
 
 def _setup_dispatcher(
     *,
+    storage: BaseStorage,
     repos: Repositories,
     audio_service: AudioService,
     speech_recognizer,
+    faq_service: FaqService,
+    practice_service: PracticeService,
+    practice_scheduler: PracticeScheduler,
+    practice_archive: PracticeArchive,
+    practice_queue: PracticeQueue,
+    job_runner: JobRunner,
+    outbound_limiter: OutboundLimiter,
+    prompt_voices: PromptVoiceCache,
+    broadcaster: Broadcaster,
+    overload: OverloadController,
     settings,
 ) -> Dispatcher:
-    dp = Dispatcher(storage=MemoryStorage())
+    dp = Dispatcher(storage=storage)
     dp.include_router(common_router)
     dp.include_router(practice_router)
     dp.include_router(support_router)
     dp.include_router(operator_router)
+    services = ServicesMiddleware(
+        settings=settings,
+        repos=repos,
+        audio_service=audio_service,
+        speech_recognizer=speech_recognizer,
+        faq_service=faq_service,
+        practice_service=practice_service,
+        practice_scheduler=practice_scheduler,
+        practice_archive=practice_archive,
+        practice_queue=practice_queue,
+        job_runner=job_runner,
+        outbound_limiter=outbound_limiter,
+        prompt_voices=prompt_voices,
+        broadcaster=broadcaster,
+        overload=overload,
+    )
     dp.message.middleware(DbLoggingMiddleware(repos))
-    dp.message.middleware(
-        ServicesMiddleware(
-            settings=settings,
-            audio_service=audio_service,
-            speech_recognizer=speech_recognizer,
+    dp.message.middleware(services)
+    dp.callback_query.middleware(services)
+    return dp
+
+
+class _DrainingRequestHandler(SimpleRequestHandler):
+    """
+    Webhook handler that acknowledges each update at once and handles it in
+    a task it keeps track of, so shutdown can wait for those tasks.
+    """
+
+    def __init__(self, *, dispatcher: Dispatcher, bot: Bot, secret_token: str) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, secret_token=secret_token)
+        self._in_flight: set[asyncio.Task[None]] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not self.verify_secret(secret, bot):
+            return web.Response(body="Unauthorized", status=401)
+
+        update = await request.json(loads=bot.session.json_loads)
+        task = asyncio.create_task(self._feed_update(bot, update))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        result = await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+        if isinstance(result, TelegramMethod):
+            await self.dispatcher.silent_call_request(bot=bot, result=result)
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Wait up to `timeout` seconds for updates already acknowledged.
+        """
+        if self._in_flight:
+            await asyncio.wait(set(self._in_flight), timeout=timeout)
+
+
+async def _run_webhook(
+    *,
+    bot: Bot,
+    dp: Dispatcher,
+    job_runner: JobRunner,
+    settings: Settings,
+) -> None:
+    """
+    Serve Telegram updates over HTTP until SIGINT/SIGTERM.
+
+    Updates are acknowledged at once and handled in background tasks. The
+    webhook is registered with Telegram only when WEBHOOK_BASE_URL is set;
+    otherwise (load balancer, local load tests) it is managed externally.
+    """
+    app = web.Application()
+    handler = _DrainingRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.webhook_secret,
+    )
+    handler.register(app, path=settings.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webhook_host, port=settings.webhook_port)
+    await site.start()
+
+    if settings.webhook_base_url:
+        await bot.set_webhook(
+            url=settings.webhook_base_url.rstrip("/") + settings.webhook_path,
+            secret_token=settings.webhook_secret,
+            allowed_updates=dp.resolve_used_update_types(),
         )
+    logger.info(
+        "Bot started (webhook on %s:%s%s).",
+        settings.webhook_host,
+        settings.webhook_port,
+        settings.webhook_path,
     )
-    return dp
+    # Like start_polling: stop on SIGINT/SIGTERM where the loop supports it.
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+        logger.info("Stop signal received. Stopping bot...")
+    finally:
+        # Stop taking updates, let queued answers go out, then shut down the
+        # app (which also closes the bot session).
+        await site.stop()
+        # Updates already acknowledged are still being handled.
+        await handler.drain(settings.job_drain_timeout_seconds)
+        await job_runner.close()
+        await runner.cleanup()
 
 
-async def main() -> None:
-    settings = load_settings()
-    setup_logging(log_level=settings.log_level)
+@dataclass(slots=True)
+class BotApp:
+    """
+    A wired bot: dispatcher with routers, middlewares and their services.
+    """
+
+    bot: Bot
+    dp: Dispatcher
+    job_runner: JobRunner
+    broadcaster: Broadcaster
+    fsm_storage: SqliteStorage
+    db: Database
+
+    async def close(self) -> None:
+        # Updates have stopped: finish queued answers while the session is open.
+        await self.broadcaster.close()
+        await self.job_runner.close()
+        await self.bot.session.close()
+        await self.fsm_storage.close()
+        await self.db.close()
+
+
+def _build_outbound_limiter(
+    settings: Settings,
+    *,
+    workers: int = 1,
+    bulk_rate: float | None = None,
+) -> OutboundLimiter:
+    return OutboundLimiter(
+        global_rate=settings.outbound_global_rate,
+        chat_rate=settings.outbound_chat_rate,
+        group_rate_per_min=settings.outbound_group_rate_per_min,
+        max_retries=settings.outbound_max_retries,
+        operator_chat_id=settings.operator_id,
+        operator_share=1.0 / max(workers, 1),
+        bulk_rate=bulk_rate,
+    )
+
+
+def build_bot(settings: Settings, *, limiter: OutboundLimiter | None = None) -> Bot:
+    session = (
+        AiohttpSession(api=TelegramAPIServer.from_base(settings.telegram_api_base))
+        if settings.telegram_api_base
+        else None
+    )
+    bot = Bot(
+        token=settings.bot_token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    if limiter is not None:
+        bot.session.middleware(limiter)
+    return bot
+
 
-    db = Database(db_path=settings.db_path)
-    await db.init()
+async def build_app(
+    settings: Settings,
+    *,
+    shared_db: bool = False,
+    broadcast_rate: float | None = None,
+) -> BotApp:
+    """
+    Open the database and build every service and the dispatcher.
+
+    With `shared_db` several processes use the database (see supervisor.py):
+    it is opened in WAL mode, migrations are left to the supervisor and the
+    in-memory ticket indexes are not used, since another process may change
+    tickets behind them. Each of the `BOT_WORKERS` processes then gets its
+    share of the operator chat's send rate. `broadcast_rate` gives broadcasts
+    their own send rate instead of the lowest priority of the global one.
+    """
+    db = Database(db_path=settings.db_path, wal=shared_db)
     repos = Repositories(db=db)
+    if shared_db:
+        await db.connect()
+    else:
+        await db.init()
+        await repos.load_indexes()
+
+    fsm_storage = SqliteStorage(
+        db=db,
+        max_entries=settings.fsm_cache_size,
+        idle_ttl=settings.fsm_idle_ttl_seconds,
+        flush_interval=settings.fsm_flush_interval_seconds,
+    )
+    await fsm_storage.start()
 
     audio_service = AudioService(ffmpeg_path=settings.ffmpeg_path)
     speech_recognizer = build_speech_recognizer(
@@ -61,25 +282,135 @@ async def main() -> None:
         whisper_model=settings.whisper_model,
     )
 
-    bot = Bot(
-        token=settings.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    faq_service = FaqService(
+        faq_path=settings.faq_path,
+        ranker=settings.faq_ranker,
+        compiled_path=settings.faq_compiled_path,
+        semantic=build_semantic_index(
+            index_path=settings.faq_semantic_index,
+            model_name=settings.faq_semantic_model,
+        ),
+        semantic_min_similarity=settings.faq_semantic_min_similarity,
+        answer_cache_size=settings.faq_answer_cache_size,
+    )
+    try:
+        faq_service.warm_up()
+    except FaqServiceError:
+        logger.exception("FAQ is not available at startup: %s", settings.faq_path)
+
+    practice_service = PracticeService(
+        practice_sets_path=settings.practice_sets_path,
+        max_loaded_shards=settings.practice_shard_cache_size,
+        scorer=settings.practice_scorer,
+    )
+    try:
+        practice_service.catalog()
+    except PracticeServiceError:
+        logger.exception(
+            "Practice sets are not available at startup: %s",
+            settings.practice_sets_path,
+        )
+
+    practice_scheduler = PracticeScheduler(
+        repos=repos,
+        max_users=settings.practice_scheduler_cache_users,
+    )
+    practice_archive = PracticeArchive(
+        repos=repos,
+        archive_dir=settings.practice_archive_dir,
+        max_bytes=settings.practice_archive_max_mb * 1024 * 1024,
+    )
+    prompt_voices = PromptVoiceCache(repos=repos)
+    await prompt_voices.load()
+
+    job_runner = JobRunner(
+        workers=settings.job_workers,
+        max_attempts=settings.job_max_attempts,
+        drain_timeout=settings.job_drain_timeout_seconds,
+    )
+    job_runner.start()
+    practice_queue = PracticeQueue(runner=job_runner)
+    light_model = settings.overload_whisper_model
+    overload = OverloadController(
+        practice_queue=practice_queue,
+        queue_depth=settings.overload_queue_depth,
+        latency_ms=settings.overload_latency_ms,
+        light_recognizer=(
+            build_speech_recognizer(
+                provider=settings.speech_provider,
+                whisper_model=light_model,
+            )
+            if light_model and light_model != settings.whisper_model
+            else None
+        ),
+        max_voice_seconds=settings.overload_max_voice_seconds,
+    )
+    await overload.load_light_model()
+    outbound_limiter = _build_outbound_limiter(
+        settings,
+        workers=settings.bot_workers if shared_db else 1,
+        bulk_rate=broadcast_rate,
+    )
+    broadcaster = Broadcaster(
+        repos=repos,
+        operator_chat_id=settings.operator_id,
+        concurrency=settings.broadcast_concurrency,
+        page_size=settings.broadcast_page_size,
+        drain_timeout=settings.job_drain_timeout_seconds,
     )
+
     dp = _setup_dispatcher(
+        storage=fsm_storage,
         repos=repos,
         audio_service=audio_service,
         speech_recognizer=speech_recognizer,
+        faq_service=faq_service,
+        practice_service=practice_service,
+        practice_scheduler=practice_scheduler,
+        practice_archive=practice_archive,
+        practice_queue=practice_queue,
+        job_runner=job_runner,
+        outbound_limiter=outbound_limiter,
+        prompt_voices=prompt_voices,
+        broadcaster=broadcaster,
+        overload=overload,
         settings=settings,
     )
+    return BotApp(
+        bot=build_bot(settings, limiter=outbound_limiter),
+        dp=dp,
+        job_runner=job_runner,
+        broadcaster=broadcaster,
+        fsm_storage=fsm_storage,
+        db=db,
+    )
+
+
+async def main() -> None:
+    settings = load_settings()
+    setup_logging(log_level=settings.log_level)
+    configure_stemmer(
+        name=settings.text_stemmer,
+        cache_size=settings.text_stemmer_cache_size,
+    )
 
-    logger.info("Bot started (polling).")
+    app = await build_app(settings)
+    await app.broadcaster.resume(bot=app.bot)
     try:
-        await dp.start_polling(bot)
+        if settings.bot_mode == "webhook":
+            await _run_webhook(
+                bot=app.bot,
+                dp=app.dp,
+                job_runner=app.job_runner,
+                settings=settings,
+            )
+        else:
+            logger.info("Bot started (polling).")
+            await app.dp.start_polling(app.bot)
     except (asyncio.CancelledError, KeyboardInterrupt):
         logger.info("Stop signal received. Stopping bot...")
     finally:
-        await bot.session.close()
-        await db.close()
+        await app.close()
         logger.info("Bot stopped.")
 
 
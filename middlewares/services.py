@@ -5,10 +5,21 @@ from typing import Awaitable
 from typing import Callable
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message
+from aiogram.types import TelegramObject
 
 from services.audio_service import AudioService
+from services.broadcaster import Broadcaster
+from services.faq_service import FaqService
+from services.job_runner import JobRunner
+from services.outbound_limiter import OutboundLimiter
+from services.overload import OverloadController
+from services.practice_archive import PracticeArchive
+from services.practice_queue import PracticeQueue
+from services.practice_scheduler import PracticeScheduler
+from services.practice_service import PracticeService
+from services.prompt_voices import PromptVoiceCache
 from services.speech.base import SpeechRecognizer
+from storage.repositories import Repositories
 from utils.config import Settings
 
 
@@ -17,22 +28,55 @@ class ServicesMiddleware(BaseMiddleware):
         self,
         *,
         settings: Settings,
+        repos: Repositories,
         audio_service: AudioService,
         speech_recognizer: SpeechRecognizer,
+        faq_service: FaqService,
+        practice_service: PracticeService,
+        practice_scheduler: PracticeScheduler,
+        practice_archive: PracticeArchive,
+        practice_queue: PracticeQueue,
+        job_runner: JobRunner,
+        outbound_limiter: OutboundLimiter,
+        prompt_voices: PromptVoiceCache,
+        broadcaster: Broadcaster,
+        overload: OverloadController,
     ) -> None:
         super().__init__()
         self._settings = settings
+        self._repos = repos
         self._audio_service = audio_service
         self._speech_recognizer = speech_recognizer
+        self._faq_service = faq_service
+        self._practice_service = practice_service
+        self._practice_scheduler = practice_scheduler
+        self._practice_archive = practice_archive
+        self._practice_queue = practice_queue
+        self._job_runner = job_runner
+        self._outbound_limiter = outbound_limiter
+        self._prompt_voices = prompt_voices
+        self._broadcaster = broadcaster
+        self._overload = overload
 
     async def __call__(
         self,
-        handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
-        event: Message,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
         data: dict[str, Any],
     ) -> Any:
         data["settings"] = self._settings
+        data["repos"] = self._repos
         data["audio_service"] = self._audio_service
         data["speech_recognizer"] = self._speech_recognizer
+        data["faq_service"] = self._faq_service
+        data["practice_service"] = self._practice_service
+        data["practice_scheduler"] = self._practice_scheduler
+        data["practice_archive"] = self._practice_archive
+        data["practice_queue"] = self._practice_queue
+        data["job_runner"] = self._job_runner
+        data["outbound_limiter"] = self._outbound_limiter
+        data["prompt_voices"] = self._prompt_voices
+        data["broadcaster"] = self._broadcaster
+        data["overload"] = self._overload
         return await handler(event, data)
 
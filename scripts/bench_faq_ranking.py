@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.faq_ranking import build_faq_ranker  # noqa: E402
+
+
+def _make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    letters = "абвгдежзиклмнопрстуфхцчшэюя"
+    words: set[str] = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def _zipf_sample(vocabulary: list[str], k: int, rng: random.Random) -> list[str]:
+    # Rank-based Zipf-like draw: a few common words, a long tail of rare ones.
+    n = len(vocabulary)
+    picked = {vocabulary[min(int(n ** rng.random()) - 1, n - 1)] for _ in range(k)}
+    return list(picked)
+
+
+def _make_corpus(
+    *,
+    entries: int,
+    vocabulary: list[str],
+    rng: random.Random,
+) -> list[list[str]]:
+    return [_zipf_sample(vocabulary, rng.randint(5, 15), rng) for _ in range(entries)]
+
+
+def _bench(name: str, corpus: list[list[str]], queries: list[list[str]], k: int) -> None:
+    started = time.perf_counter()
+    ranker = build_faq_ranker(name=name, documents=corpus)
+    build_s = time.perf_counter() - started
+
+    latencies: list[float] = []
+    for tokens in queries:
+        started = time.perf_counter()
+        ranker.top_k(tokens, k=k)
+        latencies.append((time.perf_counter() - started) * 1e6)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"  {type(ranker).__name__:<14} build {build_s * 1000:8.1f} ms | "
+        f"query p50 {statistics.median(latencies):8.1f} us, p95 {p95:8.1f} us"
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+    vocabulary = _make_vocabulary(args.vocabulary, rng)
+
+    for entries in args.entries:
+        corpus = _make_corpus(entries=entries, vocabulary=vocabulary, rng=rng)
+        queries = [
+            _zipf_sample(vocabulary, rng.randint(2, 8), rng)
+            for _ in range(args.queries)
+        ]
+        print(f"{entries} entries, {args.queries} queries, top-{args.k}:")
+        for name in args.rankers:
+            _bench(name, corpus, queries, args.k)
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark FAQ rankers on a synthetic corpus"
+    )
+    parser.add_argument(
+        "--entries",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000],
+        help="Corpus sizes to benchmark (default: 10000 100000)",
+    )
+    parser.add_argument(
+        "--rankers",
+        nargs="+",
+        default=["keyword", "idf"],
+        help="Rankers to compare (default: keyword idf)",
+    )
+    parser.add_argument("--queries", type=int, default=1000, help="Queries per size")
+    parser.add_argument("--vocabulary", type=int, default=50_000, help="Vocabulary size")
+    parser.add_argument("--k", type=int, default=5, help="Top-k to return")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.practice_service import PracticePhrase  # noqa: E402
+from services.practice_service import PracticeService  # noqa: E402
+from services.practice_service import PracticeServiceError  # noqa: E402
+from utils.text_norm import configure_stemmer  # noqa: E402
+
+
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+_VOWELS = "aeiou"
+# Spellings a mispronounced vowel tends to come back as from ASR.
+_VOWEL_GROUPS = ("a", "e", "i", "o", "u", "ee", "oo", "ea", "ai", "ou")
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    # One ASR-like slip: a wrong letter, a dropped letter or a split word.
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + rng.choice(_LETTERS) + word[i + 1 :]
+    if kind == 1:
+        return word[:i] + word[i + 1 :]
+    return word[:i] + " " + word[i:]
+
+
+def _wrong(word: str, rng: random.Random) -> str:
+    # A different word, as when the vowel is mispronounced: "cat" -> "cut",
+    # "meet" -> "mate". Words without a vowel get a wrong consonant instead.
+    starts = [i for i, ch in enumerate(word) if ch in _VOWELS]
+    if not starts:
+        i = rng.randrange(len(word))
+        return word[:i] + rng.choice([c for c in _LETTERS if c != word[i]]) + word[i + 1 :]
+    start = rng.choice(starts)
+    end = start
+    while end < len(word) and word[end] in _VOWELS:
+        end += 1
+    group = word[start:end]
+    replacement = rng.choice([g for g in _VOWEL_GROUPS if g != group])
+    return word[:start] + replacement + word[end:]
+
+
+def _noisy(text: str, rate: float, rng: random.Random) -> str:
+    return " ".join(
+        _typo(word, rng) if rng.random() < rate else word for word in text.split()
+    )
+
+
+def _bench(
+    service: PracticeService,
+    answers: list[tuple[PracticePhrase, str]],
+) -> tuple[float, float, float]:
+    """
+    (p50 us, p95 us, mean score) of scoring `answers`.
+    """
+    latencies: list[float] = []
+    scores: list[float] = []
+    for phrase, transcript in answers:
+        started = time.perf_counter()
+        result = service.score_phrase(transcript=transcript, phrase=phrase)
+        latencies.append((time.perf_counter() - started) * 1e6)
+        scores.append(result.score)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return statistics.median(latencies), p95, statistics.fmean(scores)
+
+
+def run(args: argparse.Namespace) -> int:
+    configure_stemmer(name=args.stemmer)
+    try:
+        phrases = list(PracticeService(practice_sets_path=args.practice_sets).catalog())
+    except PracticeServiceError as exc:
+        print(f"Error: {exc}")
+        return 1
+    if not phrases:
+        print("Error: no phrases")
+        return 1
+
+    rng = random.Random(args.seed)
+    # Every keyword replaced by a wrong word: any score here is a false accept.
+    wrong_answers = []
+    for _ in range(args.answers):
+        phrase = rng.choice(phrases)
+        wrong_answers.append(
+            (phrase, " ".join(_wrong(k, rng) for k in phrase.keywords if k))
+        )
+
+    for rate in args.noise:
+        answers = []
+        for _ in range(args.answers):
+            phrase = rng.choice(phrases)
+            answers.append((phrase, _noisy(phrase.expected_text, rate, rng)))
+
+        print(f"{args.answers} answers, typo rate {rate:.0%}:")
+        for scorer in ("exact", "fuzzy"):
+            service = PracticeService(
+                practice_sets_path=args.practice_sets,
+                scorer=scorer,
+            )
+            p50, p95, recall = _bench(service, answers)
+            _, _, false_accepts = _bench(service, wrong_answers)
+            print(
+                f"  {scorer:<6} p50 {p50:7.1f} us, p95 {p95:7.1f} us | "
+                f"recall {recall:.3f}, false accepts {false_accepts:.3f}"
+            )
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark exact vs fuzzy practice scoring: recall on noisy correct "
+            "transcripts, false accepts on wrong words"
+        )
+    )
+    parser.add_argument(
+        "--practice-sets",
+        default="assets/practice_sets.json",
+        help="Phrase list or shard manifest (default: assets/practice_sets.json)",
+    )
+    parser.add_argument(
+        "--noise",
+        type=float,
+        nargs="+",
+        default=[0.0, 0.2, 0.5],
+        help="Share of words with a typo (default: 0 0.2 0.5)",
+    )
+    parser.add_argument("--answers", type=int, default=20_000, help="Answers per rate")
+    parser.add_argument("--stemmer", default="snowball", help="Stemmer name")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.faq_semantic import FaqSemanticError  # noqa: E402
+from services.faq_semantic import SemanticIndexMeta  # noqa: E402
+from services.faq_semantic import load_encoder  # noqa: E402
+from services.faq_semantic import meta_path_for  # noqa: E402
+from services.faq_service import FaqServiceError  # noqa: E402
+from services.faq_service import get_faq_index  # noqa: E402
+from utils.config import DEFAULT_FAQ_SEMANTIC_MODEL  # noqa: E402
+
+
+def run(args: argparse.Namespace) -> int:
+    try:
+        from annoy import AnnoyIndex  # type: ignore
+    except Exception:
+        print("Package 'annoy' is not installed. Install it with:\n"
+              "python -m pip install annoy")
+        return 1
+
+    try:
+        index = get_faq_index(args.faq)
+        encoder = load_encoder(args.model)
+    except (FaqServiceError, FaqSemanticError) as exc:
+        print(f"Error: {exc}")
+        return 1
+
+    texts = [
+        item.question or " ".join(item.keywords)
+        for item in index.items
+    ]
+    print(f"Encoding {len(texts)} FAQ questions with {args.model} ...")
+    vectors = encoder.encode(
+        texts,
+        batch_size=args.batch_size,
+        normalize_embeddings=True,
+        show_progress_bar=len(texts) > args.batch_size,
+    )
+    dimension = int(vectors.shape[1])
+
+    ann = AnnoyIndex(dimension, "angular")
+    for pos, vector in enumerate(vectors):
+        ann.add_item(pos, vector.tolist())
+    ann.build(args.trees)
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    ann.save(str(tmp_path))
+    os.replace(tmp_path, out_path)
+
+    meta = SemanticIndexMeta(
+        model_name=args.model,
+        dimension=dimension,
+        items=len(texts),
+        source_hash=index.source_hash,
+    )
+    # Written last and atomically: running bots reload the index when the
+    # metadata file changes.
+    meta_path = meta_path_for(str(out_path))
+    tmp_meta_path = meta_path.with_name(meta_path.name + ".tmp")
+    tmp_meta_path.write_text(meta.to_json(), encoding="utf-8")
+    os.replace(tmp_meta_path, meta_path)
+
+    print(f"Done: {out_path} ({len(texts)} items, dim={dimension})")
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Precompute FAQ question embeddings into an Annoy index "
+            "for semantic FAQ search (FAQ_SEMANTIC_INDEX)"
+        )
+    )
+    parser.add_argument(
+        "--faq",
+        default="data/faq.json",
+        help="Path to faq.json (default: data/faq.json)",
+    )
+    parser.add_argument(
+        "--out",
+        default="data/faq_semantic.ann",
+        help="Output index path; metadata goes to <out>.json",
+    )
+    parser.add_argument(
+        "--model",
+        default=DEFAULT_FAQ_SEMANTIC_MODEL,
+        help="sentence-transformers model name (must match FAQ_SEMANTIC_MODEL)",
+    )
+    parser.add_argument("--trees", type=int, default=50, help="Annoy trees")
+    parser.add_argument("--batch-size", type=int, default=64, help="Encoder batch")
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
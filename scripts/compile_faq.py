@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.faq_compiled import CompiledFaqError  # noqa: E402
+from services.faq_service import FaqServiceError  # noqa: E402
+from services.faq_service import compile_faq  # noqa: E402
+from utils.config import DEFAULT_TEXT_STEMMER  # noqa: E402
+from utils.text_norm import configure_stemmer  # noqa: E402
+from utils.text_norm import stemmer_name  # noqa: E402
+
+
+def run(args: argparse.Namespace) -> int:
+    configure_stemmer(name=args.stemmer)
+    try:
+        index = compile_faq(args.faq, args.out)
+    except (FaqServiceError, CompiledFaqError, OSError) as exc:
+        print(f"Error: {exc}")
+        return 1
+
+    size = Path(args.out).stat().st_size
+    print(
+        f"Done: {args.out} ({len(index.items)} items, "
+        f"stemmer={stemmer_name()}, {size} bytes)"
+    )
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compile faq.json into a memory-mappable index (FAQ_COMPILED_PATH)"
+        )
+    )
+    parser.add_argument(
+        "--faq",
+        default="data/faq.json",
+        help="Path to faq.json (default: data/faq.json)",
+    )
+    parser.add_argument(
+        "--out",
+        default="data/faq.idx",
+        help="Output artifact path (default: data/faq.idx)",
+    )
+    parser.add_argument(
+        "--stemmer",
+        default=DEFAULT_TEXT_STEMMER,
+        help="Stemmer to index with; must match TEXT_STEMMER of the bot",
+    )
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from collections import deque
+from typing import Any
+
+from aiohttp import web
+
+
+# Bot API methods whose result is a Message; everything else answers True.
+_MESSAGE_METHODS = frozenset(
+    {"sendmessage", "sendvoice", "sendaudio", "senddocument", "forwardmessage"}
+)
+
+
+class FakeTelegramApi:
+    """
+    Minimal stand-in for the Bot API: accepts every method, returns
+    plausible results after an optional delay and counts calls.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency_ms: float,
+        global_limit: int = 0,
+        chat_limit: int = 0,
+    ) -> None:
+        self.latency_s = latency_ms / 1000
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.calls: Counter[str] = Counter()
+        self._message_id = 0
+        # Send times within the last second, for the flood limits.
+        self._sent: deque[float] = deque()
+        self._sent_by_chat: dict[str, deque[float]] = {}
+
+    def _flooded(self, chat_id: str) -> bool:
+        """
+        Record a message send; True if it breaks a per-second limit.
+        """
+        now = time.monotonic()
+        chat_sent = self._sent_by_chat.setdefault(chat_id, deque())
+        for sent in (self._sent, chat_sent):
+            while sent and now - sent[0] >= 1.0:
+                sent.popleft()
+        if (self.global_limit and len(self._sent) >= self.global_limit) or (
+            self.chat_limit and len(chat_sent) >= self.chat_limit
+        ):
+            return True
+        self._sent.append(now)
+        chat_sent.append(now)
+        return False
+
+    def _next_message_id(self) -> int:
+        self._message_id += 1
+        return self._message_id
+
+    def _result(self, method: str, params: dict[str, Any]) -> Any:
+        if method == "getme":
+            return {
+                "id": 1,
+                "is_bot": True,
+                "first_name": "Fake",
+                "username": "fake_bot",
+            }
+        if method in _MESSAGE_METHODS:
+            chat_id = int(params.get("chat_id") or 0)
+            return {
+                "message_id": self._next_message_id(),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": str(params.get("text", "")),
+            }
+        if method == "copymessage":
+            return {"message_id": self._next_message_id()}
+        if method == "getfile":
+            file_id = str(params.get("file_id", ""))
+            return {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_path": f"voice/{file_id}.ogg",
+            }
+        return True
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params: dict[str, Any] = dict(await request.post())
+        self.calls[method] += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if method in _MESSAGE_METHODS and self._flooded(str(params.get("chat_id"))):
+            self.calls["429"] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after 1",
+                    "parameters": {"retry_after": 1},
+                },
+                status=429,
+            )
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.calls))
+
+
+def run(args: argparse.Namespace) -> int:
+    api = FakeTelegramApi(
+        latency_ms=args.latency_ms,
+        global_limit=args.global_limit,
+        chat_limit=args.chat_limit,
+    )
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", api.handle_method)
+    app.router.add_get("/_stats", api.handle_stats)
+
+    print(
+        f"Fake Bot API on http://{args.host}:{args.port} "
+        f"(set TELEGRAM_API_BASE to it; call counts at /_stats)"
+    )
+    web.run_app(app, host=args.host, port=args.port, print=None)
+    print(json.dumps(dict(api.calls), indent=2))
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Fake Telegram Bot API server for local load tests"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind host")
+    parser.add_argument("--port", type=int, default=8081, help="Bind port")
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="Artificial delay per API call (default: 0)",
+    )
+    parser.add_argument(
+        "--global-limit",
+        type=int,
+        default=0,
+        help="Answer 429 above this many messages per second (default: 0, off)",
+    )
+    parser.add_argument(
+        "--chat-limit",
+        type=int,
+        default=0,
+        help="Answer 429 above this many messages per second to one chat (default: 0, off)",
+    )
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
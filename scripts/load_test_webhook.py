@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Any
+
+import aiohttp
+
+
+# Texts cycled through by synthetic users: commands plus FAQ-style questions.
+_TEXTS = (
+    "/start",
+    "/help",
+    "Как оплатить занятия?",
+    "Сколько стоит курс?",
+    "Можно перенести урок?",
+)
+
+
+def _make_update(update_id: int, user_id: int, text: str) -> dict[str, Any]:
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+async def _send_all(args: argparse.Namespace) -> tuple[list[float], int, float]:
+    rng = random.Random(args.seed)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def send(session: aiohttp.ClientSession, update_id: int) -> None:
+        nonlocal errors
+        update = _make_update(
+            update_id,
+            user_id=100_000 + rng.randrange(args.users),
+            text=rng.choice(_TEXTS),
+        )
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async with session.post(args.url, json=update, headers=headers) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(send(session, i) for i in range(1, args.updates + 1)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def _api_calls(stats_url: str) -> dict[str, int]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(stats_url) as resp:
+            return dict(await resp.json())
+
+
+def run(args: argparse.Namespace) -> int:
+    latencies, errors, elapsed_s = asyncio.run(_send_all(args))
+    latencies.sort()
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(
+        f"{args.updates} updates from {args.users} users, "
+        f"concurrency {args.concurrency}: {args.updates / elapsed_s:.0f} updates/s"
+    )
+    print(
+        f"Webhook ack: p50 {statistics.median(latencies):.1f} ms, "
+        f"p95 {p95:.1f} ms, max {latencies[-1]:.1f} ms; errors {errors}"
+    )
+
+    if args.api_stats:
+        try:
+            calls = asyncio.run(_api_calls(args.api_stats))
+        except (aiohttp.ClientError, ValueError) as exc:
+            print(f"Cannot read fake API stats: {exc}")
+            return 1
+        print("Bot API calls so far: " + ", ".join(f"{k}={v}" for k, v in calls.items()))
+    return 0 if errors == 0 else 1
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Post synthetic Telegram updates to the bot's webhook "
+            "(run the bot with TELEGRAM_API_BASE pointing at fake_telegram_api.py)"
+        )
+    )
+    parser.add_argument(
+        "--url",
+        default="http://127.0.0.1:8080/telegram/webhook",
+        help="Webhook URL (default: http://127.0.0.1:8080/telegram/webhook)",
+    )
+    parser.add_argument("--secret", required=True, help="WEBHOOK_SECRET")
+    parser.add_argument("--updates", type=int, default=5000, help="Updates to send")
+    parser.add_argument("--users", type=int, default=500, help="Distinct user ids")
+    parser.add_argument("--concurrency", type=int, default=100, help="In-flight requests")
+    parser.add_argument(
+        "--api-stats",
+        default="http://127.0.0.1:8081/_stats",
+        help="Fake API call counter URL; empty to skip",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+
+
+SCHEMA_VERSION = 2
+
+# Triggers from migrations.sql that maintain stats_* tables. They are dropped
+# while history is copied (otherwise every copied row would be counted again)
+# and recreated when migrations.sql is re-applied at the end.
+_STATS_TRIGGERS = (
+    "trg_messages_stats",
+    "trg_practice_attempts_stats",
+    "trg_tickets_opened_stats",
+    "trg_tickets_closed_stats",
+)
+
+
+class SchemaMigrationError(RuntimeError):
+    pass
+
+
+def _epoch(column: str) -> str:
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+def _table_exists(conn: sqlite3.Connection, schema: str, name: str) -> bool:
+    row = conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?",
+        (name,),
+    ).fetchone()
+    return row is not None
+
+
+def _copy_history(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f"""
+        INSERT INTO users (user_id, username, first_seen_at)
+        SELECT user_id, username, {_epoch('first_seen_at')}
+        FROM legacy.users
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO sessions (id, user_id, mode, started_at, ended_at)
+        SELECT id, user_id, mode, {_epoch('started_at')}, {_epoch('ended_at')}
+        FROM legacy.sessions
+        """
+    )
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO message_templates (body)
+        SELECT text
+        FROM legacy.messages
+        WHERE direction = 'out' AND text IS NOT NULL AND text != ''
+        GROUP BY text
+        HAVING COUNT(*) > 1
+        ORDER BY MIN(id)
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO messages (
+            id, user_id, direction, msg_type, text, template_id, file_id, created_at
+        )
+        SELECT
+            m.id,
+            m.user_id,
+            m.direction,
+            m.msg_type,
+            CASE WHEN t.id IS NULL THEN m.text END,
+            t.id,
+            m.file_id,
+            {_epoch('m.created_at')}
+        FROM legacy.messages AS m
+        LEFT JOIN message_templates AS t
+            ON m.direction = 'out' AND t.body = m.text
+        ORDER BY m.id
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO tickets (
+            id, user_id, status, created_at, updated_at, last_user_message
+        )
+        SELECT
+            id, user_id, status, {_epoch('created_at')}, {_epoch('updated_at')},
+            last_user_message
+        FROM legacy.tickets
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO operator_map (
+            id, operator_chat_id, forwarded_message_id, user_id, created_at
+        )
+        SELECT
+            id, operator_chat_id, forwarded_message_id, user_id,
+            {_epoch('created_at')}
+        FROM legacy.operator_map
+        """
+    )
+
+    if _table_exists(conn, "legacy", "fsm_states"):
+        conn.execute(
+            f"""
+            INSERT INTO fsm_states (storage_key, state, data, updated_at)
+            SELECT storage_key, state, data, {_epoch('updated_at')}
+            FROM legacy.fsm_states
+            """
+        )
+
+    # Aggregates are keyed by calendar day and carry over unchanged. When the
+    # legacy database has none, the backfill in migrations.sql rebuilds them.
+    for table in ("stats_daily_messages", "stats_daily"):
+        if _table_exists(conn, "legacy", table):
+            conn.execute(f"INSERT INTO {table} SELECT * FROM legacy.{table}")
+
+
+def migrate(*, db_path: Path, migrations_path: Path, backup: bool) -> None:
+    if not db_path.exists():
+        raise SchemaMigrationError(f"Database not found: {db_path}")
+    if not migrations_path.exists():
+        raise SchemaMigrationError(f"Migrations file not found: {migrations_path}")
+
+    legacy = sqlite3.connect(db_path)
+    try:
+        version = int(legacy.execute("PRAGMA user_version").fetchone()[0])
+    finally:
+        legacy.close()
+    if version >= SCHEMA_VERSION:
+        print(f"Already at schema v{version}: {db_path}")
+        return
+
+    if backup:
+        backup_path = db_path.with_name(db_path.name + ".bak")
+        shutil.copy2(db_path, backup_path)
+        print(f"Backup: {backup_path}")
+
+    migrations_sql = migrations_path.read_text(encoding="utf-8")
+    target_path = db_path.with_name(db_path.name + ".compact")
+    target_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(target_path)
+    try:
+        conn.executescript(migrations_sql)
+        for trigger in _STATS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+        conn.execute("ATTACH DATABASE ? AS legacy", (str(db_path),))
+        with conn:
+            _copy_history(conn)
+        conn.execute("DETACH DATABASE legacy")
+
+        conn.executescript(migrations_sql)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+        conn.execute("VACUUM")
+    except Exception:
+        conn.close()
+        target_path.unlink(missing_ok=True)
+        raise
+    conn.close()
+
+    before = db_path.stat().st_size
+    os.replace(target_path, db_path)
+    after = db_path.stat().st_size
+    print(
+        f"Migrated {db_path} to schema v{SCHEMA_VERSION}: "
+        f"{before} -> {after} bytes"
+    )
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Convert a SpeakSmart SQLite database to the compact schema "
+            "(integer timestamps, interned outbound message templates)"
+        )
+    )
+    parser.add_argument(
+        "--db",
+        default="data/speaksMart.sqlite3",
+        help="Path to the SQLite database (default: data/speaksMart.sqlite3)",
+    )
+    parser.add_argument(
+        "--migrations",
+        default="storage/migrations.sql",
+        help="Path to migrations.sql with the target schema",
+    )
+    parser.add_argument(
+        "--no-backup",
+        action="store_true",
+        help="Do not keep a <db>.bak copy of the original database",
+    )
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    try:
+        migrate(
+            db_path=Path(args.db),
+            migrations_path=Path(args.migrations),
+            backup=not args.no_backup,
+        )
+    except SchemaMigrationError as exc:
+        print(f"Error: {exc}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
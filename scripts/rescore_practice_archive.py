@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.audio_service import AudioService  # noqa: E402
+from services.audio_service import AudioServiceError  # noqa: E402
+from services.practice_scheduler import FAIR_SCORE  # noqa: E402
+from services.practice_scheduler import GOOD_SCORE  # noqa: E402
+from services.practice_service import PracticeService  # noqa: E402
+from services.practice_service import PracticeServiceError  # noqa: E402
+from services.speech.base import SpeechRecognizer  # noqa: E402
+from services.speech.base import SpeechRecognizerError  # noqa: E402
+from services.speech.factory import build_speech_recognizer  # noqa: E402
+from utils.text_norm import configure_stemmer  # noqa: E402
+
+
+# Per-process state, built once by _init_worker.
+_audio: AudioService | None = None
+_recognizer: SpeechRecognizer | None = None
+_practice: PracticeService | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _init_worker(args: argparse.Namespace) -> None:
+    global _audio, _recognizer, _practice, _loop
+
+    configure_stemmer(name=args.stemmer)
+    _audio = AudioService(
+        ffmpeg_path=args.ffmpeg,
+        workdir=str(Path(args.workdir) / str(os.getpid())),
+    )
+    _recognizer = build_speech_recognizer(
+        provider=args.speech_provider,
+        whisper_model=args.whisper_model,
+    )
+    _practice = PracticeService(
+        practice_sets_path=args.practice_sets,
+        scorer=args.scorer,
+    )
+    _loop = asyncio.new_event_loop()
+
+
+def _verdict(score: float) -> str:
+    if score >= GOOD_SCORE:
+        return "good"
+    if score >= FAIR_SCORE:
+        return "fair"
+    return "retry"
+
+
+def _rescore(job: dict[str, Any]) -> dict[str, Any]:
+    assert _audio is not None and _recognizer is not None
+    assert _practice is not None and _loop is not None
+
+    result = dict(job)
+    wav_path = ""
+    try:
+        started = time.perf_counter()
+        wav_path = _audio.convert_to_wav(source_path=job["audio_path"])
+        converted = time.perf_counter()
+        speech = _loop.run_until_complete(_recognizer.transcribe(wav_path=wav_path))
+        transcribed = time.perf_counter()
+
+        phrase = _practice.catalog().get(job["phrase_id"])
+        if phrase is None:
+            raise PracticeServiceError(f"Unknown phrase_id: {job['phrase_id']}")
+        score = _practice.score_phrase(transcript=speech.text, phrase=phrase)
+
+        result.update(
+            new_transcript=speech.text,
+            new_score=score.score,
+            new_verdict=_verdict(score.score),
+            missing_keywords=score.missing_keywords,
+            convert_ms=int((converted - started) * 1000),
+            transcribe_ms=int((transcribed - converted) * 1000),
+        )
+    except (AudioServiceError, SpeechRecognizerError, PracticeServiceError) as exc:
+        result["error"] = str(exc)
+    finally:
+        if wav_path:
+            Path(wav_path).unlink(missing_ok=True)
+    return result
+
+
+def _load_jobs(args: argparse.Namespace) -> list[dict[str, Any]]:
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            """
+            SELECT a.attempt_id, a.path, p.phrase_id, p.score, p.transcript
+            FROM practice_archive AS a
+            JOIN practice_attempts AS p ON p.id = a.attempt_id
+            WHERE p.created_at >= ?
+            ORDER BY a.attempt_id DESC
+            LIMIT ?
+            """,
+            (int(time.time()) - args.days * 86400, args.limit),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    archive_dir = Path(args.archive_dir)
+    return [
+        {
+            "attempt_id": int(r["attempt_id"]),
+            "audio_path": str(archive_dir / r["path"]),
+            "phrase_id": str(r["phrase_id"]),
+            "old_score": float(r["score"]),
+            "old_verdict": _verdict(float(r["score"])),
+            "old_transcript": r["transcript"] or "",
+        }
+        for r in rows
+    ]
+
+
+def _print_summary(results: list[dict[str, Any]], elapsed_s: float) -> None:
+    ok = [r for r in results if "error" not in r]
+    print(f"Answers: {len(results)}, failed: {len(results) - len(ok)}")
+    if not ok:
+        return
+
+    changed = sum(r["old_verdict"] != r["new_verdict"] for r in ok)
+    same_text = sum(r["old_transcript"] == r["new_transcript"] for r in ok)
+    latencies = sorted(r["transcribe_ms"] for r in ok)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(
+        f"Mean score: {statistics.fmean(r['old_score'] for r in ok):.3f} -> "
+        f"{statistics.fmean(r['new_score'] for r in ok):.3f}"
+    )
+    print(f"Verdict changed: {changed} ({changed / len(ok):.1%})")
+    print(f"Same transcript: {same_text} ({same_text / len(ok):.1%})")
+    print(
+        f"Transcribe: p50 {statistics.median(latencies):.0f} ms, p95 {p95} ms; "
+        f"wall time {elapsed_s:.1f} s"
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    try:
+        jobs = _load_jobs(args)
+    except sqlite3.Error as exc:
+        print(f"Error: cannot read archive from {args.db}: {exc}")
+        return 1
+    if not jobs:
+        print("Archive is empty (is PRACTICE_ARCHIVE_DIR set?)")
+        return 0
+
+    started = time.perf_counter()
+    results: list[dict[str, Any]] = []
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as out, ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args,),
+    ) as pool:
+        futures = [pool.submit(_rescore, job) for job in jobs]
+        for n, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            if n % 50 == 0:
+                print(f"  {n}/{len(jobs)}")
+
+    _print_summary(results, time.perf_counter() - started)
+    print(f"Report: {out_path}")
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Re-transcribe and re-score archived practice answers in parallel "
+            "and compare with the stored results"
+        )
+    )
+    parser.add_argument(
+        "--db",
+        default="data/speaksMart.sqlite3",
+        help="SQLite database (default: data/speaksMart.sqlite3)",
+    )
+    parser.add_argument("--archive-dir", required=True, help="PRACTICE_ARCHIVE_DIR")
+    parser.add_argument("--ffmpeg", required=True, help="Path to ffmpeg")
+    parser.add_argument(
+        "--practice-sets",
+        default="assets/practice_sets.json",
+        help="Phrase list or shard manifest (default: assets/practice_sets.json)",
+    )
+    parser.add_argument(
+        "--scorer",
+        default="fuzzy",
+        help="Practice scorer to evaluate: exact | fuzzy (default: fuzzy)",
+    )
+    parser.add_argument("--speech-provider", default="whisper", help="ASR provider")
+    parser.add_argument("--whisper-model", default="base", help="Whisper model")
+    parser.add_argument("--stemmer", default="snowball", help="Stemmer name")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max((os.cpu_count() or 2) // 2, 1),
+        help="Worker processes (default: half the CPUs)",
+    )
+    parser.add_argument("--days", type=int, default=30, help="Answers from last N days")
+    parser.add_argument("--limit", type=int, default=1000, help="Max answers")
+    parser.add_argument(
+        "--workdir",
+        default="data/tmp/rescore",
+        help="Temp dir for WAV files (default: data/tmp/rescore)",
+    )
+    parser.add_argument(
+        "--out",
+        default="data/rescore_report.jsonl",
+        help="JSON Lines report (default: data/rescore_report.jsonl)",
+    )
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
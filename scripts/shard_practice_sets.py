@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.practice_service import MANIFEST_VERSION  # noqa: E402
+
+
+_SLUG_RE = re.compile(r"[^0-9a-z]+")
+
+
+def _slug(value: str) -> str:
+    return _SLUG_RE.sub("_", value.strip().lower()).strip("_") or "x"
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+def run(args: argparse.Namespace) -> int:
+    source = Path(args.input)
+    try:
+        raw = json.loads(source.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        print(f"Error: cannot read {source}: {exc}")
+        return 1
+    if not isinstance(raw, list):
+        print(f"Error: {source} must be a flat JSON list of phrases")
+        return 1
+
+    # (level, topic) groups in order of first appearance.
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for item in raw:
+        key = (
+            str(item.get("level", "")).strip() or args.default_level,
+            str(item.get("topic", "")).strip() or args.default_topic,
+        )
+        groups.setdefault(key, []).append(item)
+
+    out_dir = Path(args.out_dir)
+    shards_dir = out_dir / "shards"
+    shards_dir.mkdir(parents=True, exist_ok=True)
+
+    shards: list[dict] = []
+    for (level, topic), items in groups.items():
+        for n, start in enumerate(range(0, len(items), args.max_shard_size), start=1):
+            chunk = items[start : start + args.max_shard_size]
+            shard_id = f"{_slug(level)}-{_slug(topic)}-{n:03d}"
+            content = json.dumps(chunk, ensure_ascii=False, indent=2).encode("utf-8")
+            _write_atomic(shards_dir / f"{shard_id}.json", content)
+            shards.append(
+                {
+                    "id": shard_id,
+                    "level": level,
+                    "topic": topic,
+                    "file": f"shards/{shard_id}.json",
+                    "sha256": hashlib.sha256(content).hexdigest(),
+                    "phrase_ids": [str(item.get("id", "")) for item in chunk],
+                }
+            )
+
+    # The manifest goes last: the bot reloads on its change and then sees
+    # only complete shard files.
+    manifest = {"version": MANIFEST_VERSION, "shards": shards}
+    manifest_path = out_dir / "manifest.json"
+    _write_atomic(
+        manifest_path,
+        json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"),
+    )
+
+    print(f"Done: {manifest_path} ({len(raw)} phrases in {len(shards)} shards)")
+    return 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Split a flat practice_sets.json into per-level/topic shards "
+            "plus a manifest (use the manifest as PRACTICE_SETS_PATH)"
+        )
+    )
+    parser.add_argument(
+        "--input",
+        default="assets/practice_sets.json",
+        help="Flat phrase list (default: assets/practice_sets.json)",
+    )
+    parser.add_argument(
+        "--out-dir",
+        default="assets/practice",
+        help="Where manifest.json and shards/ are written (default: assets/practice)",
+    )
+    parser.add_argument(
+        "--max-shard-size",
+        type=int,
+        default=500,
+        help="Max phrases per shard file (default: 500)",
+    )
+    parser.add_argument("--default-level", default="all", help="Level if missing")
+    parser.add_argument("--default-topic", default="general", help="Topic if missing")
+    return parser
+
+
+def main() -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
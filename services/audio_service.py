@@ -33,7 +33,7 @@ class AudioService:
         await bot.download_file(tg_file.file_path, destination=target)
         return str(target)
 
-    def convert_to_wav(self, *, source_path: str) -> str:
+    def convert_to_wav(self, *, source_path: str, max_seconds: int | None = None) -> str:
         source = Path(source_path)
         if not source.exists():
             raise AudioServiceError(f"Audio source does not exist: {source_path}")
@@ -57,8 +57,10 @@ class AudioService:
             "1",
             "-ar",
             "16000",
-            str(target),
         ]
+        if max_seconds is not None:
+            cmd += ["-t", str(max_seconds)]
+        cmd.append(str(target))
         result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode != 0:
             raise AudioServiceError(
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.exceptions import TelegramForbiddenError
+
+from services.job_runner import PRIORITY_BULK
+from services.job_runner import current_priority
+from storage.repositories import Repositories
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_SENT = "sent"
+STATUS_BLOCKED = "blocked"
+STATUS_FAILED = "failed"
+
+
+@dataclass(slots=True)
+class Broadcaster:
+    """
+    Sends operator broadcasts to every user in the background, one at a time.
+
+    Recipients are read from `users` in keyset pages of `page_size`; each
+    page gets 'pending' delivery rows before `concurrency` sends run through
+    the outbound limiter at the lowest priority, so live traffic goes
+    first. Delivery is at most once: after a crash the rows still pending
+    (at most one page) are never resent, see migrations.sql. On `close` the
+    unsent rest of the page is released and the broadcast continues after
+    `resume`.
+    """
+
+    repos: Repositories
+    operator_chat_id: int
+    concurrency: int = 20
+    page_size: int = 100
+    drain_timeout: float = 30.0
+    _task: asyncio.Task[None] | None = None
+    _active_id: int | None = None
+    _stop_reason: str | None = None
+
+    @property
+    def active_id(self) -> int | None:
+        """
+        Id of the broadcast being sent, if any.
+        """
+        return self._active_id
+
+    def start(self, *, bot: Bot, broadcast_id: int) -> bool:
+        """
+        Start sending a broadcast already marked 'running'; False if busy.
+        """
+        if self._task is not None:
+            return False
+        self._active_id = broadcast_id
+        self._stop_reason = None
+        self._task = asyncio.create_task(
+            self._run(bot, [broadcast_id]),
+            name=f"broadcast-{broadcast_id}",
+        )
+        return True
+
+    async def resume(self, *, bot: Bot) -> None:
+        """
+        Continue broadcasts interrupted by a restart or crash.
+        """
+        broadcast_ids = await self.repos.get_running_broadcast_ids()
+        if not broadcast_ids or self._task is not None:
+            return
+        for broadcast_id in broadcast_ids:
+            await self.repos.mark_unknown_deliveries(broadcast_id=broadcast_id)
+        logger.info("Resuming broadcasts %s", broadcast_ids)
+        self._active_id = broadcast_ids[0]
+        self._task = asyncio.create_task(self._run(bot, broadcast_ids), name="broadcast")
+
+    def cancel(self) -> int | None:
+        """
+        Stop the active broadcast for good; returns its id.
+        """
+        if self._task is None:
+            return None
+        self._stop_reason = "cancelled"
+        return self._active_id
+
+    async def close(self) -> None:
+        """
+        Let in-flight sends finish and leave the broadcast 'running' for
+        `resume`; cancel it if that takes longer than `drain_timeout`.
+        """
+        task = self._task
+        if task is None:
+            return
+        self._stop_reason = "shutdown"
+        done, _ = await asyncio.wait((task,), timeout=self.drain_timeout)
+        if not done:
+            logger.warning("Broadcast %s did not stop in time", self._active_id)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self, bot: Bot, broadcast_ids: list[int]) -> None:
+        # Lowest lane of the outbound limiter: after answers and operator
+        # notifications.
+        current_priority.set(PRIORITY_BULK)
+        try:
+            for broadcast_id in broadcast_ids:
+                self._active_id = broadcast_id
+                await self._send_broadcast(bot, broadcast_id)
+                if self._stop_reason == "shutdown":
+                    return
+        except Exception:
+            logger.exception("Broadcast %s failed", self._active_id)
+        finally:
+            self._task = None
+            self._active_id = None
+
+    async def _send_broadcast(self, bot: Bot, broadcast_id: int) -> None:
+        broadcast = await self.repos.get_broadcast(broadcast_id=broadcast_id)
+        if broadcast is None or broadcast.status != "running":
+            return
+        logger.info("Broadcast %s started", broadcast_id)
+
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        # Users with a delivery row are skipped, so restarting from 0 after
+        # a resume only revisits the released tail of the last page.
+        cursor = 0
+        while self._stop_reason is None:
+            user_ids = await self.repos.get_broadcast_recipients(
+                broadcast_id=broadcast_id,
+                after_user_id=cursor,
+                limit=self.page_size,
+            )
+            if not user_ids:
+                break
+            await self.repos.add_pending_deliveries(
+                broadcast_id=broadcast_id,
+                user_ids=user_ids,
+            )
+            results = await asyncio.gather(
+                *(
+                    self._send(bot, semaphore, user_id, broadcast.text)
+                    for user_id in user_ids
+                )
+            )
+            await self.repos.set_delivery_statuses(
+                broadcast_id=broadcast_id,
+                statuses=[
+                    (user_id, status)
+                    for user_id, status in zip(user_ids, results)
+                    if status is not None
+                ],
+            )
+            skipped = [user_id for user_id, status in zip(user_ids, results) if status is None]
+            if skipped:
+                await self.repos.release_pending_deliveries(
+                    broadcast_id=broadcast_id,
+                    user_ids=skipped,
+                )
+            cursor = user_ids[-1]
+
+        if self._stop_reason == "shutdown":
+            logger.info("Broadcast %s paused until restart", broadcast_id)
+            return
+        status = "cancelled" if self._stop_reason == "cancelled" else "done"
+        await self.repos.set_broadcast_status(
+            broadcast_id=broadcast_id,
+            status=status,
+            from_status="running",
+        )
+        counts = await self.repos.get_delivery_counts(broadcast_id=broadcast_id)
+        logger.info("Broadcast %s %s: %s", broadcast_id, status, counts)
+        try:
+            await bot.send_message(
+                self.operator_chat_id,
+                f"Рассылка #{broadcast_id} "
+                f"{'отменена' if status == 'cancelled' else 'завершена'}: "
+                + format_delivery_counts(counts),
+                parse_mode=None,
+            )
+        except TelegramAPIError:
+            logger.exception("Failed to report broadcast %s", broadcast_id)
+        # The next queued broadcast (after a resume) starts fresh.
+        self._stop_reason = None
+
+    async def _send(
+        self,
+        bot: Bot,
+        semaphore: asyncio.Semaphore,
+        user_id: int,
+        text: str,
+    ) -> str | None:
+        """
+        Deliver to one user; None if stopped before the send started.
+        """
+        async with semaphore:
+            if self._stop_reason is not None:
+                return None
+            try:
+                await bot.send_message(user_id, text, parse_mode=None)
+            except TelegramForbiddenError:
+                return STATUS_BLOCKED
+            except TelegramAPIError as exc:
+                logger.warning("Broadcast to %s failed: %s", user_id, exc)
+                return STATUS_FAILED
+            except Exception:
+                logger.exception("Broadcast to %s failed", user_id)
+                return STATUS_FAILED
+            return STATUS_SENT
+
+
+def format_delivery_counts(counts: dict[str, int]) -> str:
+    return (
+        f"доставлено {counts.get(STATUS_SENT, 0)}, "
+        f"заблокировали бота {counts.get(STATUS_BLOCKED, 0)}, "
+        f"ошибок {counts.get(STATUS_FAILED, 0)}, "
+        f"неизвестно (сбой) {counts.get('unknown', 0)}, "
+        f"в процессе {counts.get('pending', 0)}"
+    )
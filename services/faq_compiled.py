@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from pathlib import Path
+
+from services.faq_ranking import FaqRanker
+from services.faq_ranking import ranker_name
+from utils.spelling import SymSpellIndex
+from utils.spelling import delete_variants
+from utils.spelling import max_typos
+
+
+MAGIC = b"SMFAQIDX"
+FORMAT_VERSION = 3
+
+# magic, version, source sha256, stemmer name, items, terms, postings,
+# surface words, delete variants, delete variant -> word links
+_HEADER = struct.Struct("<8sI32s16sIIIIII")
+
+# Every section starts at an 8-byte boundary; the table holds their offsets
+# plus the end of the last one.
+(
+    _TERM_OFFSETS,
+    _TERM_BLOB,
+    _POSTING_OFFSETS,
+    _POSTING_DOCS,
+    _TERM_IDF,
+    _KEYWORD_NORMS,
+    _IDF_NORMS,
+    _ITEM_OFFSETS,
+    _ITEM_BLOB,
+    _DOC_OFFSETS,
+    _DOC_BLOB,
+    _SURFACE_OFFSETS,
+    _SURFACE_BLOB,
+    _SURFACE_FREQ,
+    _DELETE_OFFSETS,
+    _DELETE_BLOB,
+    _DELETE_WORD_OFFSETS,
+    _DELETE_WORDS,
+) = range(18)
+_SECTIONS = 18
+_TABLE = struct.Struct(f"<{_SECTIONS + 1}Q")
+
+# Item fields are stored as question, answer, "\n"-joined keywords.
+_ITEM_FIELDS = 3
+
+
+class CompiledFaqError(RuntimeError):
+    pass
+
+
+class _StringTable(Sequence[str]):
+    """
+    Read-only list of strings over u32 offsets + a UTF-8 blob.
+    """
+
+    def __init__(self, offsets: memoryview, blob: memoryview) -> None:
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):  # type: ignore[no-untyped-def, override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return str(self._blob[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+
+class _Terms(_StringTable):
+    """
+    Sorted string table; lookups are binary searches over the mapped pages.
+    """
+
+    def find(self, term: str) -> int:
+        i = bisect_left(self, term)
+        if i < len(self) and self[i] == term:
+            return i
+        return -1
+
+    def __contains__(self, term: object) -> bool:
+        return isinstance(term, str) and self.find(term) >= 0
+
+
+class _Documents(Sequence[tuple[str, ...]]):
+    def __init__(self, table: _StringTable) -> None:
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __getitem__(self, i):  # type: ignore[no-untyped-def, override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        value = self._table[i]
+        return tuple(value.split("\n")) if value else ()
+
+
+class CompiledRanker(FaqRanker):
+    """
+    Postings walk over the mapped artifact.
+
+    With `weights=None` every matched keyword counts 1 (KeywordRanker);
+    otherwise the precomputed per-term weights are summed (IdfRanker).
+    Either sum is divided by the document's norm, so scores stay in [0, 1].
+    """
+
+    def __init__(
+        self,
+        faq: CompiledFaq,
+        *,
+        weights: memoryview | None,
+        norms: memoryview,
+    ) -> None:
+        self._faq = faq
+        self._weights = weights
+        self._norms = norms
+
+    def top_k(self, tokens: Sequence[str], *, k: int) -> list[tuple[int, float]]:
+        terms = self._faq.terms
+        offsets = self._faq.posting_offsets
+        docs = self._faq.posting_docs
+        weights = self._weights
+
+        found: dict[int, float] = {}
+        for token in set(tokens):
+            term = terms.find(token)
+            if term < 0:
+                continue
+            weight = 1.0 if weights is None else weights[term]
+            for pos in docs[offsets[term] : offsets[term + 1]]:
+                found[pos] = found.get(pos, 0.0) + weight
+
+        norms = self._norms
+        scored = ((pos, total / norms[pos]) for pos, total in found.items())
+        # Best score first; ties go to the earlier document.
+        return heapq.nsmallest(k, scored, key=lambda pair: (-pair[1], pair[0]))
+
+
+class CompiledSpeller(SymSpellIndex):
+    """
+    SymSpell lookups over the delete map stored in the artifact.
+
+    Delete variants are a sorted string table; each points at a run of
+    surface word ids. Nothing is built on the heap, so every process shares
+    the same pages.
+    """
+
+    def __init__(self, faq: CompiledFaq) -> None:
+        self._surface = faq.surface
+        self._surface_freq = faq.surface_freq
+        self._deletes = faq.delete_variants
+        self._delete_offsets = faq.delete_word_offsets
+        self._delete_words = faq.delete_words
+
+    def _count(self, word: str) -> int | None:
+        i = self._surface.find(word)
+        return None if i < 0 else self._surface_freq[i]
+
+    def _words_for_delete(self, variant: str) -> list[str]:
+        i = self._deletes.find(variant)
+        if i < 0:
+            return []
+        ids = self._delete_words[self._delete_offsets[i] : self._delete_offsets[i + 1]]
+        return [self._surface[w] for w in ids]
+
+
+class CompiledFaq:
+    """
+    Read-only view of a FAQ artifact written by `write_compiled_faq`.
+
+    The file is memory-mapped: opening it only validates the header, and
+    every bot process mapping the same file shares its pages.
+    """
+
+    def __init__(self, path: str) -> None:
+        if sys.byteorder != "little":
+            raise CompiledFaqError("Compiled FAQ needs a little-endian host")
+
+        try:
+            with open(path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            raise CompiledFaqError(f"Cannot map compiled FAQ: {path}") from exc
+
+        view = memoryview(self._mmap)
+        if len(view) < _HEADER.size + _TABLE.size:
+            raise CompiledFaqError(f"Compiled FAQ is truncated: {path}")
+
+        (
+            magic,
+            version,
+            digest,
+            stemmer,
+            self.item_count,
+            term_count,
+            posting_count,
+            surface_count,
+            delete_count,
+            delete_word_count,
+        ) = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise CompiledFaqError(f"Not a compiled FAQ file: {path}")
+        if version != FORMAT_VERSION:
+            raise CompiledFaqError(
+                f"Compiled FAQ format {version} is not supported "
+                f"(expected {FORMAT_VERSION}); recompile {path}"
+            )
+
+        self.source_hash = digest.hex()
+        self.stemmer = stemmer.rstrip(b"\0").decode("ascii")
+
+        table = _TABLE.unpack_from(view, _HEADER.size)
+        if list(table) != sorted(table) or table[-1] != len(view):
+            raise CompiledFaqError(f"Compiled FAQ is corrupted: {path}")
+
+        def section(i: int, fmt: str | None, length: int | None) -> memoryview:
+            part = view[table[i] : table[i + 1]]
+            if fmt is not None:
+                item_size = struct.calcsize(fmt)
+                part = part[: len(part) - len(part) % item_size].cast(fmt)
+            if length is not None:
+                if len(part) < length:
+                    raise CompiledFaqError(f"Compiled FAQ is corrupted: {path}")
+                part = part[:length]
+            return part
+
+        n = self.item_count
+        self.terms = _Terms(
+            section(_TERM_OFFSETS, "I", term_count + 1),
+            section(_TERM_BLOB, None, None),
+        )
+        self.posting_offsets = section(_POSTING_OFFSETS, "I", term_count + 1)
+        self.posting_docs = section(_POSTING_DOCS, "I", posting_count)
+        self._term_idf = section(_TERM_IDF, "d", term_count)
+        self._keyword_norms = section(_KEYWORD_NORMS, "d", n)
+        self._idf_norms = section(_IDF_NORMS, "d", n)
+        self._items = _StringTable(
+            section(_ITEM_OFFSETS, "I", n * _ITEM_FIELDS + 1),
+            section(_ITEM_BLOB, None, None),
+        )
+        self.documents = _Documents(
+            _StringTable(
+                section(_DOC_OFFSETS, "I", n + 1),
+                section(_DOC_BLOB, None, None),
+            )
+        )
+        self.surface = _Terms(
+            section(_SURFACE_OFFSETS, "I", surface_count + 1),
+            section(_SURFACE_BLOB, None, None),
+        )
+        self.surface_freq = section(_SURFACE_FREQ, "I", surface_count)
+        self.delete_variants = _Terms(
+            section(_DELETE_OFFSETS, "I", delete_count + 1),
+            section(_DELETE_BLOB, None, None),
+        )
+        self.delete_word_offsets = section(_DELETE_WORD_OFFSETS, "I", delete_count + 1)
+        self.delete_words = section(_DELETE_WORDS, "I", delete_word_count)
+
+    def item_fields(self, pos: int) -> tuple[str, str, list[str]]:
+        """
+        (question, answer, keywords) of the item at `pos`.
+        """
+        if not 0 <= pos < self.item_count:
+            raise IndexError(pos)
+        base = pos * _ITEM_FIELDS
+        keywords = self._items[base + 2]
+        return (
+            self._items[base],
+            self._items[base + 1],
+            keywords.split("\n") if keywords else [],
+        )
+
+    def speller(self) -> SymSpellIndex:
+        return CompiledSpeller(self)
+
+    def ranker(self, name: str) -> FaqRanker | None:
+        name = ranker_name(name)
+        if name == "keyword":
+            return CompiledRanker(self, weights=None, norms=self._keyword_norms)
+        if name == "idf":
+            return CompiledRanker(
+                self,
+                weights=self._term_idf,
+                norms=self._idf_norms,
+            )
+        return None
+
+
+def _string_table(values: Sequence[str]) -> tuple[array, bytes]:
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def write_compiled_faq(
+    path: str,
+    *,
+    items: Sequence[tuple[str, str, Sequence[str]]],
+    documents: Sequence[Sequence[str]],
+    surface_vocabulary: dict[str, int],
+    source_hash: str,
+    stemmer: str,
+) -> None:
+    """
+    Write the artifact atomically (temp file + rename).
+
+    `items` are (question, answer, keywords); `documents` are the stemmed,
+    deduplicated keywords the rankers index.
+    """
+    if sys.byteorder != "little":
+        raise CompiledFaqError("Compiled FAQ can only be written on little-endian hosts")
+
+    n_docs = len(documents)
+    postings: dict[str, list[int]] = {}
+    for pos, doc in enumerate(documents):
+        for term in doc:
+            postings.setdefault(term, []).append(pos)
+    terms = sorted(postings)
+
+    # Same weights as IdfRanker (keywords are unique per document).
+    posting_offsets = array("I", [0])
+    posting_docs = array("I")
+    term_idf = array("d")
+    idf_norms = array("d", [0.0] * n_docs)
+    for term in terms:
+        docs = postings[term]
+        idf = math.log(1.0 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+        term_idf.append(idf)
+        for pos in docs:
+            posting_docs.append(pos)
+            idf_norms[pos] += idf
+        posting_offsets.append(len(posting_docs))
+    for pos in range(n_docs):
+        if idf_norms[pos] == 0.0:
+            idf_norms[pos] = 1.0
+    keyword_norms = array("d", [float(max(len(d), 1)) for d in documents])
+
+    item_values: list[str] = []
+    for question, answer, keywords in items:
+        item_values += [question, answer, "\n".join(keywords)]
+    surface = sorted(surface_vocabulary)
+
+    term_offsets, term_blob = _string_table(terms)
+    item_offsets, item_blob = _string_table(item_values)
+    doc_offsets, doc_blob = _string_table(["\n".join(d) for d in documents])
+    surface_offsets, surface_blob = _string_table(surface)
+    surface_freq = array("I", [surface_vocabulary[w] for w in surface])
+
+    # Same delete map as SymSpellIndex, with words as surface ids.
+    deletes: dict[str, list[int]] = {}
+    for word_id, word in enumerate(surface):
+        for variant in delete_variants(word, max_typos(word)):
+            deletes.setdefault(variant, []).append(word_id)
+    delete_keys = sorted(deletes)
+    delete_offsets, delete_blob = _string_table(delete_keys)
+    delete_word_offsets = array("I", [0])
+    delete_words = array("I")
+    for variant in delete_keys:
+        delete_words.extend(deletes[variant])
+        delete_word_offsets.append(len(delete_words))
+
+    sections: list[bytes] = [
+        term_offsets.tobytes(),
+        term_blob,
+        posting_offsets.tobytes(),
+        posting_docs.tobytes(),
+        term_idf.tobytes(),
+        keyword_norms.tobytes(),
+        idf_norms.tobytes(),
+        item_offsets.tobytes(),
+        item_blob,
+        doc_offsets.tobytes(),
+        doc_blob,
+        surface_offsets.tobytes(),
+        surface_blob,
+        surface_freq.tobytes(),
+        delete_offsets.tobytes(),
+        delete_blob,
+        delete_word_offsets.tobytes(),
+        delete_words.tobytes(),
+    ]
+
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        bytes.fromhex(source_hash),
+        stemmer.encode("ascii")[:16],
+        n_docs,
+        len(terms),
+        len(posting_docs),
+        len(surface),
+        len(delete_keys),
+        len(delete_words),
+    )
+
+    table: list[int] = []
+    offset = _HEADER.size + _TABLE.size
+    body = bytearray()
+    for data in sections:
+        padding = -offset % 8
+        body += b"\0" * padding
+        offset += padding
+        table.append(offset)
+        body += data
+        offset += len(data)
+    table.append(offset)
+
+    out_path = Path(path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(_TABLE.pack(*table))
+        f.write(body)
+    os.replace(tmp_path, out_path)
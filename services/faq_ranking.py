@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import heapq
+import logging
+from collections.abc import Sequence
+
+
+logger = logging.getLogger(__name__)
+
+# FAQ_RANKER=bm25 from older configs: it always computed the same scores.
+_RANKER_ALIASES = {"bm25": "idf"}
+
+
+class FaqRankerError(RuntimeError):
+    pass
+
+
+class FaqRanker:
+    """
+    Ranks FAQ documents (lists of unique keywords) against query tokens.
+
+    `top_k` returns up to `k` (document position, score) pairs, best first.
+    Scores are in [0, 1]: the share of the document's keyword weight that the
+    query covers, so FAQ_MIN_SCORE keeps the same meaning for every ranker.
+    """
+
+    def top_k(self, tokens: Sequence[str], *, k: int) -> list[tuple[int, float]]:
+        raise NotImplementedError
+
+
+class KeywordRanker(FaqRanker):
+    """
+    Unweighted coverage: matched keywords / keywords, via an inverted index.
+    """
+
+    def __init__(self, documents: Sequence[Sequence[str]]) -> None:
+        postings: dict[str, list[int]] = {}
+        for pos, keywords in enumerate(documents):
+            for keyword in keywords:
+                postings.setdefault(keyword, []).append(pos)
+        self._postings = {k: tuple(v) for k, v in postings.items()}
+        self._keyword_counts = tuple(len(keywords) for keywords in documents)
+
+    def top_k(self, tokens: Sequence[str], *, k: int) -> list[tuple[int, float]]:
+        found: dict[int, int] = {}
+        for token in set(tokens):
+            for pos in self._postings.get(token, ()):
+                found[pos] = found.get(pos, 0) + 1
+
+        scored = (
+            (pos, count / self._keyword_counts[pos]) for pos, count in found.items()
+        )
+        # Best score first; ties go to the earlier document.
+        return heapq.nsmallest(k, scored, key=lambda pair: (-pair[1], pair[0]))
+
+
+class IdfRanker(FaqRanker):
+    """
+    IDF-weighted coverage over a sparse document-term matrix (NumPy/SciPy).
+
+    Each cell holds the IDF of a keyword in a document. A query selects its
+    term columns from the CSC matrix and sums them per document in one
+    vectorized pass, touching only documents that share a term with it; the
+    sum is divided by the document's total IDF. Rare keywords thus count
+    more than ones shared by many entries.
+    """
+
+    def __init__(self, documents: Sequence[Sequence[str]]) -> None:
+        try:
+            import numpy as np  # type: ignore
+            from scipy import sparse  # type: ignore
+        except Exception as exc:
+            raise FaqRankerError(
+                "IDF ranker needs numpy and scipy. "
+                "Example: pip install numpy scipy"
+            ) from exc
+
+        self._np = np
+
+        vocabulary: dict[str, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        for pos, keywords in enumerate(documents):
+            for keyword in keywords:
+                rows.append(pos)
+                cols.append(vocabulary.setdefault(keyword, len(vocabulary)))
+
+        n_docs = len(documents)
+        rows_arr = np.asarray(rows, dtype=np.int32)
+        cols_arr = np.asarray(cols, dtype=np.int32)
+
+        df = np.bincount(cols_arr, minlength=len(vocabulary)).astype(np.float32)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+        matrix = sparse.csr_matrix(
+            (idf[cols_arr].astype(np.float32), (rows_arr, cols_arr)),
+            shape=(n_docs, len(vocabulary)),
+        )
+        self._columns = matrix.tocsc()
+        self._vocabulary = vocabulary
+        self._self_scores = np.asarray(matrix.sum(axis=1)).ravel()
+        self._self_scores[self._self_scores == 0] = 1.0
+
+    def top_k(self, tokens: Sequence[str], *, k: int) -> list[tuple[int, float]]:
+        np = self._np
+
+        cols = sorted({self._vocabulary[t] for t in tokens if t in self._vocabulary})
+        if not cols:
+            return []
+
+        selected = self._columns[:, cols]
+        candidates, inverse = np.unique(selected.indices, return_inverse=True)
+        scores = np.bincount(inverse, weights=selected.data) / self._self_scores[
+            candidates
+        ]
+
+        if candidates.size > k:
+            # Keep everything tied with the k-th best so ties resolve by position.
+            kth = np.partition(scores, candidates.size - k)[candidates.size - k]
+            keep = scores >= kth
+            candidates = candidates[keep]
+            scores = scores[keep]
+        # Best score first; ties go to the earlier document.
+        order = np.lexsort((candidates, -scores))[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+
+def ranker_name(name: str) -> str:
+    """
+    Canonical FAQ_RANKER value (lower case, old aliases resolved).
+    """
+    name = name.strip().lower()
+    return _RANKER_ALIASES.get(name, name)
+
+
+def build_faq_ranker(
+    *,
+    name: str,
+    documents: Sequence[Sequence[str]],
+) -> FaqRanker:
+    name = ranker_name(name)
+
+    if name == "idf":
+        try:
+            return IdfRanker(documents)
+        except FaqRankerError:
+            logger.exception("IDF ranker unavailable, falling back to keyword")
+            return KeywordRanker(documents)
+
+    if name != "keyword":
+        logger.warning("Unsupported FAQ ranker %r, using keyword", name)
+    return KeywordRanker(documents)
+
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from utils.file_reload import FileReloader
+
+
+logger = logging.getLogger(__name__)
+
+
+class FaqSemanticError(RuntimeError):
+    pass
+
+
+def meta_path_for(index_path: str) -> Path:
+    return Path(index_path + ".json")
+
+
+@dataclass(frozen=True, slots=True)
+class SemanticIndexMeta:
+    model_name: str
+    dimension: int
+    items: int
+    source_hash: str
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "model_name": self.model_name,
+                "dimension": self.dimension,
+                "items": self.items,
+                "source_hash": self.source_hash,
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+
+    @classmethod
+    def read(cls, path: Path) -> SemanticIndexMeta:
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            return cls(
+                model_name=str(raw["model_name"]),
+                dimension=int(raw["dimension"]),
+                items=int(raw["items"]),
+                source_hash=str(raw["source_hash"]),
+            )
+        except (OSError, ValueError, KeyError) as exc:
+            raise FaqSemanticError(f"Bad semantic index metadata: {path}") from exc
+
+
+def load_encoder(model_name: str):  # type: ignore[no-untyped-def]
+    try:
+        from sentence_transformers import SentenceTransformer  # type: ignore
+    except Exception as exc:
+        raise FaqSemanticError(
+            "Semantic FAQ search needs sentence-transformers. "
+            "Example: pip install sentence-transformers annoy"
+        ) from exc
+    return SentenceTransformer(model_name, device="cpu")
+
+
+@dataclass(frozen=True, slots=True)
+class _LoadedIndex:
+    meta: SemanticIndexMeta
+    ann: object
+
+
+class SemanticFaqIndex:
+    """
+    Nearest-neighbour search over precomputed FAQ question embeddings.
+
+    The Annoy index is built offline by scripts/build_faq_embeddings.py and
+    memory-mapped on load, so several bot processes share its pages. A query
+    costs one encoder pass plus an approximate NN lookup.
+
+    The metadata file is written last by the build script, so a change to it
+    reloads the index (see FileReloader); the encoder is kept. If a reload
+    fails, the previous index keeps serving.
+    """
+
+    def __init__(self, *, index_path: str, model_name: str) -> None:
+        try:
+            from annoy import AnnoyIndex  # type: ignore
+        except Exception as exc:
+            raise FaqSemanticError(
+                "Semantic FAQ search needs annoy. Example: pip install annoy"
+            ) from exc
+
+        self._annoy_cls = AnnoyIndex
+        self.index_path = index_path
+        self.model_name = model_name
+        self._indexes: FileReloader[_LoadedIndex] = FileReloader(
+            label="Semantic FAQ index",
+            error=FaqSemanticError,
+            describe=lambda loaded: f"{loaded.meta.items} items",
+        )
+        self._current()
+        self._encoder = load_encoder(model_name)
+        self._encode_lock = threading.Lock()
+
+    @property
+    def meta(self) -> SemanticIndexMeta:
+        """
+        Metadata of the current index, reloading it first if it was rebuilt.
+        """
+        return self._current().meta
+
+    def search(
+        self,
+        query: str,
+        *,
+        k: int,
+        source_hash: str,
+    ) -> list[tuple[int, float]]:
+        """
+        Return up to `k` (item position, cosine similarity) pairs, best first;
+        nothing if the index was not built from the FAQ with `source_hash`.
+        """
+        loaded = self._current()
+        if loaded.meta.source_hash != source_hash:
+            return []
+        with self._encode_lock:
+            vector = self._encoder.encode(query, normalize_embeddings=True)
+        positions, distances = loaded.ann.get_nns_by_vector(  # type: ignore[attr-defined]
+            vector.tolist(),
+            k,
+            include_distances=True,
+        )
+        # Angular distance is sqrt(2 * (1 - cos)) for unit vectors.
+        return [(pos, 1.0 - (d * d) / 2.0) for pos, d in zip(positions, distances)]
+
+    def _current(self) -> _LoadedIndex:
+        return self._indexes.get(
+            self.index_path,
+            meta_path_for(self.index_path),
+            self._load,
+        )
+
+    def _load(self) -> _LoadedIndex:
+        if not Path(self.index_path).exists():
+            raise FaqSemanticError(f"Semantic index not found: {self.index_path}")
+
+        meta = SemanticIndexMeta.read(meta_path_for(self.index_path))
+        if meta.model_name != self.model_name:
+            raise FaqSemanticError(
+                f"Semantic index was built with {meta.model_name}, "
+                f"configured model is {self.model_name}"
+            )
+
+        ann = self._annoy_cls(meta.dimension, "angular")
+        try:
+            ann.load(self.index_path)  # mmap
+        except OSError as exc:
+            raise FaqSemanticError(f"Cannot load semantic index: {self.index_path}") from exc
+        return _LoadedIndex(meta=meta, ann=ann)
+
+
+def build_semantic_index(*, index_path: str, model_name: str) -> SemanticFaqIndex | None:
+    if not index_path:
+        return None
+    try:
+        return SemanticFaqIndex(index_path=index_path, model_name=model_name)
+    except FaqSemanticError:
+        logger.exception("Semantic FAQ search disabled")
+        return None
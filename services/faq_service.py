@@ -1,10 +1,39 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import heapq
 import json
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Container
+from collections.abc import Hashable
+from collections.abc import Sequence
 from dataclasses import dataclass
+from dataclasses import field
 from pathlib import Path
 
+from services.faq_compiled import CompiledFaq
+from services.faq_compiled import CompiledFaqError
+from services.faq_compiled import write_compiled_faq
+from services.faq_ranking import FaqRanker
+from services.faq_ranking import build_faq_ranker
+from services.faq_semantic import SemanticFaqIndex
+from utils.file_reload import FileReloader
+from utils.spelling import SymSpellIndex
 from utils.text_norm import normalize_text
+from utils.text_norm import stem_token
+from utils.text_norm import stemmer_name
+
+
+logger = logging.getLogger(__name__)
+
+# Matches scoring below this are not shown to the user.
+FAQ_MIN_SCORE = 0.34
+
+_MISSING = object()
 
 
 class FaqServiceError(RuntimeError):
@@ -24,57 +53,355 @@ class FaqMatch:
     score: float
 
 
+def _parse_items(raw: object) -> list[FaqItem]:
+    if not isinstance(raw, list):
+        raise FaqServiceError("FAQ JSON must be a list")
+
+    items: list[FaqItem] = []
+    for obj in raw:
+        question = str(obj.get("q", ""))
+        base_keywords = [str(k).strip().casefold() for k in obj.get("keywords", [])]
+        question_tokens = normalize_text(question).tokens
+        merged_keywords = list(dict.fromkeys(base_keywords + question_tokens))
+
+        items.append(
+            FaqItem(
+                question=question,
+                keywords=[k for k in merged_keywords if k],
+                answer=str(obj.get("a", "")),
+            )
+        )
+    return items
+
+
+@dataclass(frozen=True, slots=True)
+class FaqIndex:
+    """
+    Parsed FAQ plus the rankers built over it.
+
+    `documents` holds each item's keywords stemmed and deduplicated; rankers
+    work on those. `speller` maps misspelled query tokens onto the surface
+    keyword vocabulary. Rankers are created on first use. All of it lives as
+    long as this index, i.e. until the FAQ file changes.
+
+    When built from a compiled artifact, items and documents are lazy views
+    over the mapped file and the rankers read its postings directly.
+    """
+
+    items: Sequence[FaqItem]
+    documents: Sequence[Sequence[str]]
+    source_hash: str
+    speller: SymSpellIndex
+    stem_vocabulary: Container[str]
+    compiled: CompiledFaq | None = None
+    _rankers: dict[str, FaqRanker] = field(
+        default_factory=dict,
+        compare=False,
+        repr=False,
+    )
+
+    def ranker(self, name: str) -> FaqRanker:
+        ranker = self._rankers.get(name)
+        if ranker is None and self.compiled is not None:
+            ranker = self.compiled.ranker(name)
+        if ranker is None:
+            ranker = build_faq_ranker(name=name, documents=self.documents)
+        self._rankers[name] = ranker
+        return ranker
+
+    def normalize_query(self, tokens: list[str]) -> list[str]:
+        """
+        Stem query tokens; tokens unknown even after stemming are spell-corrected
+        against the FAQ vocabulary first.
+        """
+        result: list[str] = []
+        for token in tokens:
+            stem = stem_token(token)
+            if stem not in self.stem_vocabulary:
+                corrected = self.speller.correct(token)
+                if corrected is not None:
+                    stem = stem_token(corrected)
+            result.append(stem)
+        return result
+
+
+def _describe_index(index: FaqIndex) -> str:
+    compiled = ", compiled" if index.compiled is not None else ""
+    return f"{len(index.items)} items{compiled}"
+
+
+_indexes: FileReloader[FaqIndex] = FileReloader(
+    label="FAQ",
+    error=FaqServiceError,
+    # A recompiled artifact for the same faq.json must still replace a
+    # runtime-built index.
+    source_hash=lambda index: f"{index.source_hash}:{index.compiled is not None}",
+    describe=_describe_index,
+)
+
+
+class _CompiledItems(Sequence[FaqItem]):
+    def __init__(self, compiled: CompiledFaq) -> None:
+        self._compiled = compiled
+
+    def __len__(self) -> int:
+        return self._compiled.item_count
+
+    def __getitem__(self, pos):  # type: ignore[no-untyped-def, override]
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        question, answer, keywords = self._compiled.item_fields(pos)
+        return FaqItem(question=question, keywords=keywords, answer=answer)
+
+
+def _read_faq_file(path: Path) -> tuple[bytes, str]:
+    if not path.exists():
+        raise FaqServiceError(f"FAQ file not found: {path}")
+    content = path.read_bytes()
+    return content, hashlib.sha256(content).hexdigest()
+
+
+def _surface_vocabulary(items: Sequence[FaqItem]) -> dict[str, int]:
+    vocabulary: dict[str, int] = {}
+    for item in items:
+        for keyword in item.keywords:
+            vocabulary[keyword] = vocabulary.get(keyword, 0) + 1
+    return vocabulary
+
+
+def _build_index(content: bytes, source_hash: str, path: Path) -> FaqIndex:
+    try:
+        raw = json.loads(content.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise FaqServiceError(f"FAQ file is not valid JSON: {path}") from exc
+
+    items = _parse_items(raw)
+    documents = tuple(
+        tuple(dict.fromkeys(stem_token(k) for k in item.keywords)) for item in items
+    )
+
+    return FaqIndex(
+        items=tuple(items),
+        documents=documents,
+        source_hash=source_hash,
+        speller=SymSpellIndex(_surface_vocabulary(items)),
+        stem_vocabulary=frozenset(s for doc in documents for s in doc),
+    )
+
+
+def _load_compiled(compiled_path: str, source_hash: str) -> FaqIndex | None:
+    try:
+        compiled = CompiledFaq(compiled_path)
+    except CompiledFaqError:
+        logger.exception("Compiled FAQ unusable, building index at runtime")
+        return None
+
+    if compiled.source_hash != source_hash or compiled.stemmer != stemmer_name():
+        logger.warning(
+            "Compiled FAQ %s is out of date (source or stemmer changed); "
+            "building index at runtime. Recompile with scripts/compile_faq.py.",
+            compiled_path,
+        )
+        return None
+
+    return FaqIndex(
+        items=_CompiledItems(compiled),
+        documents=compiled.documents,
+        source_hash=source_hash,
+        speller=compiled.speller(),
+        stem_vocabulary=compiled.terms,
+        compiled=compiled,
+    )
+
+
+def _read_index(path: Path, compiled_path: str = "") -> FaqIndex:
+    content, source_hash = _read_faq_file(path)
+    if compiled_path:
+        index = _load_compiled(compiled_path, source_hash)
+        if index is not None:
+            return index
+    return _build_index(content, source_hash, path)
+
+
+def compile_faq(faq_path: str, out_path: str) -> FaqIndex:
+    """
+    Parse `faq_path` and write the compiled artifact for it to `out_path`.
+
+    Keywords are stemmed with the stemmer configured in this process; the
+    artifact records its name and is rejected under a different one.
+    """
+    path = Path(faq_path)
+    content, source_hash = _read_faq_file(path)
+    index = _build_index(content, source_hash, path)
+
+    write_compiled_faq(
+        out_path,
+        items=[(i.question, i.answer, i.keywords) for i in index.items],
+        documents=index.documents,
+        surface_vocabulary=_surface_vocabulary(index.items),
+        source_hash=source_hash,
+        stemmer=stemmer_name(),
+    )
+    return index
+
+
+def get_faq_index(faq_path: str, compiled_path: str = "") -> FaqIndex:
+    """
+    Return the process-wide index for `faq_path`, rebuilding it when the file
+    changes (mtime/size, confirmed by content hash).
+
+    With `compiled_path`, the index is served from that artifact as long as
+    it was compiled from the current file contents; a recompiled artifact is
+    picked up the same way.
+
+    If a reload fails, the previous index keeps serving queries.
+    """
+    path = Path(faq_path)
+    return _indexes.get(
+        (faq_path, compiled_path),
+        path,
+        lambda: _read_index(path, compiled_path),
+        also=[Path(compiled_path)] if compiled_path else [],
+    )
+
+
 @dataclass(slots=True)
 class FaqService:
     faq_path: str
+    ranker: str = "keyword"
+    # Optional artifact from scripts/compile_faq.py; ignored when stale.
+    compiled_path: str = ""
+    # Optional embedding retriever. Its hits count only at or above
+    # `semantic_min_similarity`; the keyword ranker covers everything else.
+    semantic: SemanticFaqIndex | None = None
+    semantic_min_similarity: float = 0.6
+    min_score: float = FAQ_MIN_SCORE
+    # Answers (including "no answer") per normalized token set; dropped as a
+    # whole when the FAQ source hash changes.
+    answer_cache_size: int = 1024
+    answer_cache_hits: int = 0
+    answer_cache_misses: int = 0
+    _answers: OrderedDict[Hashable, FaqMatch | None] = field(
+        default_factory=OrderedDict,
+        repr=False,
+    )
+    _answers_hash: str = ""
+    _answers_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _stale_semantic_hash: str | None = None
 
     def load(self) -> list[FaqItem]:
-        path = Path(self.faq_path)
-        if not path.exists():
-            raise FaqServiceError(f"FAQ file not found: {self.faq_path}")
-
-        raw = json.loads(path.read_text(encoding="utf-8"))
-        if not isinstance(raw, list):
-            raise FaqServiceError("FAQ JSON must be a list")
-
-        items: list[FaqItem] = []
-        for obj in raw:
-            question = str(obj.get("q", ""))
-            base_keywords = [
-                str(k).strip().casefold() for k in obj.get("keywords", [])
-            ]
-            question_tokens = normalize_text(question).tokens
-            merged_keywords = list(dict.fromkeys(base_keywords + question_tokens))
-
-            items.append(
-                FaqItem(
-                    question=question,
-                    keywords=merged_keywords,
-                    answer=str(obj.get("a", "")),
-                )
-            )
-        return items
+        return list(get_faq_index(self.faq_path, self.compiled_path).items)
+
+    def warm_up(self) -> None:
+        """
+        Load the FAQ and build the configured ranker ahead of the first query.
+        """
+        index = get_faq_index(self.faq_path, self.compiled_path)
+        index.ranker(self.ranker)
+        self._semantic_for(index)
+
+    def top_matches(self, *, query: str, k: int = 5) -> list[FaqMatch]:
+        normalized = normalize_text(query)
+        if not normalized.tokens:
+            return []
+
+        index = get_faq_index(self.faq_path, self.compiled_path)
+        tokens = index.normalize_query(normalized.tokens)
+        return self._rank(index, tokens=tokens, text=normalized.text, k=k)
 
     def find_best_answer(self, *, query: str) -> FaqMatch | None:
+        matches = self.top_matches(query=query, k=1)
+        return matches[0] if matches else None
+
+    def find_answer(self, *, query: str) -> FaqMatch | None:
+        """
+        Best match that can be shown to the user (score >= `min_score`,
+        non-empty answer), or None. Results are cached by normalized tokens.
+        """
         normalized = normalize_text(query)
-        token_set = set(normalized.tokens)
-        if not token_set:
+        if not normalized.tokens:
             return None
 
-        best: FaqMatch | None = None
-        for item in self.load():
-            keywords = [k for k in item.keywords if k]
-            if not keywords:
-                continue
+        index = get_faq_index(self.faq_path, self.compiled_path)
+        tokens = index.normalize_query(normalized.tokens)
+        # Rankers ignore token order and repeats; the encoder does not.
+        key: Hashable = frozenset(tokens)
+        if self.semantic is not None:
+            key = (key, normalized.text)
+
+        with self._answers_lock:
+            if self._answers_hash != index.source_hash:
+                self._answers.clear()
+                self._answers_hash = index.source_hash
+            cached = self._answers.get(key, _MISSING)
+            if cached is not _MISSING:
+                self._answers.move_to_end(key)
+                self.answer_cache_hits += 1
+                return cached  # type: ignore[return-value]
+            self.answer_cache_misses += 1
 
-            unique_keywords = list(dict.fromkeys(keywords))
-            found = sum(1 for k in unique_keywords if k in token_set)
-            if found == 0:
-                continue
+        matches = self._rank(index, tokens=tokens, text=normalized.text, k=1)
+        match = matches[0] if matches else None
+        if match is not None and (match.score < self.min_score or not match.item.answer):
+            match = None
 
-            score = found / len(unique_keywords)
-            if best is None or score > best.score:
-                best = FaqMatch(item=item, score=score)
+        with self._answers_lock:
+            if self._answers_hash == index.source_hash:
+                self._answers[key] = match
+                if len(self._answers) > self.answer_cache_size:
+                    self._answers.popitem(last=False)
+        return match
 
-        return best
+    def _rank(
+        self,
+        index: FaqIndex,
+        *,
+        tokens: list[str],
+        text: str,
+        k: int,
+    ) -> list[FaqMatch]:
+        scores = dict(index.ranker(self.ranker).top_k(tokens, k=k))
 
+        semantic = self._semantic_for(index)
+        if semantic is not None:
+            hits = semantic.search(text, k=k, source_hash=index.source_hash)
+            for pos, similarity in hits:
+                if similarity < self.semantic_min_similarity:
+                    continue
+                if similarity > scores.get(pos, 0.0):
+                    scores[pos] = similarity
+
+        ranked = heapq.nsmallest(k, scores.items(), key=lambda p: (-p[1], p[0]))
+        return [FaqMatch(item=index.items[pos], score=score) for pos, score in ranked]
+
+    async def find_answer_async(self, *, query: str) -> FaqMatch | None:
+        """
+        Same as find_answer; runs in a thread when the semantic encoder is
+        enabled, so the event loop is not blocked by the model.
+        """
+        if self.semantic is None:
+            return self.find_answer(query=query)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(self.find_answer, query=query),
+        )
+
+    def _semantic_for(self, index: FaqIndex) -> SemanticFaqIndex | None:
+        semantic = self.semantic
+        if semantic is None:
+            return None
+        if semantic.meta.source_hash == index.source_hash:
+            return semantic
+
+        if self._stale_semantic_hash != index.source_hash:
+            self._stale_semantic_hash = index.source_hash
+            logger.warning(
+                "Semantic FAQ index does not match %s; rebuild it with "
+                "scripts/build_faq_embeddings.py. Using keyword search only.",
+                self.faq_path,
+            )
+        return None
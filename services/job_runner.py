@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from collections.abc import Awaitable
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.exceptions import TelegramServerError
+
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+# Broadcasts: behind everything else.
+PRIORITY_BULK = 30
+
+# Backoff before retrying after a network/5xx error: 1 s, 2 s, 4 s...
+RETRY_BASE_DELAY_S = 1.0
+
+Job = Callable[[], Awaitable[None]]
+
+# Priority of the job running in the current task, None outside jobs; the
+# outbound limiter uses it to order messages.
+current_priority: ContextVar[int | None] = ContextVar("current_priority", default=None)
+
+
+@dataclass(slots=True)
+class JobRunner:
+    """
+    Background jobs on a fixed pool of worker tasks, by priority then FIFO.
+
+    Jobs failing with a transient Telegram error (network, 5xx) are retried
+    up to `max_attempts` times; any other exception is logged and the job is
+    dropped. Flood control is not retried here: OutboundLimiter has already
+    waited it out for every request, so a job still failing with it gives up. Jobs submitted with `track=False` are run
+    once and left out of the counters: they schedule other work (see
+    PracticeQueue) that goes through `run_job` itself. `close` lets the queue drain for up to
+    `drain_timeout` seconds before stopping the workers.
+    """
+
+    workers: int = 2
+    max_attempts: int = 3
+    drain_timeout: float = 30.0
+    completed: int = 0
+    failed: int = 0
+    retried: int = 0
+    _queue: asyncio.PriorityQueue[tuple[int, int, str, Job, bool]] = field(
+        default_factory=asyncio.PriorityQueue
+    )
+    _seq: itertools.count = field(default_factory=itertools.count)
+    _tasks: list[asyncio.Task[None]] = field(default_factory=list)
+    _closed: bool = False
+
+    @property
+    def depth(self) -> int:
+        """
+        Jobs waiting for a worker.
+        """
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(max(self.workers, 1))
+        ]
+
+    def submit(
+        self,
+        job: Job,
+        *,
+        priority: int = PRIORITY_NORMAL,
+        name: str = "job",
+        track: bool = True,
+    ) -> bool:
+        """
+        Queue `job`; False once the runner is closed.
+        """
+        if self._closed:
+            logger.warning("Job runner is closed, dropped job %s", name)
+            return False
+        self._queue.put_nowait((priority, next(self._seq), name, job, track))
+        return True
+
+    async def run_job(self, job: Job, *, name: str = "job") -> None:
+        """
+        Run `job` now with the retry policy; never raises except on cancel.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await job()
+                self.completed += 1
+                return
+            except (TelegramNetworkError, TelegramServerError) as exc:
+                delay = RETRY_BASE_DELAY_S * 2 ** (attempt - 1)
+                error = exc
+            except Exception:
+                logger.exception("Job %s failed", name)
+                self.failed += 1
+                return
+
+            if attempt == self.max_attempts:
+                break
+            logger.warning(
+                "Job %s: %s, retry %d in %.0f s",
+                name,
+                error,
+                attempt,
+                delay,
+            )
+            self.retried += 1
+            await asyncio.sleep(delay)
+
+        logger.error("Job %s gave up after %d attempts", name, self.max_attempts)
+        self.failed += 1
+
+    async def close(self) -> None:
+        """
+        Wait for queued jobs (they may still queue follow-ups, e.g. replies),
+        then stop the workers. Call after polling has stopped.
+        """
+        if not self._tasks:
+            self._closed = True
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Job runner drain timed out, %d jobs not started",
+                self.depth,
+            )
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            priority, _seq, name, job, track = await self._queue.get()
+            token = current_priority.set(priority)
+            try:
+                if track:
+                    await self.run_job(job, name=name)
+                else:
+                    try:
+                        await job()
+                    except Exception:
+                        logger.exception("Job %s failed", name)
+            finally:
+                current_priority.reset(token)
+                self._queue.task_done()
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import TYPE_CHECKING
+from typing import Any
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from services.job_runner import PRIORITY_BULK
+from services.job_runner import PRIORITY_LOW
+from services.job_runner import PRIORITY_NORMAL
+from services.job_runner import current_priority
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+logger = logging.getLogger(__name__)
+
+# Messages a chat may get back to back before its rate applies (Telegram
+# tolerates short bursts per chat). The global rate is paced evenly: a burst
+# on top of it would exceed the per-second ceiling.
+CHAT_BURST = 3.0
+
+# Methods that deliver a message to a chat and count against flood limits.
+_SEND_METHODS = frozenset({"CopyMessage", "CopyMessages", "ForwardMessage", "ForwardMessages"})
+
+
+def _is_message_send(method: TelegramMethod[Any]) -> bool:
+    name = type(method).__name__
+    if name == "SendChatAction":
+        return False
+    return name.startswith("Send") or name in _SEND_METHODS
+
+
+@dataclass(slots=True)
+class _Bucket:
+    rate: float
+    capacity: float
+    tokens: float
+    updated: float
+    paused_until: float = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        Seconds until a token is available (0 if one is available now).
+        """
+        self._refill(now)
+        wait = max(self.paused_until - now, 0.0)
+        if self.tokens < 1.0:
+            wait = max(wait, (1.0 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+@dataclass(slots=True)
+class _ChatLane:
+    bucket: _Bucket
+    # Sends to one chat go one at a time, so they arrive in order.
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
+
+
+class OutboundLimiter(BaseRequestMiddleware):
+    """
+    Bot session middleware that paces outgoing messages under Telegram's
+    flood limits.
+
+    Every message send waits for its chat's bucket (private chats
+    `chat_rate` per second, groups `group_rate_per_min` per minute), then
+    for a token of the global bucket (`global_rate` per second). Global
+    tokens go to the lowest priority value first: the running job's
+    priority, else PRIORITY_LOW for the operator chat and PRIORITY_NORMAL
+    for everyone else. A flood-control error pauses that chat for
+    `retry_after` seconds and the send is repeated up to `max_retries`
+    times. Other API calls skip the buckets but wait out flood control the
+    same way. This is the only place flood errors are retried: JobRunner
+    does not repeat a job that still gets one.
+
+    `operator_share` scales the operator chat's bucket: under supervisor.py
+    every worker sends ticket notifications there, so each gets 1/N of it.
+    With `bulk_rate`, PRIORITY_BULK sends (broadcasts) take tokens from a
+    bucket of that rate instead of the global one: supervisor.py gives the
+    broadcasting worker the share of the global rate it holds back from the
+    others.
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        group_rate_per_min: float = 20.0,
+        max_retries: int = 3,
+        operator_chat_id: int | None = None,
+        operator_share: float = 1.0,
+        bulk_rate: float | None = None,
+    ) -> None:
+        if min(global_rate, chat_rate, group_rate_per_min, operator_share) <= 0:
+            raise ValueError("Outbound rates must be positive")
+        if bulk_rate is not None and bulk_rate <= 0:
+            raise ValueError("Outbound rates must be positive")
+        self._chat_rate = chat_rate
+        self._group_rate = group_rate_per_min / 60
+        self._max_retries = max_retries
+        self._operator_chat_id = operator_chat_id
+        self._operator_share = min(operator_share, 1.0)
+        self._global = _Bucket(
+            rate=global_rate,
+            capacity=1.0,
+            tokens=1.0,
+            updated=time.monotonic(),
+        )
+        self._bulk = (
+            None
+            if bulk_rate is None
+            else _Bucket(rate=bulk_rate, capacity=1.0, tokens=1.0, updated=time.monotonic())
+        )
+        # Bulk sends take bulk tokens one at a time, in arrival order.
+        self._bulk_lock = asyncio.Lock()
+        self._bulk_waiting = 0
+        self._chats: dict[int | str, _ChatLane] = {}
+        self._sweep_at = 1024
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def waiting(self) -> int:
+        """
+        Sends waiting for a global (or bulk) token.
+        """
+        return len(self._waiters) + self._bulk_waiting
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not _is_message_send(method):
+            return await self._pass_through(make_request, bot, method)
+
+        priority = current_priority.get()
+        if priority is None:
+            priority = PRIORITY_LOW if chat_id == self._operator_chat_id else PRIORITY_NORMAL
+
+        lane = self._lane(chat_id)
+        lane.users += 1
+        try:
+            async with lane.lock:
+                attempt = 0
+                while True:
+                    delay = lane.bucket.wait_time(time.monotonic())
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    lane.bucket.take(time.monotonic())
+                    if self._bulk is not None and priority >= PRIORITY_BULK:
+                        await self._acquire_bulk()
+                    else:
+                        await self._acquire_global(priority)
+                    try:
+                        response = await make_request(bot, method)
+                    except TelegramRetryAfter as exc:
+                        lane.bucket.paused_until = time.monotonic() + exc.retry_after
+                        if attempt == self._max_retries:
+                            self.failed += 1
+                            raise
+                        attempt += 1
+                        self.retried += 1
+                        logger.warning(
+                            "Flood control in chat %s, retry in %s s",
+                            chat_id,
+                            exc.retry_after,
+                        )
+                        continue
+                    self.sent += 1
+                    return response
+        finally:
+            lane.users -= 1
+            if lane.users == 0 and lane.bucket.is_full(time.monotonic()):
+                self._chats.pop(chat_id, None)
+
+    async def _pass_through(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        attempt = 0
+        while True:
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                if attempt == self._max_retries:
+                    raise
+                attempt += 1
+                logger.warning(
+                    "Flood control on %s, retry in %s s",
+                    type(method).__name__,
+                    exc.retry_after,
+                )
+                await asyncio.sleep(exc.retry_after)
+
+    def _lane(self, chat_id: int | str) -> _ChatLane:
+        lane = self._chats.get(chat_id)
+        if lane is not None:
+            return lane
+        if len(self._chats) >= self._sweep_at:
+            self._sweep()
+        if isinstance(chat_id, int) and chat_id > 0:
+            rate = self._chat_rate
+        else:
+            rate = self._group_rate
+        capacity = CHAT_BURST
+        if chat_id == self._operator_chat_id:
+            rate *= self._operator_share
+            # At least one whole token, or the bucket never lets a send through.
+            capacity = max(CHAT_BURST * self._operator_share, 1.0)
+        lane = self._chats[chat_id] = _ChatLane(
+            bucket=_Bucket(
+                rate=rate,
+                capacity=capacity,
+                tokens=capacity,
+                updated=time.monotonic(),
+            )
+        )
+        return lane
+
+    def _sweep(self) -> None:
+        # Idle chats whose bucket has refilled carry no state worth keeping.
+        now = time.monotonic()
+        for chat_id, lane in list(self._chats.items()):
+            if lane.users == 0 and lane.bucket.is_full(now):
+                del self._chats[chat_id]
+        self._sweep_at = max(1024, len(self._chats) * 2)
+
+    async def _acquire_bulk(self) -> None:
+        assert self._bulk is not None
+        self._bulk_waiting += 1
+        try:
+            async with self._bulk_lock:
+                delay = self._bulk.wait_time(time.monotonic())
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._bulk.take(time.monotonic())
+        finally:
+            self._bulk_waiting -= 1
+
+    async def _acquire_global(self, priority: int) -> None:
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._timer is None:
+            self._grant()
+        await future
+
+    def _grant(self) -> None:
+        # Hands out global tokens in priority order; re-arms itself while
+        # sends are waiting instead of keeping a background task alive.
+        self._timer = None
+        while self._waiters:
+            now = time.monotonic()
+            delay = self._global.wait_time(now)
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._grant)
+                return
+            _priority, _seq, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._global.take(now)
+            future.set_result(None)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from services.practice_queue import PracticeQueue
+from services.speech.base import SpeechRecognizer
+from services.speech.base import SpeechRecognizerError
+
+
+logger = logging.getLogger(__name__)
+
+# Degradation steps, each entered at that multiple of the thresholds.
+LEVEL_NORMAL = 0
+LEVEL_LIGHT_MODEL = 1
+LEVEL_SHORT_AUDIO = 2
+LEVEL_REJECT = 3
+
+# A level is left only once pressure drops this far below its entry point,
+# so the bot does not flap between steps around a threshold.
+HYSTERESIS = 0.25
+
+# Weight of the newest transcription in the latency average.
+LATENCY_EWMA_ALPHA = 0.2
+
+
+@dataclass(slots=True)
+class OverloadController:
+    """
+    Sheds practice load when transcription cannot keep up.
+
+    Pressure is the larger of the answers queued or being recognized
+    (PracticeQueue.depth) over `queue_depth` and the average transcription
+    time over `latency_ms`; the latter counts only while answers are
+    waiting. At pressure 1 answers go to `light_recognizer` (a smaller
+    model, loaded by `load_light_model` at startup), at 2 audio is also cut
+    to `max_voice_seconds`, at 3 new answers are turned away until the
+    backlog drains.
+    """
+
+    practice_queue: PracticeQueue
+    queue_depth: int = 10
+    latency_ms: float = 10_000.0
+    light_recognizer: SpeechRecognizer | None = None
+    max_voice_seconds: int = 10
+    level: int = LEVEL_NORMAL
+    latency_ewma_ms: float = 0.0
+    admitted: int = 0
+    rejected: int = 0
+    light_model: int = 0
+    clipped: int = 0
+
+    async def load_light_model(self) -> None:
+        """
+        Load the light model now, so switching to it under load does not
+        stall the bot; without a working one the step is skipped.
+        """
+        if self.light_recognizer is None:
+            return
+        try:
+            await self.light_recognizer.warm_up()
+        except SpeechRecognizerError as exc:
+            logger.warning("Light speech model unavailable, overload keeps the main one: %s", exc)
+            self.light_recognizer = None
+
+    @property
+    def pressure(self) -> float:
+        depth = self.practice_queue.depth
+        pressure = depth / max(self.queue_depth, 1)
+        if depth:
+            pressure = max(pressure, self.latency_ewma_ms / max(self.latency_ms, 1.0))
+        return pressure
+
+    def update(self) -> int:
+        """
+        Re-evaluate the level from the current pressure and return it.
+        """
+        pressure = self.pressure
+        level = min(int(pressure), LEVEL_REJECT)
+        if level < self.level and pressure >= self.level - HYSTERESIS:
+            level = self.level
+        if level != self.level:
+            logger.warning(
+                "Practice overload level %d -> %d (pressure %.2f, depth %d, "
+                "transcribe %.0f ms)",
+                self.level,
+                level,
+                pressure,
+                self.practice_queue.depth,
+                self.latency_ewma_ms,
+            )
+            self.level = level
+        return level
+
+    def admit(self) -> bool:
+        """
+        Whether a new voice answer may be queued.
+        """
+        if self.update() >= LEVEL_REJECT:
+            self.rejected += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def pick_recognizer(self, default: SpeechRecognizer) -> SpeechRecognizer:
+        if self.light_recognizer is not None and self.update() >= LEVEL_LIGHT_MODEL:
+            self.light_model += 1
+            return self.light_recognizer
+        return default
+
+    def max_seconds(self, duration_s: int) -> int | None:
+        """
+        Length to cut an answer of `duration_s` seconds to, None to keep it.
+        """
+        if duration_s > self.max_voice_seconds and self.update() >= LEVEL_SHORT_AUDIO:
+            self.clipped += 1
+            return self.max_voice_seconds
+        return None
+
+    def record_latency(self, transcribe_ms: float) -> None:
+        if self.latency_ewma_ms == 0.0:
+            self.latency_ewma_ms = transcribe_ms
+        else:
+            self.latency_ewma_ms += LATENCY_EWMA_ALPHA * (transcribe_ms - self.latency_ewma_ms)
+        self.update()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+
+from storage.repositories import Repositories
+
+
+logger = logging.getLogger(__name__)
+
+# Archive rows dropped per round trip while making room.
+_EVICT_BATCH = 64
+
+
+@dataclass(slots=True)
+class PracticeArchive:
+    """
+    Opt-in, size-capped archive of practice voice answers.
+
+    Telegram voice notes are already OGG/Opus, so the downloaded file is
+    copied as is, named after its practice_attempts id. Once the archive
+    would exceed `max_bytes`, the oldest answers are deleted first. The used
+    size is re-read for every answer from a running total that SQLite
+    triggers keep in step with the archive rows, so processes sharing the
+    database (supervisor.py) see each other's writes; concurrent stores in
+    different processes can still overshoot the cap by about one answer
+    each. Archiving is best effort: failures are logged and never reach the
+    user.
+    """
+
+    repos: Repositories
+    archive_dir: str = ""
+    max_bytes: int = 0
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.archive_dir) and self.max_bytes > 0
+
+    async def store(self, *, attempt_id: int, source_path: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self._store(attempt_id=attempt_id, source_path=source_path)
+        except Exception:
+            logger.exception("Failed to archive practice answer %s", attempt_id)
+
+    async def _store(self, *, attempt_id: int, source_path: str) -> None:
+        size = os.path.getsize(source_path)
+        if size > self.max_bytes:
+            return
+
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        rel_path = f"{day}/{attempt_id}.ogg"
+        target = Path(self.archive_dir) / rel_path
+
+        async with self._lock:
+            used_bytes = await self.repos.get_archive_size()
+            while used_bytes + size > self.max_bytes:
+                evicted = await self.repos.pop_oldest_archived(limit=_EVICT_BATCH)
+                if not evicted:
+                    break
+                for path, evicted_size in evicted:
+                    used_bytes -= evicted_size
+                    (Path(self.archive_dir) / path).unlink(missing_ok=True)
+
+            await asyncio.to_thread(_copy, source_path, target)
+            await self.repos.add_archived_answer(
+                attempt_id=attempt_id,
+                path=rel_path,
+                size_bytes=size,
+            )
+
+
+def _copy(source_path: str, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source_path, target)
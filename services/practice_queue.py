@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from dataclasses import field
+
+from services.job_runner import PRIORITY_NORMAL
+from services.job_runner import Job
+from services.job_runner import JobRunner
+
+
+@dataclass(slots=True)
+class _Lane:
+    # Newest answer not started yet; a newer one replaces it.
+    pending: Job | None = None
+    # A lane job is queued in the runner or running.
+    scheduled: bool = False
+    task: asyncio.Task[None] | None = None
+
+
+@dataclass(slots=True)
+class PracticeQueue:
+    """
+    Feeds practice answer jobs to the JobRunner, one at a time per user.
+
+    While a user's job is queued or running, newer answers replace the one
+    waiting behind it (superseded), so at most one job per user occupies a
+    worker. `cancel` stops the running job and drops the waiting one, e.g.
+    when the user moves on to another phrase.
+    """
+
+    runner: JobRunner
+    processed: int = 0
+    superseded: int = 0
+    cancelled: int = 0
+    _lanes: dict[int, _Lane] = field(default_factory=dict)
+
+    @property
+    def depth(self) -> int:
+        """
+        Users with an answer queued or being processed.
+        """
+        return len(self._lanes)
+
+    def submit(self, *, user_id: int, job: Job) -> None:
+        lane = self._lanes.get(user_id)
+        if lane is None:
+            lane = self._lanes[user_id] = _Lane()
+        if lane.pending is not None:
+            self.superseded += 1
+        lane.pending = job
+        if not lane.scheduled:
+            lane.scheduled = True
+            self._schedule(user_id)
+
+    def cancel(self, user_id: int) -> None:
+        """
+        Cancel the user's running job and drop the waiting one.
+        """
+        lane = self._lanes.get(user_id)
+        if lane is None:
+            return
+        if lane.pending is not None:
+            lane.pending = None
+            self.cancelled += 1
+        if lane.task is not None:
+            lane.task.cancel()
+
+    def _schedule(self, user_id: int) -> None:
+        # Each answer goes to the back of the runner queue, so a user sending
+        # voice after voice does not hold a worker against everyone else. The
+        # lane step itself is untracked: the answer job inside it is retried
+        # and counted by run_job.
+        if not self.runner.submit(
+            lambda: self._run_next(user_id),
+            priority=PRIORITY_NORMAL,
+            name=f"practice:{user_id}",
+            track=False,
+        ):
+            self._lanes.pop(user_id, None)
+
+    async def _run_next(self, user_id: int) -> None:
+        lane = self._lanes.get(user_id)
+        if lane is None:
+            return
+        job, lane.pending = lane.pending, None
+        try:
+            if job is None:
+                return
+            task = asyncio.ensure_future(self.runner.run_job(job, name="practice"))
+            lane.task = task
+            try:
+                # wait() keeps the job's own cancellation from cancelling the
+                # worker that runs it.
+                await asyncio.wait((task,))
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                lane.task = None
+            if task.cancelled():
+                self.cancelled += 1
+            else:
+                self.processed += 1
+        finally:
+            if lane.pending is not None:
+                self._schedule(user_id)
+            else:
+                lane.scheduled = False
+                self._lanes.pop(user_id, None)
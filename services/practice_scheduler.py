@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
+
+from services.practice_service import AnyPracticeCatalog
+from services.practice_service import PracticePhrase
+from storage.repositories import Repositories
+
+
+# Interval after the first good answer; later ones grow by `ease`.
+FIRST_INTERVAL_S = 10 * 60
+# A failed or skipped phrase comes back after this long.
+RETRY_INTERVAL_S = 60
+MAX_INTERVAL_S = 60 * 24 * 3600
+
+START_EASE = 2.5
+MIN_EASE = 1.3
+MAX_EASE = 3.0
+
+GOOD_SCORE = 0.8
+FAIR_SCORE = 0.5
+
+
+@dataclass(slots=True)
+class _Card:
+    due_at: int
+    interval_s: int
+    ease: float
+    reps: int
+
+
+@dataclass(slots=True)
+class _UserQueue:
+    """
+    One user's cards plus a min-heap of (due_at, phrase_id).
+
+    Rescheduling pushes a new heap entry instead of moving the old one; stale
+    entries (due_at no longer matching the card) are dropped when they reach
+    the top, and the heap is rebuilt if they pile up.
+    """
+
+    next_pos: int
+    cards: dict[str, _Card] = field(default_factory=dict)
+    heap: list[tuple[int, str]] = field(default_factory=list)
+
+    def push(self, phrase_id: str, card: _Card) -> None:
+        self.cards[phrase_id] = card
+        heapq.heappush(self.heap, (card.due_at, phrase_id))
+        if len(self.heap) > 2 * len(self.cards) + 16:
+            self.heap = [(c.due_at, pid) for pid, c in self.cards.items()]
+            heapq.heapify(self.heap)
+
+    def drop(self, phrase_id: str) -> None:
+        self.cards.pop(phrase_id, None)
+
+    def peek(self) -> tuple[int, str] | None:
+        heap = self.heap
+        while heap:
+            due_at, phrase_id = heap[0]
+            card = self.cards.get(phrase_id)
+            if card is not None and card.due_at == due_at:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+
+@dataclass(slots=True)
+class PracticeScheduler:
+    """
+    Spaced-repetition choice of the next practice phrase per user.
+
+    Due phrases come first (earliest due first), then never-seen phrases in
+    catalog order, then the earliest not-yet-due one. A never-seen phrase
+    gets a card due immediately when it is served, so it is repeated until
+    `record_result` or `postpone` reschedules it. Each user's queue is
+    loaded from SQLite on first use, kept in an LRU of `max_users`, and
+    written through on every change, so eviction loses nothing.
+    """
+
+    repos: Repositories
+    max_users: int = 10_000
+    _queues: OrderedDict[int, _UserQueue] = field(default_factory=OrderedDict)
+    _load_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    async def next_phrase(
+        self,
+        *,
+        user_id: int,
+        catalog: AnyPracticeCatalog,
+        now: int | None = None,
+    ) -> PracticePhrase:
+        now = int(time.time()) if now is None else now
+        queue = await self._queue(user_id)
+
+        while True:
+            top = queue.peek()
+            if top is None or top[0] > now:
+                break
+            phrase = catalog.get(top[1])
+            if phrase is not None:
+                return phrase
+            # Removed from the catalog.
+            queue.drop(top[1])
+
+        pos = queue.next_pos
+        while pos < len(catalog) and catalog.at(pos).phrase_id in queue.cards:
+            pos += 1
+        if pos < len(catalog):
+            phrase = catalog.at(pos)
+            queue.next_pos = pos + 1
+            await self.repos.save_practice_cursor(user_id=user_id, next_pos=pos + 1)
+            if phrase.phrase_id:
+                # Due at once until answered or skipped, so a phrase abandoned
+                # mid-attempt (/practice again, exit, failed ASR) comes back.
+                await self._save(
+                    user_id,
+                    queue,
+                    phrase.phrase_id,
+                    _Card(due_at=now, interval_s=0, ease=START_EASE, reps=0),
+                )
+            return phrase
+
+        # Everything has been seen and nothing is due: earliest upcoming.
+        while True:
+            top = queue.peek()
+            if top is None:
+                return catalog.at(0)
+            phrase = catalog.get(top[1])
+            if phrase is not None:
+                return phrase
+            queue.drop(top[1])
+
+    async def record_result(
+        self,
+        *,
+        user_id: int,
+        phrase_id: str,
+        score: float,
+        now: int | None = None,
+    ) -> None:
+        now = int(time.time()) if now is None else now
+        queue = await self._queue(user_id)
+        card = queue.cards.get(phrase_id)
+        if card is None:
+            card = _Card(due_at=now, interval_s=0, ease=START_EASE, reps=0)
+
+        if score >= GOOD_SCORE:
+            reps = card.reps + 1
+            interval = (
+                FIRST_INTERVAL_S if reps == 1 else int(card.interval_s * card.ease)
+            )
+            ease = min(card.ease + 0.1, MAX_EASE)
+        elif score >= FAIR_SCORE:
+            reps = card.reps
+            interval = max(FIRST_INTERVAL_S // 2, card.interval_s // 2)
+            ease = max(card.ease - 0.15, MIN_EASE)
+        else:
+            reps = 0
+            interval = RETRY_INTERVAL_S
+            ease = max(card.ease - 0.2, MIN_EASE)
+
+        interval = min(interval, MAX_INTERVAL_S)
+        await self._save(
+            user_id,
+            queue,
+            phrase_id,
+            _Card(due_at=now + interval, interval_s=interval, ease=ease, reps=reps),
+        )
+
+    async def postpone(
+        self,
+        *,
+        user_id: int,
+        phrase_id: str,
+        now: int | None = None,
+    ) -> None:
+        """
+        The user skipped the phrase: show it again after RETRY_INTERVAL_S.
+
+        A phrase already answered keeps the later due time `record_result`
+        gave it, so skipping after a good answer does not undo the interval.
+        """
+        now = int(time.time()) if now is None else now
+        queue = await self._queue(user_id)
+        card = queue.cards.get(phrase_id)
+        if card is None:
+            card = _Card(due_at=now, interval_s=0, ease=START_EASE, reps=0)
+        await self._save(
+            user_id,
+            queue,
+            phrase_id,
+            _Card(
+                due_at=max(card.due_at, now + RETRY_INTERVAL_S),
+                interval_s=card.interval_s,
+                ease=card.ease,
+                reps=card.reps,
+            ),
+        )
+
+    async def _save(
+        self,
+        user_id: int,
+        queue: _UserQueue,
+        phrase_id: str,
+        card: _Card,
+    ) -> None:
+        queue.push(phrase_id, card)
+        await self.repos.save_practice_card(
+            user_id=user_id,
+            phrase_id=phrase_id,
+            due_at=card.due_at,
+            interval_s=card.interval_s,
+            ease=card.ease,
+            reps=card.reps,
+        )
+
+    async def _queue(self, user_id: int) -> _UserQueue:
+        queue = self._queues.get(user_id)
+        if queue is not None:
+            self._queues.move_to_end(user_id)
+            return queue
+
+        async with self._load_lock:
+            queue = self._queues.get(user_id)
+            if queue is not None:
+                return queue
+
+            next_pos, rows = await self.repos.get_practice_schedule(user_id=user_id)
+            queue = _UserQueue(next_pos=next_pos)
+            for phrase_id, due_at, interval_s, ease, reps in rows:
+                queue.cards[phrase_id] = _Card(
+                    due_at=due_at,
+                    interval_s=interval_s,
+                    ease=ease,
+                    reps=reps,
+                )
+            queue.heap = [(c.due_at, pid) for pid, c in queue.cards.items()]
+            heapq.heapify(queue.heap)
+
+            self._queues[user_id] = queue
+            if len(self._queues) > self.max_users:
+                self._queues.popitem(last=False)
+            return queue
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from utils.spelling import delete_variants
+from utils.spelling import edit_distance
+from utils.spelling import max_typos
+from utils.text_norm import stem_token
+
+
+_VOWELS = frozenset("aeiou")
+
+
+def _vowels(word: str) -> str:
+    return "".join(ch for ch in word if ch in _VOWELS)
+
+
+class KeywordMatcher:
+    """
+    Precomputed keyword variants of one phrase, for ASR-tolerant scoring.
+
+    Every variant (surface form, stem) maps to a bitmask of the keywords it
+    stands for, so a transcript is matched against all keywords at once: one
+    dict lookup per transcript variant, OR-ed into a single int. Typos are
+    caught through symmetric-delete keys and confirmed with a bounded edit
+    distance; the vowels must still match, since in pronunciation practice
+    "cut" for "cat" or "live" for "love" is exactly the error to report.
+    Adjacent transcript tokens are also tried joined ("to day" -> "today").
+    """
+
+    __slots__ = ("keywords", "_exact", "_deletes", "_full")
+
+    def __init__(self, keywords: Sequence[str], keyword_stems: Sequence[str]) -> None:
+        self.keywords = tuple(keywords)
+        exact: dict[str, int] = {}
+        deletes: dict[str, int] = {}
+        for i, (keyword, stem) in enumerate(zip(self.keywords, keyword_stems)):
+            bit = 1 << i
+            for key in (keyword, stem):
+                if key:
+                    exact[key] = exact.get(key, 0) | bit
+            for variant in delete_variants(keyword, max_typos(keyword)) | {keyword}:
+                deletes[variant] = deletes.get(variant, 0) | bit
+        self._exact = exact
+        self._deletes = deletes
+        self._full = (1 << len(self.keywords)) - 1
+
+    def match(self, tokens: Sequence[str]) -> int:
+        """
+        Bitmask of keywords found among transcript `tokens`.
+        """
+        candidates = list(tokens)
+        candidates += [a + b for a, b in zip(tokens, tokens[1:])]
+
+        exact = self._exact
+        found = 0
+        unmatched: list[str] = []
+        for token in candidates:
+            bits = exact.get(token, 0) | exact.get(stem_token(token), 0)
+            if bits:
+                found |= bits
+            else:
+                unmatched.append(token)
+        if found == self._full:
+            return found
+
+        deletes = self._deletes
+        for token in unmatched:
+            limit = max_typos(token)
+            if limit == 0:
+                continue
+            for variant in delete_variants(token, limit) | {token}:
+                bits = deletes.get(variant, 0) & ~found
+                while bits:
+                    low = bits & -bits
+                    bits ^= low
+                    keyword = self.keywords[low.bit_length() - 1]
+                    allowed = max_typos(keyword)
+                    if (
+                        allowed
+                        and _vowels(token) == _vowels(keyword)
+                        and edit_distance(token, keyword, allowed) <= allowed
+                    ):
+                        found |= low
+            if found == self._full:
+                break
+        return found
+
+    def split(self, found: int) -> tuple[list[str], list[str]]:
+        """
+        (found keywords, missing keywords) for a `match` result, in order.
+        """
+        hit: list[str] = []
+        missed: list[str] = []
+        for i, keyword in enumerate(self.keywords):
+            (hit if found >> i & 1 else missed).append(keyword)
+        return hit, missed
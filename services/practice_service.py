@@ -1,10 +1,26 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import logging
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Iterator
+from collections.abc import Sequence
 from dataclasses import dataclass
+from dataclasses import field
 from pathlib import Path
 
+from services.practice_scoring import KeywordMatcher
+from utils.file_reload import FileReloader
 from utils.text_norm import normalize_text
+from utils.text_norm import stem_token
+from utils.text_norm import stem_tokens
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
 
 
 class PracticeServiceError(RuntimeError):
@@ -16,7 +32,13 @@ class PracticePhrase:
     phrase_id: str
     file_path: str
     expected_text: str
-    keywords: list[str]
+    keywords: tuple[str, ...]
+    # Stems of `keywords` (cleaned, deduplicated, same order) and their set,
+    # computed once at load time.
+    keyword_stems: tuple[str, ...] = ()
+    keyword_stem_set: frozenset[str] = frozenset()
+    # Variant index for fuzzy scoring (see practice_scoring).
+    matcher: KeywordMatcher | None = field(default=None, compare=False, repr=False)
 
 
 @dataclass(frozen=True, slots=True)
@@ -26,51 +48,328 @@ class PracticeScore:
     missing_keywords: list[str]
 
 
+@dataclass(frozen=True, slots=True)
+class PracticeCatalog:
+    """
+    Immutable snapshot of the practice sets: phrases by position and by id.
+    """
+
+    phrases: tuple[PracticePhrase, ...]
+    source_hash: str
+    _positions: dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def at(self, idx: int) -> PracticePhrase:
+        return self.phrases[idx % len(self.phrases)]
+
+    def position(self, phrase_id: str) -> int | None:
+        return self._positions.get(phrase_id)
+
+    def get(self, phrase_id: str) -> PracticePhrase | None:
+        pos = self._positions.get(phrase_id)
+        return None if pos is None else self.phrases[pos]
+
+    def __iter__(self) -> Iterator[PracticePhrase]:
+        return iter(self.phrases)
+
+
+@dataclass(frozen=True, slots=True)
+class PracticeShard:
+    shard_id: str
+    level: str
+    topic: str
+    path: Path
+    sha256: str
+    phrase_ids: tuple[str, ...]
+
+
+class ShardedPracticeCatalog:
+    """
+    Catalog over a manifest of per-level/topic shard files.
+
+    Only the manifest (shard list and phrase ids) is read up front. A shard
+    is parsed on first access and kept in an LRU of `max_loaded_shards`, so
+    memory stays bounded however large the library grows. Positions run
+    through the shards in manifest order, like one flat list would.
+    """
+
+    def __init__(
+        self,
+        *,
+        shards: Sequence[PracticeShard],
+        source_hash: str,
+        max_loaded_shards: int,
+    ) -> None:
+        self.shards = tuple(shards)
+        self.source_hash = source_hash
+        self._max_loaded = max(1, max_loaded_shards)
+        self._starts: list[int] = []
+        total = 0
+        for shard in self.shards:
+            self._starts.append(total)
+            total += len(shard.phrase_ids)
+        self._total = total
+        self._loaded: OrderedDict[int, tuple[PracticePhrase, ...]] = OrderedDict()
+        self._positions: dict[str, int] | None = None
+
+    def __len__(self) -> int:
+        return self._total
+
+    def at(self, idx: int) -> PracticePhrase:
+        idx %= self._total
+        shard_no = bisect_right(self._starts, idx) - 1
+        return self._shard(shard_no)[idx - self._starts[shard_no]]
+
+    def position(self, phrase_id: str) -> int | None:
+        if self._positions is None:
+            positions: dict[str, int] = {}
+            for shard, start in zip(self.shards, self._starts):
+                for offset, pid in enumerate(shard.phrase_ids):
+                    if pid:
+                        positions.setdefault(pid, start + offset)
+            self._positions = positions
+        return self._positions.get(phrase_id)
+
+    def get(self, phrase_id: str) -> PracticePhrase | None:
+        pos = self.position(phrase_id)
+        return None if pos is None else self.at(pos)
+
+    def __iter__(self) -> Iterator[PracticePhrase]:
+        for shard_no in range(len(self.shards)):
+            yield from self._shard(shard_no)
+
+    def loaded_shards(self) -> int:
+        return len(self._loaded)
+
+    def _shard(self, shard_no: int) -> tuple[PracticePhrase, ...]:
+        phrases = self._loaded.get(shard_no)
+        if phrases is not None:
+            self._loaded.move_to_end(shard_no)
+            return phrases
+
+        shard = self.shards[shard_no]
+        content = _read_bytes(shard.path)
+        if shard.sha256 and hashlib.sha256(content).hexdigest() != shard.sha256:
+            raise PracticeServiceError(
+                f"Practice shard {shard.path} does not match the manifest; "
+                "rebuild it with scripts/shard_practice_sets.py"
+            )
+        phrases = tuple(parse_phrases(_parse_json(content, shard.path)))
+        if len(phrases) != len(shard.phrase_ids):
+            raise PracticeServiceError(
+                f"Practice shard {shard.path} has {len(phrases)} phrases, "
+                f"manifest lists {len(shard.phrase_ids)}"
+            )
+
+        self._loaded[shard_no] = phrases
+        if len(self._loaded) > self._max_loaded:
+            self._loaded.popitem(last=False)
+        logger.debug("Practice shard loaded: %s (%d phrases)", shard.path, len(phrases))
+        return phrases
+
+
+AnyPracticeCatalog = PracticeCatalog | ShardedPracticeCatalog
+
+
+def parse_phrases(raw: object) -> list[PracticePhrase]:
+    if not isinstance(raw, list):
+        raise PracticeServiceError("Practice sets JSON must be a list")
+
+    phrases: list[PracticePhrase] = []
+    for item in raw:
+        keywords = tuple(_clean_keywords(list(item.get("keywords", []))))
+        keyword_stems = tuple(stem_tokens(list(keywords)))
+        phrases.append(
+            PracticePhrase(
+                phrase_id=str(item.get("id", "")),
+                file_path=str(item.get("file", "")),
+                expected_text=str(item.get("expected_text", "")),
+                keywords=keywords,
+                keyword_stems=keyword_stems,
+                keyword_stem_set=frozenset(keyword_stems),
+                matcher=KeywordMatcher(keywords, keyword_stems),
+            )
+        )
+    return phrases
+
+
+def _read_bytes(path: Path) -> bytes:
+    try:
+        return path.read_bytes()
+    except OSError as exc:
+        raise PracticeServiceError(f"Practice sets file not found: {path}") from exc
+
+
+def _parse_json(content: bytes, path: Path) -> object:
+    try:
+        return json.loads(content.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise PracticeServiceError(f"Practice sets file is not valid JSON: {path}") from exc
+
+
+def _parse_manifest(raw: dict, path: Path) -> list[PracticeShard]:
+    if raw.get("version") != MANIFEST_VERSION:
+        raise PracticeServiceError(
+            f"Unsupported practice manifest version in {path}: {raw.get('version')!r}"
+        )
+
+    shards: list[PracticeShard] = []
+    for entry in raw.get("shards", []):
+        try:
+            shards.append(
+                PracticeShard(
+                    shard_id=str(entry["id"]),
+                    level=str(entry.get("level", "")),
+                    topic=str(entry.get("topic", "")),
+                    path=path.parent / str(entry["file"]),
+                    sha256=str(entry.get("sha256", "")),
+                    phrase_ids=tuple(str(pid) for pid in entry["phrase_ids"]),
+                )
+            )
+        except (KeyError, TypeError) as exc:
+            raise PracticeServiceError(f"Bad shard entry in {path}: {entry!r}") from exc
+    return shards
+
+
+def _read_catalog(path: Path, *, max_loaded_shards: int) -> AnyPracticeCatalog:
+    """
+    Load a flat phrase list, or a shard manifest ({"version", "shards"}).
+    """
+    content = _read_bytes(path)
+    source_hash = hashlib.sha256(content).hexdigest()
+    raw = _parse_json(content, path)
+
+    if isinstance(raw, dict) and "shards" in raw:
+        return ShardedPracticeCatalog(
+            shards=_parse_manifest(raw, path),
+            source_hash=source_hash,
+            max_loaded_shards=max_loaded_shards,
+        )
+
+    phrases = tuple(parse_phrases(raw))
+    positions: dict[str, int] = {}
+    for pos, phrase in enumerate(phrases):
+        if phrase.phrase_id:
+            positions.setdefault(phrase.phrase_id, pos)
+    return PracticeCatalog(
+        phrases=phrases,
+        source_hash=source_hash,
+        _positions=positions,
+    )
+
+
+_catalogs: FileReloader[AnyPracticeCatalog] = FileReloader(
+    label="Practice sets",
+    error=PracticeServiceError,
+    source_hash=lambda catalog: catalog.source_hash,
+    describe=lambda catalog: f"{len(catalog)} phrases",
+)
+
+
+def get_practice_catalog(
+    practice_sets_path: str,
+    *,
+    max_loaded_shards: int = 16,
+) -> AnyPracticeCatalog:
+    """
+    Return the process-wide catalog for `practice_sets_path`, reloading it
+    when the file changes (see FileReloader); if a reload fails, the
+    previous catalog stays.
+    """
+    path = Path(practice_sets_path)
+    return _catalogs.get(
+        practice_sets_path,
+        path,
+        lambda: _read_catalog(path, max_loaded_shards=max_loaded_shards),
+    )
+
+
 @dataclass(slots=True)
 class PracticeService:
     practice_sets_path: str
+    # Sharded catalogs only: how many shards stay parsed in memory.
+    max_loaded_shards: int = 16
+    # "fuzzy" also accepts ASR misspellings and split words; "exact" only
+    # matches keyword stems.
+    scorer: str = "fuzzy"
+
+    def catalog(self) -> AnyPracticeCatalog:
+        return get_practice_catalog(
+            self.practice_sets_path,
+            max_loaded_shards=self.max_loaded_shards,
+        )
 
     def load_phrases(self) -> list[PracticePhrase]:
-        path = Path(self.practice_sets_path)
-        if not path.exists():
-            raise PracticeServiceError(
-                f"Practice sets file not found: {self.practice_sets_path}"
+        return list(self.catalog())
+
+    def score_phrase(self, *, transcript: str, phrase: PracticePhrase) -> PracticeScore:
+        """
+        Score a transcript against a phrase using its precomputed keyword data.
+        """
+        if len(phrase.keyword_stems) != len(phrase.keywords):
+            return self.score_keywords(transcript=transcript, keywords=phrase.keywords)
+        if self.scorer == "fuzzy":
+            matcher = phrase.matcher or KeywordMatcher(
+                phrase.keywords,
+                phrase.keyword_stems,
             )
+            return _score_fuzzy(transcript=transcript, matcher=matcher)
+        return _score(
+            transcript=transcript,
+            keywords=phrase.keywords,
+            keyword_stems=phrase.keyword_stems,
+            keyword_stem_set=phrase.keyword_stem_set,
+        )
 
-        raw = json.loads(path.read_text(encoding="utf-8"))
-        if not isinstance(raw, list):
-            raise PracticeServiceError("Practice sets JSON must be a list")
-
-        phrases: list[PracticePhrase] = []
-        for item in raw:
-            phrases.append(
-                PracticePhrase(
-                    phrase_id=str(item.get("id", "")),
-                    file_path=str(item.get("file", "")),
-                    expected_text=str(item.get("expected_text", "")),
-                    keywords=list(item.get("keywords", [])),
-                )
+    def score_keywords(
+        self,
+        *,
+        transcript: str,
+        keywords: Sequence[str],
+    ) -> PracticeScore:
+        unique_keywords = _clean_keywords(keywords)
+        keyword_stems = tuple(stem_token(k) for k in unique_keywords)
+        if self.scorer == "fuzzy":
+            return _score_fuzzy(
+                transcript=transcript,
+                matcher=KeywordMatcher(unique_keywords, keyword_stems),
             )
-        return phrases
+        return _score(
+            transcript=transcript,
+            keywords=unique_keywords,
+            keyword_stems=keyword_stems,
+            keyword_stem_set=frozenset(keyword_stems),
+        )
+
+
+def _clean_keywords(keywords: Sequence[str]) -> list[str]:
+    cleaned_keywords = [str(k).strip().lower() for k in keywords if str(k).strip()]
+    return list(dict.fromkeys(cleaned_keywords))
+
 
-    def score_keywords(self, *, transcript: str, keywords: list[str]) -> PracticeScore:
-        normalized = normalize_text(transcript)
-        token_set = set(normalized.tokens)
+def _score(
+    *,
+    transcript: str,
+    keywords: Sequence[str],
+    keyword_stems: tuple[str, ...],
+    keyword_stem_set: frozenset[str],
+) -> PracticeScore:
+    if not keywords:
+        return PracticeScore(score=0.0, found_keywords=[], missing_keywords=[])
 
-        cleaned_keywords = [k.strip().lower() for k in keywords if str(k).strip()]
-        unique_keywords: list[str] = []
-        seen: set[str] = set()
-        for k in cleaned_keywords:
-            if k in seen:
-                continue
-            unique_keywords.append(k)
-            seen.add(k)
+    matched = keyword_stem_set.intersection(stem_tokens(normalize_text(transcript).tokens))
+    found = [k for k, s in zip(keywords, keyword_stems) if s in matched]
+    missing = [k for k, s in zip(keywords, keyword_stems) if s not in matched]
+    score = len(found) / len(keywords)
+    return PracticeScore(score=score, found_keywords=found, missing_keywords=missing)
 
-        if not unique_keywords:
-            return PracticeScore(score=0.0, found_keywords=[], missing_keywords=[])
 
-        found = [k for k in unique_keywords if k in token_set]
-        missing = [k for k in unique_keywords if k not in token_set]
-        score = len(found) / len(unique_keywords)
-        return PracticeScore(score=score, found_keywords=found, missing_keywords=missing)
+def _score_fuzzy(*, transcript: str, matcher: KeywordMatcher) -> PracticeScore:
+    if not matcher.keywords:
+        return PracticeScore(score=0.0, found_keywords=[], missing_keywords=[])
 
+    found, missing = matcher.split(matcher.match(normalize_text(transcript).tokens))
+    score = len(found) / len(matcher.keywords)
+    return PracticeScore(score=score, found_keywords=found, missing_keywords=missing)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+from aiogram.types.input_file import FSInputFile
+
+from services.practice_service import PracticePhrase
+from storage.repositories import Repositories
+
+
+logger = logging.getLogger(__name__)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(slots=True)
+class PromptVoiceCache:
+    """
+    Sends practice prompts by Telegram file_id instead of re-uploading them.
+
+    Each prompt is uploaded once; the returned file_id is stored per phrase
+    with the sha256 of the audio file. When the file changes (or Telegram
+    rejects the file_id) the prompt is uploaded again.
+    """
+
+    repos: Repositories
+    # phrase_id -> (content_hash, file_id), mirrors the prompt_files table.
+    _file_ids: dict[str, tuple[str, str]] = field(default_factory=dict)
+    # path -> (mtime_ns, size, content_hash), so unchanged files are not
+    # re-hashed on every send.
+    _hashes: dict[str, tuple[int, int, str]] = field(default_factory=dict)
+
+    async def load(self) -> None:
+        self._file_ids = await self.repos.get_prompt_files()
+
+    def content_hash(self, path: Path) -> str:
+        stat = os.stat(path)
+        key = str(path)
+        cached = self._hashes.get(key)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        content_hash = _file_sha256(path)
+        self._hashes[key] = (stat.st_mtime_ns, stat.st_size, content_hash)
+        return content_hash
+
+    def is_uploaded(self, phrase: PracticePhrase) -> bool:
+        cached = self._file_ids.get(phrase.phrase_id)
+        return cached is not None and cached[0] == self.content_hash(
+            Path(phrase.file_path)
+        )
+
+    async def send(self, *, bot: Bot, chat_id: int, phrase: PracticePhrase) -> Message:
+        """
+        Send the prompt voice of `phrase`; the audio file must exist.
+        """
+        path = Path(phrase.file_path)
+        content_hash = self.content_hash(path)
+
+        cached = self._file_ids.get(phrase.phrase_id)
+        if cached is not None and cached[0] == content_hash:
+            try:
+                return await bot.send_voice(chat_id=chat_id, voice=cached[1])
+            except TelegramBadRequest:
+                logger.warning(
+                    "Cached file_id rejected for %s, uploading again",
+                    phrase.phrase_id,
+                )
+
+        sent = await bot.send_voice(chat_id=chat_id, voice=FSInputFile(str(path)))
+        if sent.voice is not None:
+            self._file_ids[phrase.phrase_id] = (content_hash, sent.voice.file_id)
+            await self.repos.save_prompt_file(
+                phrase_id=phrase.phrase_id,
+                content_hash=content_hash,
+                file_id=sent.voice.file_id,
+            )
+        return sent
@@ -13,6 +13,11 @@ class SpeechResult:
 
 
 class SpeechRecognizer:
+    async def warm_up(self) -> None:
+        """
+        Load the model ahead of the first transcription; no-op by default.
+        """
+
     async def transcribe(self, *, wav_path: str) -> SpeechResult:
         raise NotImplementedError
 
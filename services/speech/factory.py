@@ -9,6 +9,9 @@ class DisabledRecognizer(SpeechRecognizer):
     def __init__(self, reason: str) -> None:
         self._reason = reason
 
+    async def warm_up(self) -> None:
+        raise SpeechRecognizerError(self._reason)
+
     async def transcribe(self, *, wav_path: str):  # type: ignore[override]
         raise SpeechRecognizerError(self._reason)
 
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 from dataclasses import dataclass
+from dataclasses import field
 
 from services.speech.base import SpeechRecognizer
 from services.speech.base import SpeechRecognizerError
@@ -13,6 +14,7 @@ class WhisperRecognizer(SpeechRecognizer):
     model_name: str
     _model: object | None = None
     _backend: str | None = None
+    _load_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
 
     def _load_model(self) -> None:
         if self._model is not None:
@@ -46,8 +48,18 @@ class WhisperRecognizer(SpeechRecognizer):
                 "Example: pip install faster-whisper"
             ) from exc
 
+    async def warm_up(self) -> None:
+        # Loading takes seconds: keep it off the event loop, and load once
+        # even if several answers arrive before it is done.
+        if self._model is not None:
+            return
+        async with self._load_lock:
+            if self._model is None:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._load_model)
+
     async def transcribe(self, *, wav_path: str) -> SpeechResult:
-        self._load_model()
+        await self.warm_up()
         assert self._model is not None
         assert self._backend is not None
 
@@ -1,17 +1,37 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
+from dataclasses import field
 from pathlib import Path
 from typing import Any
 
 import aiosqlite
 
 
+# Bumped whenever migrations.sql changes in a way CREATE ... IF NOT EXISTS
+# cannot apply to an existing database (stored in PRAGMA user_version).
+SCHEMA_VERSION = 2
+
+
+# How long a write waits for another process's lock before failing.
+BUSY_TIMEOUT_S = 10.0
+
+
+class DatabaseSchemaError(RuntimeError):
+    pass
+
+
 @dataclass(slots=True)
 class Database:
     db_path: str
     migrations_path: str = "storage/migrations.sql"
+    # WAL lets several processes read while one writes (multi-process mode).
+    wal: bool = False
     _conn: aiosqlite.Connection | None = None
+    # One statement + commit at a time: concurrent handlers share the
+    # connection, and a commit fails while another cursor is still open.
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
 
     async def connect(self) -> None:
         if self._conn is not None:
@@ -20,17 +40,42 @@ class Database:
         path = Path(self.db_path)
         path.parent.mkdir(parents=True, exist_ok=True)
 
-        self._conn = await aiosqlite.connect(self.db_path)
+        self._conn = await aiosqlite.connect(self.db_path, timeout=BUSY_TIMEOUT_S)
         self._conn.row_factory = aiosqlite.Row
+        if self.wal:
+            await self._conn.execute("PRAGMA journal_mode = WAL")
+            await self._conn.execute("PRAGMA synchronous = NORMAL")
 
     async def init(self) -> None:
         await self.connect()
         assert self._conn is not None
 
+        await self._check_schema_version()
         sql = Path(self.migrations_path).read_text(encoding="utf-8")
         await self._conn.executescript(sql)
+        await self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         await self._conn.commit()
 
+    async def _check_schema_version(self) -> None:
+        assert self._conn is not None
+
+        row = await self.fetchone("PRAGMA user_version")
+        version = int(row[0]) if row is not None else 0
+        if version >= SCHEMA_VERSION:
+            return
+
+        legacy = await self.fetchone(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages'"
+        )
+        if legacy is None:
+            return
+
+        raise DatabaseSchemaError(
+            f"Database {self.db_path} uses schema v{version}, expected "
+            f"v{SCHEMA_VERSION}. Convert it with: "
+            f"python scripts/migrate_compact_schema.py --db {self.db_path}"
+        )
+
     async def close(self) -> None:
         if self._conn is None:
             return
@@ -39,8 +84,19 @@ class Database:
 
     async def execute(self, query: str, params: tuple[Any, ...] = ()) -> None:
         assert self._conn is not None
-        await self._conn.execute(query, params)
-        await self._conn.commit()
+        async with self._lock:
+            await self._conn.execute(query, params)
+            await self._conn.commit()
+
+    async def executemany(
+        self,
+        query: str,
+        params_seq: list[tuple[Any, ...]],
+    ) -> None:
+        assert self._conn is not None
+        async with self._lock:
+            await self._conn.executemany(query, params_seq)
+            await self._conn.commit()
 
     async def execute_insert(
         self,
@@ -48,9 +104,25 @@ class Database:
         params: tuple[Any, ...] = (),
     ) -> int:
         assert self._conn is not None
-        cursor = await self._conn.execute(query, params)
-        await self._conn.commit()
-        return int(cursor.lastrowid)
+        async with self._lock:
+            cursor = await self._conn.execute(query, params)
+            await self._conn.commit()
+            return int(cursor.lastrowid)
+
+    async def execute_returning(
+        self,
+        query: str,
+        params: tuple[Any, ...] = (),
+    ) -> aiosqlite.Row | None:
+        """
+        Execute a write with a RETURNING clause in one round trip.
+        """
+        assert self._conn is not None
+        async with self._lock:
+            async with self._conn.execute(query, params) as cursor:
+                row = await cursor.fetchone()
+            await self._conn.commit()
+        return row
 
     async def fetchone(
         self,
@@ -58,7 +130,7 @@ class Database:
         params: tuple[Any, ...] = (),
     ) -> aiosqlite.Row | None:
         assert self._conn is not None
-        async with self._conn.execute(query, params) as cursor:
+        async with self._lock, self._conn.execute(query, params) as cursor:
             return await cursor.fetchone()
 
     async def fetchall(
@@ -67,7 +139,7 @@ class Database:
         params: tuple[Any, ...] = (),
     ) -> list[aiosqlite.Row]:
         assert self._conn is not None
-        async with self._conn.execute(query, params) as cursor:
+        async with self._lock, self._conn.execute(query, params) as cursor:
             rows = await cursor.fetchall()
         return list(rows)
 
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.base import StateType
+from aiogram.fsm.storage.base import StorageKey
+
+from storage.db import Database
+
+
+logger = logging.getLogger(__name__)
+
+
+def _key_to_str(key: StorageKey) -> str:
+    thread_id = "" if key.thread_id is None else str(key.thread_id)
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{thread_id}:{key.destiny}"
+
+
+@dataclass(slots=True)
+class _Entry:
+    state: str | None
+    data: dict[str, Any]
+    last_access: float
+    dirty: bool = False
+    # Bumped on every write so a flush can tell whether the entry changed
+    # while its snapshot was being written.
+    version: int = 0
+
+
+class SqliteStorage(BaseStorage):
+    """
+    FSM storage persisted in SQLite with a bounded in-memory hot tier.
+
+    - reads are served from an LRU of recently active keys;
+    - writes only mark the entry dirty; dirty entries are flushed to SQLite
+      in batches every `flush_interval` seconds (and on close);
+    - entries idle for longer than `idle_ttl` seconds, or pushed out by the
+      `max_entries` cap, are dropped from memory (after being flushed).
+
+    Empty states (no state, no data) are deleted from SQLite, so the table
+    only holds users who are actually inside a mode.
+    """
+
+    def __init__(
+        self,
+        *,
+        db: Database,
+        max_entries: int = 10_000,
+        idle_ttl: float = 1800.0,
+        flush_interval: float = 2.0,
+    ) -> None:
+        self._db = db
+        self._max_entries = max_entries
+        self._idle_ttl = idle_ttl
+        self._flush_interval = flush_interval
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # Dirty entries pushed out of the LRU before they were flushed.
+        self._evicted: dict[str, _Entry] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        if self._flush_task is not None:
+            return
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._get_entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(entry)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        entry = await self._get_entry(key)
+        return entry.state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        entry = await self._get_entry(key)
+        entry.data = data.copy()
+        self._mark_dirty(entry)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        entry = await self._get_entry(key)
+        return entry.data.copy()
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Write all dirty entries to SQLite in one batch.
+        """
+        async with self._flush_lock:
+            snapshot: list[tuple[str, _Entry, int]] = [
+                (k, e, e.version) for k, e in self._entries.items() if e.dirty
+            ]
+            snapshot.extend((k, e, e.version) for k, e in self._evicted.items())
+            if not snapshot:
+                return
+
+            now = int(time.time())
+            upserts: list[tuple[Any, ...]] = []
+            deletes: list[tuple[Any, ...]] = []
+            for storage_key, entry, _version in snapshot:
+                if entry.state is None and not entry.data:
+                    deletes.append((storage_key,))
+                    continue
+                upserts.append(
+                    (
+                        storage_key,
+                        entry.state,
+                        json.dumps(entry.data, ensure_ascii=False),
+                        now,
+                    )
+                )
+
+            if upserts:
+                await self._db.executemany(
+                    """
+                    INSERT INTO fsm_states (storage_key, state, data, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(storage_key) DO UPDATE SET
+                        state = excluded.state,
+                        data = excluded.data,
+                        updated_at = excluded.updated_at
+                    """.strip(),
+                    upserts,
+                )
+            if deletes:
+                await self._db.executemany(
+                    "DELETE FROM fsm_states WHERE storage_key = ?",
+                    deletes,
+                )
+
+            for storage_key, entry, version in snapshot:
+                if entry.version != version:
+                    continue
+                entry.dirty = False
+                if self._evicted.get(storage_key) is entry:
+                    del self._evicted[storage_key]
+
+    async def _get_entry(self, key: StorageKey) -> _Entry:
+        storage_key = _key_to_str(key)
+        now = time.monotonic()
+
+        entry = self._entries.get(storage_key)
+        if entry is not None:
+            entry.last_access = now
+            self._entries.move_to_end(storage_key)
+            return entry
+
+        entry = self._evicted.pop(storage_key, None)
+        if entry is None:
+            row = await self._db.fetchone(
+                "SELECT state, data FROM fsm_states WHERE storage_key = ?",
+                (storage_key,),
+            )
+            # Another coroutine may have loaded the key while we were waiting.
+            cached = self._entries.get(storage_key)
+            if cached is not None:
+                cached.last_access = now
+                return cached
+
+            if row is None:
+                entry = _Entry(state=None, data={}, last_access=now)
+            else:
+                entry = _Entry(
+                    state=row["state"],
+                    data=json.loads(row["data"]),
+                    last_access=now,
+                )
+
+        entry.last_access = now
+        self._entries[storage_key] = entry
+        self._evict_overflow()
+        return entry
+
+    def _mark_dirty(self, entry: _Entry) -> None:
+        entry.dirty = True
+        entry.version += 1
+
+    def _evict_overflow(self) -> None:
+        while len(self._entries) > self._max_entries:
+            storage_key, entry = self._entries.popitem(last=False)
+            if entry.dirty:
+                self._evicted[storage_key] = entry
+
+    def _evict_idle(self) -> None:
+        deadline = time.monotonic() - self._idle_ttl
+        # Entries are kept in access order, so idle ones are at the front.
+        while self._entries:
+            storage_key, entry = next(iter(self._entries.items()))
+            if entry.last_access > deadline:
+                break
+            del self._entries[storage_key]
+            if entry.dirty:
+                self._evicted[storage_key] = entry
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            self._evict_idle()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush FSM states to DB")
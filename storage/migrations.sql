@@ -3,35 +3,57 @@ PRAGMA foreign_keys = ON;
 CREATE TABLE IF NOT EXISTS users (
     user_id INTEGER PRIMARY KEY,
     username TEXT,
-    first_seen_at TEXT NOT NULL
+    first_seen_at INTEGER NOT NULL
 );
 
 CREATE TABLE IF NOT EXISTS sessions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
     mode TEXT NOT NULL,
-    started_at TEXT NOT NULL,
-    ended_at TEXT,
+    started_at INTEGER NOT NULL,
+    ended_at INTEGER,
     FOREIGN KEY (user_id) REFERENCES users (user_id)
 );
 
+-- Repeated outbound bodies (/start, /help, /cancel...) are stored once
+-- and referenced from messages.template_id instead of messages.text.
+CREATE TABLE IF NOT EXISTS message_templates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    body TEXT NOT NULL UNIQUE
+);
+
+-- Timestamps are integer Unix epoch seconds (UTC).
 CREATE TABLE IF NOT EXISTS messages (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
     direction TEXT NOT NULL,
     msg_type TEXT NOT NULL,
     text TEXT,
+    template_id INTEGER,
     file_id TEXT,
-    created_at TEXT NOT NULL,
-    FOREIGN KEY (user_id) REFERENCES users (user_id)
+    created_at INTEGER NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users (user_id),
+    FOREIGN KEY (template_id) REFERENCES message_templates (id)
 );
 
+CREATE VIEW IF NOT EXISTS messages_view AS
+SELECT
+    m.id,
+    m.user_id,
+    m.direction,
+    m.msg_type,
+    COALESCE(m.text, t.body) AS text,
+    m.file_id,
+    datetime(m.created_at, 'unixepoch') AS created_at
+FROM messages AS m
+LEFT JOIN message_templates AS t ON t.id = m.template_id;
+
 CREATE TABLE IF NOT EXISTS tickets (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
     status TEXT NOT NULL,
-    created_at TEXT NOT NULL,
-    updated_at TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
     last_user_message TEXT,
     FOREIGN KEY (user_id) REFERENCES users (user_id)
 );
@@ -41,10 +63,213 @@ CREATE TABLE IF NOT EXISTS operator_map (
     operator_chat_id INTEGER NOT NULL,
     forwarded_message_id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
-    created_at TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
     FOREIGN KEY (user_id) REFERENCES users (user_id)
 );
 
+CREATE TABLE IF NOT EXISTS practice_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    phrase_id TEXT NOT NULL,
+    score REAL NOT NULL,
+    found_keywords TEXT NOT NULL,
+    missing_keywords TEXT NOT NULL,
+    transcript TEXT,
+    audio_duration_s INTEGER,
+    download_ms INTEGER,
+    convert_ms INTEGER,
+    transcribe_ms INTEGER,
+    score_ms INTEGER,
+    created_at INTEGER NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_practice_attempts_user_id_created_at
+    ON practice_attempts (user_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_practice_attempts_phrase_id_created_at
+    ON practice_attempts (phrase_id, created_at);
+
 CREATE INDEX IF NOT EXISTS idx_messages_user_id_created_at
     ON messages (user_id, created_at);
 
+CREATE INDEX IF NOT EXISTS idx_tickets_user_id_status
+    ON tickets (user_id, status);
+
+CREATE INDEX IF NOT EXISTS idx_operator_map_chat_message
+    ON operator_map (operator_chat_id, forwarded_message_id);
+
+-- Spaced-repetition state per (user, phrase): when the phrase is due next
+-- and the SM-2 style interval/ease it was scheduled with.
+CREATE TABLE IF NOT EXISTS practice_schedule (
+    user_id INTEGER NOT NULL,
+    phrase_id TEXT NOT NULL,
+    due_at INTEGER NOT NULL,
+    interval_s INTEGER NOT NULL,
+    ease REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    PRIMARY KEY (user_id, phrase_id)
+) WITHOUT ROWID;
+
+-- Catalog position of the next never-seen phrase per user.
+CREATE TABLE IF NOT EXISTS practice_cursor (
+    user_id INTEGER PRIMARY KEY,
+    next_pos INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fsm_states (
+    storage_key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+-- Telegram file_id of each uploaded practice prompt; content_hash is the
+-- sha256 of the audio file it was uploaded from.
+CREATE TABLE IF NOT EXISTS prompt_files (
+    phrase_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+-- Voice answers kept for offline re-scoring (PRACTICE_ARCHIVE_DIR, opt-in).
+-- path is relative to the archive dir; the oldest rows are evicted first
+-- once the archive outgrows its size cap.
+CREATE TABLE IF NOT EXISTS practice_archive (
+    attempt_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    FOREIGN KEY (attempt_id) REFERENCES practice_attempts (id)
+);
+
+-- Running total of practice_archive.size_bytes, kept by the triggers below
+-- in the same transaction as every insert and eviction.
+CREATE TABLE IF NOT EXISTS practice_archive_usage (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    used_bytes INTEGER NOT NULL
+);
+
+-- One-time backfill for databases created before the total existed.
+INSERT OR IGNORE INTO practice_archive_usage (id, used_bytes)
+SELECT 1, COALESCE(SUM(size_bytes), 0) FROM practice_archive;
+
+CREATE TRIGGER IF NOT EXISTS trg_practice_archive_added
+AFTER INSERT ON practice_archive
+BEGIN
+    UPDATE practice_archive_usage SET used_bytes = used_bytes + NEW.size_bytes
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_practice_archive_evicted
+AFTER DELETE ON practice_archive
+BEGIN
+    UPDATE practice_archive_usage SET used_bytes = used_bytes - OLD.size_bytes
+    WHERE id = 1;
+END;
+
+-- Operator announcements (/broadcast): draft -> running -> done | cancelled.
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    finished_at INTEGER
+);
+
+-- One row per recipient, written as 'pending' before the send and updated
+-- to sent / blocked / failed after it. A 'pending' row found on restart may
+-- or may not have been delivered: it becomes 'unknown' and is not resent.
+-- The highest user_id of a broadcast is its keyset cursor over users.
+CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+    broadcast_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (broadcast_id, user_id),
+    FOREIGN KEY (broadcast_id) REFERENCES broadcasts (id)
+) WITHOUT ROWID;
+
+-- Users a send failed for with 403 (bot blocked, account deleted); skipped by
+-- broadcasts until they send /start again.
+CREATE TABLE IF NOT EXISTS blocked_users (
+    user_id INTEGER PRIMARY KEY,
+    blocked_at INTEGER NOT NULL
+);
+
+-- Per-day aggregates, maintained incrementally (triggers below and
+-- Repositories.record_* calls), so /stats never scans history.
+CREATE TABLE IF NOT EXISTS stats_daily_messages (
+    day TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    msg_type TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, direction, msg_type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS stats_daily (
+    day TEXT PRIMARY KEY,
+    practice_attempts INTEGER NOT NULL DEFAULT 0,
+    practice_score_sum REAL NOT NULL DEFAULT 0,
+    tickets_opened INTEGER NOT NULL DEFAULT 0,
+    tickets_closed INTEGER NOT NULL DEFAULT 0,
+    faq_queries INTEGER NOT NULL DEFAULT 0,
+    faq_hits INTEGER NOT NULL DEFAULT 0
+);
+
+-- One-time backfill for databases created before the aggregates existed.
+INSERT INTO stats_daily_messages (day, direction, msg_type, count)
+SELECT date(created_at, 'unixepoch'), direction, msg_type, COUNT(*)
+FROM messages
+WHERE NOT EXISTS (SELECT 1 FROM stats_daily_messages)
+GROUP BY 1, 2, 3;
+
+INSERT INTO stats_daily (day, tickets_opened, tickets_closed)
+SELECT day, SUM(opened), SUM(closed)
+FROM (
+    SELECT date(created_at, 'unixepoch') AS day, 1 AS opened, 0 AS closed
+    FROM tickets
+    UNION ALL
+    SELECT date(updated_at, 'unixepoch'), 0, 1
+    FROM tickets
+    WHERE status = 'closed'
+)
+WHERE NOT EXISTS (SELECT 1 FROM stats_daily)
+GROUP BY day;
+
+CREATE TRIGGER IF NOT EXISTS trg_messages_stats
+AFTER INSERT ON messages
+BEGIN
+    INSERT INTO stats_daily_messages (day, direction, msg_type, count)
+    VALUES (date(NEW.created_at, 'unixepoch'), NEW.direction, NEW.msg_type, 1)
+    ON CONFLICT (day, direction, msg_type) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_practice_attempts_stats
+AFTER INSERT ON practice_attempts
+BEGIN
+    INSERT INTO stats_daily (day, practice_attempts, practice_score_sum)
+    VALUES (date(NEW.created_at, 'unixepoch'), 1, NEW.score)
+    ON CONFLICT (day) DO UPDATE SET
+        practice_attempts = practice_attempts + 1,
+        practice_score_sum = practice_score_sum + NEW.score;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_opened_stats
+AFTER INSERT ON tickets
+BEGIN
+    INSERT INTO stats_daily (day, tickets_opened)
+    VALUES (date(NEW.created_at, 'unixepoch'), 1)
+    ON CONFLICT (day) DO UPDATE SET tickets_opened = tickets_opened + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_closed_stats
+AFTER UPDATE OF status ON tickets
+WHEN OLD.status = 'open' AND NEW.status = 'closed'
+BEGIN
+    INSERT INTO stats_daily (day, tickets_closed)
+    VALUES (date(NEW.updated_at, 'unixepoch'), 1)
+    ON CONFLICT (day) DO UPDATE SET tickets_closed = tickets_closed + 1;
+END;
+
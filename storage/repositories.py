@@ -1,22 +1,144 @@
 from __future__ import annotations
 
+import json
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
+from dataclasses import field
+from datetime import date
 from datetime import datetime
 from datetime import timezone
 
+import aiosqlite
+
 from storage.db import Database
 
 
-def _utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+# How many recent operator_map rows are kept in memory. Older replies still
+# resolve through SQLite, so the cap only bounds memory, not correctness.
+OPERATOR_MAP_CACHE_SIZE = 10_000
+
+# Known repeated outbound bodies (log_message(template=True)) are interned
+# into message_templates; ids of the most recently used ones are cached so
+# they cost no extra round trip. Unique texts stay inline in messages.text.
+TEMPLATE_CACHE_SIZE = 1024
+
+
+def _utc_now_ts() -> int:
+    return int(time.time())
+
+
+def _utc_today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+@dataclass(frozen=True, slots=True)
+class DailyStats:
+    day: str
+    messages: dict[tuple[str, str], int]
+    practice_attempts: int
+    practice_score_sum: float
+    tickets_opened: int
+    tickets_closed: int
+    faq_queries: int
+    faq_hits: int
+
+
+@dataclass(frozen=True, slots=True)
+class Broadcast:
+    id: int
+    text: str
+    status: str
+    created_at: int
+    finished_at: int | None
+
+
+def _broadcast_from_row(row: aiosqlite.Row) -> Broadcast:
+    return Broadcast(
+        id=int(row["id"]),
+        text=str(row["text"]),
+        status=str(row["status"]),
+        created_at=int(row["created_at"]),
+        finished_at=int(row["finished_at"]) if row["finished_at"] is not None else None,
+    )
 
 
 @dataclass(slots=True)
 class Repositories:
     db: Database
+    # Write-through indexes over tickets/operator_map, see load_indexes().
+    # user_id -> ids of that user's open tickets (almost always one).
+    _open_tickets: dict[int, set[int]] = field(default_factory=dict)
+    _operator_map: OrderedDict[tuple[int, int], int] = field(
+        default_factory=OrderedDict
+    )
+    _indexes_loaded: bool = False
+    _template_ids: OrderedDict[str, int] = field(default_factory=OrderedDict)
+
+    async def load_indexes(self) -> None:
+        """
+        Rebuild in-memory ticket indexes from SQLite.
+
+        Must be called once at startup, before handlers run. After that every
+        ticket/operator_map write goes through this class and keeps the
+        indexes consistent, so hot lookups never touch the database.
+        """
+        self._open_tickets.clear()
+        self._operator_map.clear()
+
+        rows = await self.db.fetchall(
+            "SELECT id, user_id FROM tickets WHERE status = 'open' ORDER BY id"
+        )
+        for row in rows:
+            self._remember_open_ticket(
+                ticket_id=int(row["id"]),
+                user_id=int(row["user_id"]),
+            )
+
+        rows = await self.db.fetchall(
+            """
+            SELECT operator_chat_id, forwarded_message_id, user_id
+            FROM operator_map
+            ORDER BY id DESC
+            LIMIT ?
+            """.strip(),
+            (OPERATOR_MAP_CACHE_SIZE,),
+        )
+        for row in reversed(rows):
+            self._remember_operator_map(
+                operator_chat_id=int(row["operator_chat_id"]),
+                forwarded_message_id=int(row["forwarded_message_id"]),
+                user_id=int(row["user_id"]),
+            )
+
+        self._indexes_loaded = True
+
+    def _remember_open_ticket(self, *, ticket_id: int, user_id: int) -> None:
+        self._open_tickets.setdefault(user_id, set()).add(ticket_id)
+
+    def _forget_open_ticket(self, *, ticket_id: int, user_id: int) -> None:
+        tickets = self._open_tickets.get(user_id)
+        if tickets is None:
+            return
+        tickets.discard(ticket_id)
+        if not tickets:
+            del self._open_tickets[user_id]
+
+    def _remember_operator_map(
+        self,
+        *,
+        operator_chat_id: int,
+        forwarded_message_id: int,
+        user_id: int,
+    ) -> None:
+        key = (operator_chat_id, forwarded_message_id)
+        self._operator_map[key] = user_id
+        self._operator_map.move_to_end(key)
+        while len(self._operator_map) > OPERATOR_MAP_CACHE_SIZE:
+            self._operator_map.popitem(last=False)
 
     async def upsert_user(self, *, user_id: int, username: str | None) -> None:
-        now = _utc_now_iso()
+        now = _utc_now_ts()
         await self.db.execute(
             """
             INSERT INTO users (user_id, username, first_seen_at)
@@ -35,25 +157,60 @@ class Repositories:
         msg_type: str,
         text: str | None = None,
         file_id: str | None = None,
+        template: bool = False,
     ) -> None:
+        template_id: int | None = None
+        if template and text:
+            template_id = await self._intern_template(text)
+            text = None
+
         await self.db.execute(
             """
             INSERT INTO messages (
-                user_id, direction, msg_type, text, file_id, created_at
+                user_id, direction, msg_type, text, template_id, file_id, created_at
             )
-            VALUES (?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """.strip(),
             (
                 user_id,
                 direction,
                 msg_type,
                 text,
+                template_id,
                 file_id,
-                _utc_now_iso(),
+                _utc_now_ts(),
             ),
         )
 
+    async def _intern_template(self, body: str) -> int:
+        cached = self._template_ids.get(body)
+        if cached is not None:
+            self._template_ids.move_to_end(body)
+            return cached
+
+        row = await self.db.execute_returning(
+            """
+            INSERT INTO message_templates (body)
+            VALUES (?)
+            ON CONFLICT(body) DO UPDATE SET body = excluded.body
+            RETURNING id
+            """.strip(),
+            (body,),
+        )
+        assert row is not None
+        template_id = int(row["id"])
+
+        self._template_ids[body] = template_id
+        while len(self._template_ids) > TEMPLATE_CACHE_SIZE:
+            self._template_ids.popitem(last=False)
+        return template_id
+
     async def get_open_ticket_by_user(self, *, user_id: int) -> int | None:
+        if self._indexes_loaded:
+            tickets = self._open_tickets.get(user_id)
+            # The newest open ticket, as in the query below.
+            return max(tickets) if tickets else None
+
         row = await self.db.fetchone(
             """
             SELECT id
@@ -69,7 +226,7 @@ class Repositories:
         return int(row["id"])
 
     async def create_ticket(self, *, user_id: int, last_user_message: str) -> int:
-        now = _utc_now_iso()
+        now = _utc_now_ts()
         ticket_id = await self.db.execute_insert(
             """
             INSERT INTO tickets (user_id, status, created_at, updated_at, last_user_message)
@@ -77,6 +234,8 @@ class Repositories:
             """.strip(),
             (user_id, now, now, last_user_message),
         )
+        if self._indexes_loaded:
+            self._remember_open_ticket(ticket_id=ticket_id, user_id=user_id)
         return ticket_id
 
     async def update_ticket_last_message(
@@ -91,22 +250,27 @@ class Repositories:
             SET last_user_message = ?, updated_at = ?
             WHERE id = ?
             """.strip(),
-            (last_user_message, _utc_now_iso(), ticket_id),
+            (last_user_message, _utc_now_ts(), ticket_id),
         )
 
-    async def close_ticket(self, *, ticket_id: int) -> bool:
-        await self.db.execute(
+    async def close_ticket(self, *, ticket_id: int) -> int | None:
+        """
+        Close a ticket and return its user_id (None if the ticket is unknown).
+        """
+        row = await self.db.execute_returning(
             """
             UPDATE tickets
             SET status = 'closed', updated_at = ?
             WHERE id = ?
+            RETURNING user_id
             """.strip(),
-            (_utc_now_iso(), ticket_id),
-        )
-        row = await self.db.fetchone(
-            "SELECT status FROM tickets WHERE id = ?".strip(), (ticket_id,)
+            (_utc_now_ts(), ticket_id),
         )
-        return row is not None and str(row["status"]) == "closed"
+        if row is None:
+            return None
+        user_id = int(row["user_id"])
+        self._forget_open_ticket(ticket_id=ticket_id, user_id=user_id)
+        return user_id
 
     async def get_ticket_user_id(self, *, ticket_id: int) -> int | None:
         row = await self.db.fetchone(
@@ -131,7 +295,12 @@ class Repositories:
             )
             VALUES (?, ?, ?, ?)
             """.strip(),
-            (operator_chat_id, forwarded_message_id, user_id, _utc_now_iso()),
+            (operator_chat_id, forwarded_message_id, user_id, _utc_now_ts()),
+        )
+        self._remember_operator_map(
+            operator_chat_id=operator_chat_id,
+            forwarded_message_id=forwarded_message_id,
+            user_id=user_id,
         )
 
     async def get_user_id_by_operator_reply(
@@ -140,6 +309,10 @@ class Repositories:
         operator_chat_id: int,
         forwarded_message_id: int,
     ) -> int | None:
+        cached = self._operator_map.get((operator_chat_id, forwarded_message_id))
+        if cached is not None:
+            return cached
+
         row = await self.db.fetchone(
             """
             SELECT user_id
@@ -153,3 +326,430 @@ class Repositories:
         if row is None:
             return None
         return int(row["user_id"])
+
+    async def record_practice_attempt(
+        self,
+        *,
+        user_id: int,
+        phrase_id: str,
+        score: float,
+        found_keywords: list[str],
+        missing_keywords: list[str],
+        transcript: str,
+        audio_duration_s: int | None,
+        timings_ms: dict[str, int],
+    ) -> int:
+        """
+        Store one scored practice answer (stats_daily is updated by trigger)
+        and return its id.
+
+        `timings_ms` holds per-stage durations: download, convert,
+        transcribe, score.
+        """
+        return await self.db.execute_insert(
+            """
+            INSERT INTO practice_attempts (
+                user_id, phrase_id, score, found_keywords, missing_keywords,
+                transcript, audio_duration_s, download_ms, convert_ms,
+                transcribe_ms, score_ms, created_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """.strip(),
+            (
+                user_id,
+                phrase_id,
+                score,
+                json.dumps(found_keywords, ensure_ascii=False),
+                json.dumps(missing_keywords, ensure_ascii=False),
+                transcript,
+                audio_duration_s,
+                timings_ms.get("download"),
+                timings_ms.get("convert"),
+                timings_ms.get("transcribe"),
+                timings_ms.get("score"),
+                _utc_now_ts(),
+            ),
+        )
+
+    async def get_practice_schedule(
+        self,
+        *,
+        user_id: int,
+    ) -> tuple[int, list[tuple[str, int, int, float, int]]]:
+        """
+        (next new-phrase position, [(phrase_id, due_at, interval_s, ease, reps)])
+        """
+        cursor = await self.db.fetchone(
+            "SELECT next_pos FROM practice_cursor WHERE user_id = ?",
+            (user_id,),
+        )
+        rows = await self.db.fetchall(
+            """
+            SELECT phrase_id, due_at, interval_s, ease, reps
+            FROM practice_schedule
+            WHERE user_id = ?
+            """.strip(),
+            (user_id,),
+        )
+        return (
+            0 if cursor is None else int(cursor["next_pos"]),
+            [
+                (
+                    str(r["phrase_id"]),
+                    int(r["due_at"]),
+                    int(r["interval_s"]),
+                    float(r["ease"]),
+                    int(r["reps"]),
+                )
+                for r in rows
+            ],
+        )
+
+    async def save_practice_card(
+        self,
+        *,
+        user_id: int,
+        phrase_id: str,
+        due_at: int,
+        interval_s: int,
+        ease: float,
+        reps: int,
+    ) -> None:
+        await self.db.execute(
+            """
+            INSERT INTO practice_schedule (
+                user_id, phrase_id, due_at, interval_s, ease, reps
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, phrase_id) DO UPDATE SET
+                due_at = excluded.due_at,
+                interval_s = excluded.interval_s,
+                ease = excluded.ease,
+                reps = excluded.reps
+            """.strip(),
+            (user_id, phrase_id, due_at, interval_s, ease, reps),
+        )
+
+    async def save_practice_cursor(self, *, user_id: int, next_pos: int) -> None:
+        await self.db.execute(
+            """
+            INSERT INTO practice_cursor (user_id, next_pos)
+            VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET next_pos = excluded.next_pos
+            """.strip(),
+            (user_id, next_pos),
+        )
+
+    async def get_prompt_files(self) -> dict[str, tuple[str, str]]:
+        """
+        phrase_id -> (content_hash, file_id) for every uploaded prompt.
+        """
+        rows = await self.db.fetchall(
+            "SELECT phrase_id, content_hash, file_id FROM prompt_files"
+        )
+        return {
+            str(r["phrase_id"]): (str(r["content_hash"]), str(r["file_id"]))
+            for r in rows
+        }
+
+    async def save_prompt_file(
+        self,
+        *,
+        phrase_id: str,
+        content_hash: str,
+        file_id: str,
+    ) -> None:
+        await self.db.execute(
+            """
+            INSERT INTO prompt_files (phrase_id, content_hash, file_id, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(phrase_id) DO UPDATE SET
+                content_hash = excluded.content_hash,
+                file_id = excluded.file_id,
+                updated_at = excluded.updated_at
+            """.strip(),
+            (phrase_id, content_hash, file_id, _utc_now_ts()),
+        )
+
+    async def add_archived_answer(
+        self,
+        *,
+        attempt_id: int,
+        path: str,
+        size_bytes: int,
+    ) -> None:
+        await self.db.execute(
+            """
+            INSERT OR REPLACE INTO practice_archive (
+                attempt_id, path, size_bytes, created_at
+            )
+            VALUES (?, ?, ?, ?)
+            """.strip(),
+            (attempt_id, path, size_bytes, _utc_now_ts()),
+        )
+
+    async def get_archive_size(self) -> int:
+        """
+        Total bytes of archived practice answers (trigger-maintained total).
+        """
+        row = await self.db.fetchone(
+            "SELECT used_bytes FROM practice_archive_usage WHERE id = 1"
+        )
+        return int(row[0]) if row is not None else 0
+
+    async def pop_oldest_archived(self, *, limit: int) -> list[tuple[str, int]]:
+        """
+        Remove up to `limit` oldest archive rows; returns their (path, size_bytes).
+        """
+        rows = await self.db.fetchall(
+            """
+            SELECT attempt_id, path, size_bytes
+            FROM practice_archive
+            ORDER BY attempt_id
+            LIMIT ?
+            """.strip(),
+            (limit,),
+        )
+        if rows:
+            await self.db.execute(
+                "DELETE FROM practice_archive WHERE attempt_id <= ?",
+                (int(rows[-1]["attempt_id"]),),
+            )
+        return [(str(r["path"]), int(r["size_bytes"])) for r in rows]
+
+    async def create_broadcast(self, *, text: str) -> int:
+        return await self.db.execute_insert(
+            "INSERT INTO broadcasts (text, status, created_at) VALUES (?, 'draft', ?)",
+            (text, _utc_now_ts()),
+        )
+
+    async def get_broadcast(self, *, broadcast_id: int) -> Broadcast | None:
+        row = await self.db.fetchone(
+            "SELECT * FROM broadcasts WHERE id = ?",
+            (broadcast_id,),
+        )
+        return _broadcast_from_row(row) if row is not None else None
+
+    async def get_latest_broadcast(self) -> Broadcast | None:
+        row = await self.db.fetchone(
+            "SELECT * FROM broadcasts WHERE status != 'draft' ORDER BY id DESC LIMIT 1"
+        )
+        return _broadcast_from_row(row) if row is not None else None
+
+    async def get_running_broadcast_ids(self) -> list[int]:
+        rows = await self.db.fetchall(
+            "SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id"
+        )
+        return [int(r["id"]) for r in rows]
+
+    async def set_broadcast_status(
+        self,
+        *,
+        broadcast_id: int,
+        status: str,
+        from_status: str,
+    ) -> bool:
+        """
+        Move a broadcast from `from_status` to `status`; False if it was not
+        in `from_status` (e.g. a second tap on the confirm button).
+        """
+        finished_at = _utc_now_ts() if status in ("done", "cancelled") else None
+        row = await self.db.execute_returning(
+            """
+            UPDATE broadcasts
+            SET status = ?, finished_at = ?
+            WHERE id = ? AND status = ?
+            RETURNING id
+            """.strip(),
+            (status, finished_at, broadcast_id, from_status),
+        )
+        return row is not None
+
+    async def count_broadcast_recipients(self) -> int:
+        row = await self.db.fetchone(
+            """
+            SELECT COUNT(*)
+            FROM users
+            WHERE user_id NOT IN (SELECT user_id FROM blocked_users)
+            """.strip()
+        )
+        return int(row[0]) if row is not None else 0
+
+    async def get_broadcast_recipients(
+        self,
+        *,
+        broadcast_id: int,
+        after_user_id: int,
+        limit: int,
+    ) -> list[int]:
+        """
+        Next `limit` user ids above `after_user_id` (keyset page) that are not
+        blocked and have no delivery row for the broadcast yet.
+        """
+        rows = await self.db.fetchall(
+            """
+            SELECT u.user_id
+            FROM users AS u
+            WHERE u.user_id > ?
+                AND u.user_id NOT IN (SELECT user_id FROM blocked_users)
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM broadcast_deliveries AS d
+                    WHERE d.broadcast_id = ? AND d.user_id = u.user_id
+                )
+            ORDER BY u.user_id
+            LIMIT ?
+            """.strip(),
+            (after_user_id, broadcast_id, limit),
+        )
+        return [int(r["user_id"]) for r in rows]
+
+    async def add_pending_deliveries(
+        self,
+        *,
+        broadcast_id: int,
+        user_ids: list[int],
+    ) -> None:
+        now = _utc_now_ts()
+        await self.db.executemany(
+            """
+            INSERT OR IGNORE INTO broadcast_deliveries (
+                broadcast_id, user_id, status, updated_at
+            )
+            VALUES (?, ?, 'pending', ?)
+            """.strip(),
+            [(broadcast_id, user_id, now) for user_id in user_ids],
+        )
+
+    async def set_delivery_statuses(
+        self,
+        *,
+        broadcast_id: int,
+        statuses: list[tuple[int, str]],
+    ) -> None:
+        """
+        Store (user_id, status) results; 'blocked' also marks the user blocked.
+        """
+        now = _utc_now_ts()
+        await self.db.executemany(
+            """
+            UPDATE broadcast_deliveries
+            SET status = ?, updated_at = ?
+            WHERE broadcast_id = ? AND user_id = ?
+            """.strip(),
+            [(status, now, broadcast_id, user_id) for user_id, status in statuses],
+        )
+        blocked = [(user_id, now) for user_id, status in statuses if status == "blocked"]
+        if blocked:
+            await self.db.executemany(
+                "INSERT OR IGNORE INTO blocked_users (user_id, blocked_at) VALUES (?, ?)",
+                blocked,
+            )
+
+    async def release_pending_deliveries(
+        self,
+        *,
+        broadcast_id: int,
+        user_ids: list[int],
+    ) -> None:
+        """
+        Drop pending rows of sends that never started, so they are retried.
+        """
+        await self.db.executemany(
+            """
+            DELETE FROM broadcast_deliveries
+            WHERE broadcast_id = ? AND user_id = ? AND status = 'pending'
+            """.strip(),
+            [(broadcast_id, user_id) for user_id in user_ids],
+        )
+
+    async def mark_unknown_deliveries(self, *, broadcast_id: int) -> None:
+        """
+        Pending rows left by a crash: the send may have gone out, do not repeat.
+        """
+        await self.db.execute(
+            """
+            UPDATE broadcast_deliveries
+            SET status = 'unknown', updated_at = ?
+            WHERE broadcast_id = ? AND status = 'pending'
+            """.strip(),
+            (_utc_now_ts(), broadcast_id),
+        )
+
+    async def get_delivery_counts(self, *, broadcast_id: int) -> dict[str, int]:
+        rows = await self.db.fetchall(
+            """
+            SELECT status, COUNT(*) AS count
+            FROM broadcast_deliveries
+            WHERE broadcast_id = ?
+            GROUP BY status
+            """.strip(),
+            (broadcast_id,),
+        )
+        return {str(r["status"]): int(r["count"]) for r in rows}
+
+    async def unblock_user(self, *, user_id: int) -> None:
+        await self.db.execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
+
+    async def record_faq_query(self, *, hit: bool) -> None:
+        await self.db.execute(
+            """
+            INSERT INTO stats_daily (day, faq_queries, faq_hits)
+            VALUES (?, 1, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                faq_queries = faq_queries + 1,
+                faq_hits = faq_hits + excluded.faq_hits
+            """.strip(),
+            (_utc_today(), int(hit)),
+        )
+
+    async def get_daily_stats(self, *, days: int) -> list[DailyStats]:
+        """
+        Read pre-aggregated stats for the last `days` UTC days (newest first).
+
+        Cost depends only on `days`, not on the size of messages/tickets.
+        """
+        today = datetime.now(timezone.utc).date()
+        since = date.fromordinal(today.toordinal() - days + 1).isoformat()
+
+        message_rows = await self.db.fetchall(
+            """
+            SELECT day, direction, msg_type, count
+            FROM stats_daily_messages
+            WHERE day >= ?
+            """.strip(),
+            (since,),
+        )
+        messages: dict[str, dict[tuple[str, str], int]] = {}
+        for row in message_rows:
+            per_day = messages.setdefault(str(row["day"]), {})
+            per_day[(str(row["direction"]), str(row["msg_type"]))] = int(row["count"])
+
+        rows = await self.db.fetchall(
+            """
+            SELECT *
+            FROM stats_daily
+            WHERE day >= ?
+            """.strip(),
+            (since,),
+        )
+        by_day = {str(row["day"]): row for row in rows}
+
+        result: list[DailyStats] = []
+        for offset in range(days):
+            day = date.fromordinal(today.toordinal() - offset).isoformat()
+            row = by_day.get(day)
+            result.append(
+                DailyStats(
+                    day=day,
+                    messages=messages.get(day, {}),
+                    practice_attempts=int(row["practice_attempts"]) if row else 0,
+                    practice_score_sum=float(row["practice_score_sum"]) if row else 0.0,
+                    tickets_opened=int(row["tickets_opened"]) if row else 0,
+                    tickets_closed=int(row["tickets_closed"]) if row else 0,
+                    faq_queries=int(row["faq_queries"]) if row else 0,
+                    faq_hits=int(row["faq_hits"]) if row else 0,
+                )
+            )
+        return result
+
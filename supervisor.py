@@ -0,0 +1,330 @@
+"""
+Multi-process entry point: one supervisor receives updates (polling or
+webhook) and shards them by user_id to BOT_WORKERS worker processes, each
+running the usual dispatcher. All updates of a user go to the same worker
+and are handled there in order, so FSM state and per-user caches stay local.
+"""
+
+import asyncio
+import hmac
+import logging
+import multiprocessing
+import signal
+from contextlib import suppress
+from dataclasses import replace
+from multiprocessing.context import SpawnProcess
+from multiprocessing.queues import Queue
+from typing import Any
+
+from aiogram import Bot
+from aiogram import Dispatcher
+from aiohttp import web
+
+from handlers.common import router as common_router
+from handlers.operator import router as operator_router
+from handlers.practice import router as practice_router
+from handlers.support import router as support_router
+from main import BotApp
+from main import build_app
+from main import build_bot
+from storage.db import Database
+from utils.config import Settings
+from utils.config import load_settings
+from utils.logging_config import setup_logging
+from utils.text_norm import configure_stemmer
+
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT_S = 30
+# Seconds between worker liveness checks.
+MONITOR_INTERVAL_S = 5.0
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Queue item: (user key, raw update dict); None asks the worker to stop.
+ShardItem = tuple[int, dict[str, Any]] | None
+
+
+def shard_key(update: dict[str, Any]) -> int:
+    """
+    User id of the update's sender (chat id, then update_id as fallbacks).
+    """
+    for value in update.values():
+        if not isinstance(value, dict):
+            continue
+        for field in ("from", "user"):
+            user = value.get(field)
+            if isinstance(user, dict) and "id" in user:
+                return int(user["id"])
+        chat = value.get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return int(chat["id"])
+    return int(update.get("update_id", 0))
+
+
+# --- worker process ---------------------------------------------------------
+
+
+def _worker_process(index: int, updates: Queue) -> None:
+    # Ctrl+C reaches the whole process group; the supervisor decides when
+    # workers stop (a None item), so they finish what they were given.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_run_worker(index, updates))
+
+
+async def _run_worker(index: int, updates: Queue) -> None:
+    settings = load_settings()
+    # Broadcasts run where the operator's updates land, so /broadcast
+    # commands and the resumed job share one Broadcaster.
+    broadcasting = settings.operator_id % settings.bot_workers == index
+    # Telegram's per-bot limit is shared: OUTBOUND_BROADCAST_SHARE of it goes
+    # to broadcasts, the rest is split between the workers.
+    global_rate = settings.outbound_global_rate
+    share = settings.outbound_broadcast_share if settings.bot_workers > 1 else 0.0
+    settings = replace(
+        settings,
+        outbound_global_rate=global_rate * (1 - share) / settings.bot_workers,
+    )
+    setup_logging(log_level=settings.log_level)
+    configure_stemmer(
+        name=settings.text_stemmer,
+        cache_size=settings.text_stemmer_cache_size,
+    )
+
+    app = await build_app(
+        settings,
+        shared_db=True,
+        broadcast_rate=global_rate * share if broadcasting and share > 0 else None,
+    )
+    # Lets /stats say whose in-process counters it shows.
+    app.dp["worker_index"] = index
+    await app.dp.emit_startup(bot=app.bot)
+    if broadcasting:
+        await app.broadcaster.resume(bot=app.bot)
+    logger.info("Worker %d started.", index)
+
+    loop = asyncio.get_running_loop()
+    # Last pending update task per user: the next one waits for it.
+    tails: dict[int, asyncio.Task[None]] = {}
+    try:
+        while True:
+            item: ShardItem = await loop.run_in_executor(None, updates.get)
+            if item is None:
+                break
+            key, update = item
+            task = asyncio.create_task(_feed(app, update, after=tails.get(key)))
+            tails[key] = task
+            task.add_done_callback(
+                lambda done, key=key: tails.pop(key, None) if tails.get(key) is done else None
+            )
+        if tails:
+            await asyncio.wait(tails.values())
+    finally:
+        await app.dp.emit_shutdown(bot=app.bot)
+        await app.close()
+        logger.info("Worker %d stopped.", index)
+
+
+async def _feed(
+    app: BotApp,
+    update: dict[str, Any],
+    *,
+    after: asyncio.Task[None] | None,
+) -> None:
+    if after is not None:
+        await asyncio.wait((after,))
+    try:
+        await app.dp.feed_raw_update(app.bot, update)
+    except Exception:
+        logger.exception("Failed to handle update %s", update.get("update_id"))
+
+
+# --- supervisor -------------------------------------------------------------
+
+
+class Supervisor:
+    def __init__(self, *, settings: Settings, workers: int) -> None:
+        self._settings = settings
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues: list[Queue] = [self._ctx.Queue() for _ in range(workers)]
+        self._procs: list[SpawnProcess | None] = [None] * workers
+        self._stopping = False
+
+    def start(self) -> None:
+        for index in range(len(self._queues)):
+            self._spawn(index)
+
+    def _spawn(self, index: int) -> None:
+        proc = self._ctx.Process(
+            target=_worker_process,
+            args=(index, self._queues[index]),
+            name=f"bot-worker-{index}",
+        )
+        proc.start()
+        self._procs[index] = proc
+
+    def dispatch(self, update: dict[str, Any]) -> None:
+        key = shard_key(update)
+        self._queues[key % len(self._queues)].put((key, update))
+
+    async def monitor(self) -> None:
+        """
+        Restart workers that died; their queue (and backlog) is kept.
+        """
+        while not self._stopping:
+            await asyncio.sleep(MONITOR_INTERVAL_S)
+            for index, proc in enumerate(self._procs):
+                if proc is not None and not proc.is_alive() and not self._stopping:
+                    logger.error(
+                        "Worker %d exited with code %s, restarting",
+                        index,
+                        proc.exitcode,
+                    )
+                    self._spawn(index)
+
+    async def stop(self) -> None:
+        """
+        Let workers finish their queues, then wait for them to exit.
+        """
+        self._stopping = True
+        for queue in self._queues:
+            queue.put(None)
+        # Workers drain their job runners for up to this long, plus startup
+        # of a worker that is still booting.
+        timeout = self._settings.job_drain_timeout_seconds + 30
+        loop = asyncio.get_running_loop()
+        for proc in self._procs:
+            if proc is None:
+                continue
+            await loop.run_in_executor(None, proc.join, timeout)
+            if proc.is_alive():
+                logger.warning("Worker %s did not stop in time, terminating", proc.name)
+                proc.terminate()
+
+
+async def _receive_polling(supervisor: Supervisor, bot: Bot, allowed: list[str]) -> None:
+    offset: int | None = None
+    backoff = 1.0
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset,
+                    timeout=POLL_TIMEOUT_S,
+                    allowed_updates=allowed,
+                    request_timeout=POLL_TIMEOUT_S + 10,
+                )
+            except Exception as exc:
+                # Like Dispatcher.start_polling: log, back off, keep polling.
+                logger.warning(
+                    "getUpdates failed (%s: %s); retry in %.0f s",
+                    type(exc).__name__,
+                    exc,
+                    backoff,
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+            backoff = 1.0
+            for update in updates:
+                supervisor.dispatch(
+                    update.model_dump(mode="json", by_alias=True, exclude_none=True)
+                )
+                offset = update.update_id + 1
+    finally:
+        if offset is not None:
+            # Confirm what was dispatched, so a restart does not repeat it.
+            with suppress(Exception):
+                await bot.get_updates(offset=offset, timeout=0, limit=1)
+
+
+async def _serve_webhook(
+    supervisor: Supervisor,
+    bot: Bot,
+    allowed: list[str],
+    settings: Settings,
+) -> web.AppRunner:
+    secret = settings.webhook_secret.encode()
+
+    async def handle(request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "").encode()
+        if not hmac.compare_digest(token, secret):
+            return web.Response(status=401)
+        supervisor.dispatch(await request.json())
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(settings.webhook_path, handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=settings.webhook_host, port=settings.webhook_port).start()
+
+    if settings.webhook_base_url:
+        await bot.set_webhook(
+            url=settings.webhook_base_url.rstrip("/") + settings.webhook_path,
+            secret_token=settings.webhook_secret,
+            allowed_updates=allowed,
+        )
+    return runner
+
+
+def _used_update_types() -> list[str]:
+    dp = Dispatcher()
+    dp.include_routers(common_router, practice_router, support_router, operator_router)
+    return dp.resolve_used_update_types()
+
+
+async def supervise() -> None:
+    settings = load_settings()
+    setup_logging(log_level=settings.log_level)
+
+    # Migrations run once here, before workers open the database.
+    db = Database(db_path=settings.db_path, wal=True)
+    await db.init()
+    await db.close()
+
+    supervisor = Supervisor(settings=settings, workers=settings.bot_workers)
+    supervisor.start()
+    bot = build_bot(settings)
+    allowed = _used_update_types()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    monitor = asyncio.create_task(supervisor.monitor())
+    receiver: asyncio.Task[None] | None = None
+    webhook: web.AppRunner | None = None
+    try:
+        if settings.bot_mode == "webhook":
+            webhook = await _serve_webhook(supervisor, bot, allowed, settings)
+        else:
+            receiver = asyncio.create_task(_receive_polling(supervisor, bot, allowed))
+        logger.info(
+            "Supervisor started (%s, %d workers).",
+            settings.bot_mode,
+            settings.bot_workers,
+        )
+        await stop.wait()
+        logger.info("Stop signal received. Stopping workers...")
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        logger.info("Stop signal received. Stopping workers...")
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+        if webhook is not None:
+            await webhook.cleanup()
+        monitor.cancel()
+        await supervisor.stop()
+        await bot.session.close()
+        logger.info("Supervisor stopped.")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(supervise())
+    except KeyboardInterrupt:
+        pass
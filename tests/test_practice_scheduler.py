@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+
+from services.practice_scheduler import FIRST_INTERVAL_S
+from services.practice_scheduler import RETRY_INTERVAL_S
+from services.practice_scheduler import PracticeScheduler
+from services.practice_service import PracticeCatalog
+from services.practice_service import PracticePhrase
+
+
+USER_ID = 1
+NOW = 1_000_000
+
+
+class _MemoryRepos:
+    """
+    The slice of Repositories the scheduler uses, kept in memory.
+    """
+
+    def __init__(self) -> None:
+        self.next_pos = 0
+        self.cards: dict[str, tuple[int, int, float, int]] = {}
+
+    async def get_practice_schedule(self, *, user_id: int):  # type: ignore[no-untyped-def]
+        rows = [(pid, *card) for pid, card in self.cards.items()]
+        return self.next_pos, rows
+
+    async def save_practice_cursor(self, *, user_id: int, next_pos: int) -> None:
+        self.next_pos = next_pos
+
+    async def save_practice_card(
+        self,
+        *,
+        user_id: int,
+        phrase_id: str,
+        due_at: int,
+        interval_s: int,
+        ease: float,
+        reps: int,
+    ) -> None:
+        self.cards[phrase_id] = (due_at, interval_s, ease, reps)
+
+
+def _catalog(*phrase_ids: str) -> PracticeCatalog:
+    phrases = tuple(
+        PracticePhrase(phrase_id=pid, file_path="", expected_text=pid, keywords=())
+        for pid in phrase_ids
+    )
+    return PracticeCatalog(
+        phrases=phrases,
+        source_hash="",
+        _positions={p.phrase_id: i for i, p in enumerate(phrases)},
+    )
+
+
+def _scheduler() -> tuple[PracticeScheduler, _MemoryRepos]:
+    repos = _MemoryRepos()
+    return PracticeScheduler(repos=repos), repos  # type: ignore[arg-type]
+
+
+def test_next_after_good_answer_keeps_interval() -> None:
+    async def scenario() -> None:
+        scheduler, repos = _scheduler()
+        catalog = _catalog("a", "b")
+
+        phrase = await scheduler.next_phrase(user_id=USER_ID, catalog=catalog, now=NOW)
+        assert phrase.phrase_id == "a"
+        await scheduler.record_result(user_id=USER_ID, phrase_id="a", score=1.0, now=NOW)
+        await scheduler.postpone(user_id=USER_ID, phrase_id="a", now=NOW)
+
+        assert repos.cards["a"][0] == NOW + FIRST_INTERVAL_S
+        phrase = await scheduler.next_phrase(
+            user_id=USER_ID,
+            catalog=catalog,
+            now=NOW + RETRY_INTERVAL_S,
+        )
+        assert phrase.phrase_id == "b"
+
+    asyncio.run(scenario())
+
+
+def test_next_without_answer_retries_soon() -> None:
+    async def scenario() -> None:
+        scheduler, repos = _scheduler()
+        catalog = _catalog("a", "b")
+
+        await scheduler.next_phrase(user_id=USER_ID, catalog=catalog, now=NOW)
+        await scheduler.postpone(user_id=USER_ID, phrase_id="a", now=NOW)
+
+        assert repos.cards["a"][0] == NOW + RETRY_INTERVAL_S
+        phrase = await scheduler.next_phrase(
+            user_id=USER_ID,
+            catalog=catalog,
+            now=NOW + RETRY_INTERVAL_S,
+        )
+        assert phrase.phrase_id == "a"
+
+    asyncio.run(scenario())
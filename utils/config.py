@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import re
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Final
@@ -9,9 +10,48 @@ from typing import Final
 DEFAULT_DB_PATH: Final[str] = "data/speaksMart.sqlite3"
 DEFAULT_FAQ_PATH: Final[str] = "data/faq.json"
 DEFAULT_PRACTICE_SETS_PATH: Final[str] = "assets/practice_sets.json"
+DEFAULT_PRACTICE_SHARD_CACHE_SIZE: Final[int] = 16
+DEFAULT_PRACTICE_SCHEDULER_CACHE_USERS: Final[int] = 10_000
+DEFAULT_PRACTICE_SCORER: Final[str] = "fuzzy"
+DEFAULT_PRACTICE_ARCHIVE_MAX_MB: Final[int] = 1024
 DEFAULT_SPEECH_PROVIDER: Final[str] = "whisper"
 DEFAULT_WHISPER_MODEL: Final[str] = "base"
 DEFAULT_LOG_LEVEL: Final[str] = "INFO"
+DEFAULT_FAQ_RANKER: Final[str] = "keyword"
+DEFAULT_FAQ_SEMANTIC_MODEL: Final[str] = (
+    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+)
+DEFAULT_FAQ_SEMANTIC_MIN_SIMILARITY: Final[float] = 0.6
+DEFAULT_FAQ_ANSWER_CACHE_SIZE: Final[int] = 1024
+DEFAULT_TEXT_STEMMER: Final[str] = "snowball"
+DEFAULT_TEXT_STEMMER_CACHE_SIZE: Final[int] = 50_000
+DEFAULT_FSM_CACHE_SIZE: Final[int] = 10_000
+DEFAULT_FSM_IDLE_TTL_SECONDS: Final[int] = 1800
+DEFAULT_FSM_FLUSH_INTERVAL_SECONDS: Final[int] = 2
+DEFAULT_JOB_WORKERS: Final[int] = 2
+DEFAULT_JOB_MAX_ATTEMPTS: Final[int] = 3
+DEFAULT_JOB_DRAIN_TIMEOUT_SECONDS: Final[float] = 30.0
+DEFAULT_BOT_MODE: Final[str] = "polling"
+DEFAULT_WEBHOOK_HOST: Final[str] = "0.0.0.0"
+DEFAULT_WEBHOOK_PORT: Final[int] = 8080
+DEFAULT_WEBHOOK_PATH: Final[str] = "/telegram/webhook"
+DEFAULT_BOT_WORKERS: Final[int] = 2
+# Telegram flood limits: ~30 messages/s per bot, ~1/s per chat, 20/min per group.
+DEFAULT_OUTBOUND_GLOBAL_RATE: Final[float] = 30.0
+DEFAULT_OUTBOUND_CHAT_RATE: Final[float] = 1.0
+DEFAULT_OUTBOUND_GROUP_RATE_PER_MIN: Final[float] = 20.0
+DEFAULT_OUTBOUND_MAX_RETRIES: Final[int] = 3
+# Under supervisor.py: part of the global rate kept for the broadcasting worker.
+DEFAULT_OUTBOUND_BROADCAST_SHARE: Final[float] = 0.5
+DEFAULT_BROADCAST_CONCURRENCY: Final[int] = 20
+DEFAULT_BROADCAST_PAGE_SIZE: Final[int] = 100
+DEFAULT_OVERLOAD_QUEUE_DEPTH: Final[int] = 10
+DEFAULT_OVERLOAD_LATENCY_MS: Final[int] = 10_000
+DEFAULT_OVERLOAD_WHISPER_MODEL: Final[str] = "tiny"
+DEFAULT_OVERLOAD_MAX_VOICE_SECONDS: Final[int] = 10
+
+# Telegram's rule for secret_token in setWebhook.
+_WEBHOOK_SECRET_RE = re.compile(r"[A-Za-z0-9_-]{1,256}")
 
 
 def _parse_int(value: str, *, var_name: str) -> int:
@@ -21,6 +61,20 @@ def _parse_int(value: str, *, var_name: str) -> int:
     return int(value)
 
 
+def _env_int(var_name: str, default: int) -> int:
+    raw = os.environ.get(var_name, "").strip()
+    if not raw:
+        return default
+    return _parse_int(raw, var_name=var_name)
+
+
+def _env_float(var_name: str, default: float) -> float:
+    raw = os.environ.get(var_name, "").strip()
+    if not raw:
+        return default
+    return float(raw)
+
+
 def _load_dotenv(path: Path) -> None:
     """
     Minimal .env loader.
@@ -53,11 +107,49 @@ class Settings:
     operator_id: int
     db_path: str
     faq_path: str
+    faq_ranker: str
+    faq_compiled_path: str
+    faq_semantic_index: str
+    faq_semantic_model: str
+    faq_semantic_min_similarity: float
+    faq_answer_cache_size: int
     practice_sets_path: str
+    practice_shard_cache_size: int
+    practice_scheduler_cache_users: int
+    practice_scorer: str
+    practice_archive_dir: str
+    practice_archive_max_mb: int
     speech_provider: str
     whisper_model: str
     ffmpeg_path: str
     log_level: str
+    text_stemmer: str
+    text_stemmer_cache_size: int
+    fsm_cache_size: int
+    fsm_idle_ttl_seconds: int
+    fsm_flush_interval_seconds: int
+    job_workers: int
+    job_max_attempts: int
+    job_drain_timeout_seconds: float
+    bot_mode: str
+    webhook_base_url: str
+    webhook_host: str
+    webhook_port: int
+    webhook_path: str
+    webhook_secret: str
+    telegram_api_base: str
+    bot_workers: int
+    outbound_global_rate: float
+    outbound_chat_rate: float
+    outbound_group_rate_per_min: float
+    outbound_max_retries: int
+    outbound_broadcast_share: float
+    broadcast_concurrency: int
+    broadcast_page_size: int
+    overload_queue_depth: int
+    overload_latency_ms: int
+    overload_whisper_model: str
+    overload_max_voice_seconds: int
 
 
 def load_settings(*, dotenv_path: str = ".env") -> Settings:
@@ -76,15 +168,59 @@ def load_settings(*, dotenv_path: str = ".env") -> Settings:
     if not ffmpeg_path:
         raise ValueError("FFMPEG_PATH is required (explicit path on Windows)")
 
+    bot_mode = os.environ.get("BOT_MODE", DEFAULT_BOT_MODE).strip().lower()
+    if bot_mode not in ("polling", "webhook"):
+        raise ValueError("BOT_MODE must be polling or webhook")
+    webhook_secret = os.environ.get("WEBHOOK_SECRET", "").strip()
+    if bot_mode == "webhook" and not webhook_secret:
+        raise ValueError("WEBHOOK_SECRET is required in webhook mode")
+    if webhook_secret and not _WEBHOOK_SECRET_RE.fullmatch(webhook_secret):
+        raise ValueError("WEBHOOK_SECRET may contain only A-Z, a-z, 0-9, _ and -")
+    webhook_path = os.environ.get("WEBHOOK_PATH", DEFAULT_WEBHOOK_PATH).strip()
+    if not webhook_path.startswith("/"):
+        webhook_path = "/" + webhook_path
+
     return Settings(
         bot_token=bot_token,
         operator_id=operator_id,
         db_path=os.environ.get("DB_PATH", DEFAULT_DB_PATH).strip(),
         faq_path=os.environ.get("FAQ_PATH", DEFAULT_FAQ_PATH).strip(),
+        faq_ranker=os.environ.get("FAQ_RANKER", DEFAULT_FAQ_RANKER).strip(),
+        faq_compiled_path=os.environ.get("FAQ_COMPILED_PATH", "").strip(),
+        faq_semantic_index=os.environ.get("FAQ_SEMANTIC_INDEX", "").strip(),
+        faq_semantic_model=os.environ.get(
+            "FAQ_SEMANTIC_MODEL",
+            DEFAULT_FAQ_SEMANTIC_MODEL,
+        ).strip(),
+        faq_semantic_min_similarity=_env_float(
+            "FAQ_SEMANTIC_MIN_SIMILARITY",
+            DEFAULT_FAQ_SEMANTIC_MIN_SIMILARITY,
+        ),
+        faq_answer_cache_size=_env_int(
+            "FAQ_ANSWER_CACHE_SIZE",
+            DEFAULT_FAQ_ANSWER_CACHE_SIZE,
+        ),
         practice_sets_path=os.environ.get(
             "PRACTICE_SETS_PATH",
             DEFAULT_PRACTICE_SETS_PATH,
         ).strip(),
+        practice_shard_cache_size=_env_int(
+            "PRACTICE_SHARD_CACHE_SIZE",
+            DEFAULT_PRACTICE_SHARD_CACHE_SIZE,
+        ),
+        practice_scheduler_cache_users=_env_int(
+            "PRACTICE_SCHEDULER_CACHE_USERS",
+            DEFAULT_PRACTICE_SCHEDULER_CACHE_USERS,
+        ),
+        practice_scorer=os.environ.get(
+            "PRACTICE_SCORER",
+            DEFAULT_PRACTICE_SCORER,
+        ).strip().lower(),
+        practice_archive_dir=os.environ.get("PRACTICE_ARCHIVE_DIR", "").strip(),
+        practice_archive_max_mb=_env_int(
+            "PRACTICE_ARCHIVE_MAX_MB",
+            DEFAULT_PRACTICE_ARCHIVE_MAX_MB,
+        ),
         speech_provider=os.environ.get(
             "SPEECH_PROVIDER",
             DEFAULT_SPEECH_PROVIDER,
@@ -95,5 +231,63 @@ def load_settings(*, dotenv_path: str = ".env") -> Settings:
         ).strip(),
         ffmpeg_path=ffmpeg_path,
         log_level=os.environ.get("LOG_LEVEL", DEFAULT_LOG_LEVEL).strip(),
+        text_stemmer=os.environ.get("TEXT_STEMMER", DEFAULT_TEXT_STEMMER).strip(),
+        text_stemmer_cache_size=_env_int(
+            "TEXT_STEMMER_CACHE_SIZE",
+            DEFAULT_TEXT_STEMMER_CACHE_SIZE,
+        ),
+        fsm_cache_size=_env_int("FSM_CACHE_SIZE", DEFAULT_FSM_CACHE_SIZE),
+        fsm_idle_ttl_seconds=_env_int(
+            "FSM_IDLE_TTL_SECONDS",
+            DEFAULT_FSM_IDLE_TTL_SECONDS,
+        ),
+        fsm_flush_interval_seconds=_env_int(
+            "FSM_FLUSH_INTERVAL_SECONDS",
+            DEFAULT_FSM_FLUSH_INTERVAL_SECONDS,
+        ),
+        job_workers=_env_int("JOB_WORKERS", DEFAULT_JOB_WORKERS),
+        job_max_attempts=_env_int("JOB_MAX_ATTEMPTS", DEFAULT_JOB_MAX_ATTEMPTS),
+        job_drain_timeout_seconds=_env_float(
+            "JOB_DRAIN_TIMEOUT_SECONDS",
+            DEFAULT_JOB_DRAIN_TIMEOUT_SECONDS,
+        ),
+        bot_mode=bot_mode,
+        webhook_base_url=os.environ.get("WEBHOOK_BASE_URL", "").strip(),
+        webhook_host=os.environ.get("WEBHOOK_HOST", DEFAULT_WEBHOOK_HOST).strip(),
+        webhook_port=_env_int("WEBHOOK_PORT", DEFAULT_WEBHOOK_PORT),
+        webhook_path=webhook_path,
+        webhook_secret=webhook_secret,
+        telegram_api_base=os.environ.get("TELEGRAM_API_BASE", "").strip(),
+        bot_workers=max(1, _env_int("BOT_WORKERS", DEFAULT_BOT_WORKERS)),
+        outbound_global_rate=_env_float(
+            "OUTBOUND_GLOBAL_RATE",
+            DEFAULT_OUTBOUND_GLOBAL_RATE,
+        ),
+        outbound_chat_rate=_env_float("OUTBOUND_CHAT_RATE", DEFAULT_OUTBOUND_CHAT_RATE),
+        outbound_group_rate_per_min=_env_float(
+            "OUTBOUND_GROUP_RATE_PER_MIN",
+            DEFAULT_OUTBOUND_GROUP_RATE_PER_MIN,
+        ),
+        outbound_max_retries=_env_int("OUTBOUND_MAX_RETRIES", DEFAULT_OUTBOUND_MAX_RETRIES),
+        # Below 1: the other workers need some of the rate for replies.
+        outbound_broadcast_share=min(
+            max(
+                _env_float("OUTBOUND_BROADCAST_SHARE", DEFAULT_OUTBOUND_BROADCAST_SHARE),
+                0.0,
+            ),
+            0.9,
+        ),
+        broadcast_concurrency=_env_int("BROADCAST_CONCURRENCY", DEFAULT_BROADCAST_CONCURRENCY),
+        broadcast_page_size=_env_int("BROADCAST_PAGE_SIZE", DEFAULT_BROADCAST_PAGE_SIZE),
+        overload_queue_depth=_env_int("OVERLOAD_QUEUE_DEPTH", DEFAULT_OVERLOAD_QUEUE_DEPTH),
+        overload_latency_ms=_env_int("OVERLOAD_LATENCY_MS", DEFAULT_OVERLOAD_LATENCY_MS),
+        overload_whisper_model=os.environ.get(
+            "OVERLOAD_WHISPER_MODEL",
+            DEFAULT_OVERLOAD_WHISPER_MODEL,
+        ).strip(),
+        overload_max_voice_seconds=_env_int(
+            "OVERLOAD_MAX_VOICE_SECONDS",
+            DEFAULT_OVERLOAD_MAX_VOICE_SECONDS,
+        ),
     )
 
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Hashable
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Generic
+from typing import TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) a watched file is stat()-ed for changes.
+RELOAD_CHECK_INTERVAL = 1.0
+
+T = TypeVar("T")
+
+
+# (mtime_ns, size) of the watched file, then of each `also` path (None if missing).
+_Stamp = tuple[tuple[int, int] | None, ...]
+
+
+@dataclass(slots=True)
+class _Cached(Generic[T]):
+    value: T
+    stamp: _Stamp
+    checked_at: float
+
+
+def _stat_or_none(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileReloader(Generic[T]):
+    """
+    Values loaded from files, reloaded when the file changes.
+
+    `get` stats the file at most once per RELOAD_CHECK_INTERVAL and calls
+    `load` when its mtime or size changed. Files the value is also built
+    from (`also`) are watched the same way but may be missing. A reloaded value with the same
+    `source_hash` as the cached one is dropped in favour of the old one, so
+    state built on it (rankers, parsed shards) survives a touch. If `load`
+    raises `error`, the previous value keeps serving until the file changes
+    again; with nothing cached yet the error propagates.
+    """
+
+    def __init__(
+        self,
+        *,
+        label: str,
+        error: type[Exception],
+        source_hash: Callable[[T], str] | None = None,
+        describe: Callable[[T], str] | None = None,
+    ) -> None:
+        self._label = label
+        self._error = error
+        self._source_hash = source_hash
+        self._describe = describe
+        self._cache: dict[Hashable, _Cached[T]] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: Hashable,
+        path: Path,
+        load: Callable[[], T],
+        *,
+        also: Sequence[Path] = (),
+    ) -> T:
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and now - cached.checked_at < RELOAD_CHECK_INTERVAL:
+            return cached.value
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and now - cached.checked_at < RELOAD_CHECK_INTERVAL:
+                return cached.value
+
+            main = _stat_or_none(path)
+            if main is None:
+                if cached is not None:
+                    logger.warning("%s file disappeared, keeping old: %s", self._label, path)
+                    cached.checked_at = now
+                    return cached.value
+                raise self._error(f"{self._label} file not found: {path}")
+
+            stamp: _Stamp = (main, *(_stat_or_none(p) for p in also))
+            if cached is not None and cached.stamp == stamp:
+                cached.checked_at = now
+                return cached.value
+
+            try:
+                value = load()
+            except self._error:
+                if cached is None:
+                    raise
+                logger.exception("Failed to reload %s, keeping old: %s", self._label, path)
+                # Do not retry until the file changes again.
+                cached.stamp = stamp
+                cached.checked_at = now
+                return cached.value
+
+            if (
+                cached is not None
+                and self._source_hash is not None
+                and self._source_hash(cached.value) == self._source_hash(value)
+            ):
+                value = cached.value
+            else:
+                details = f" ({self._describe(value)})" if self._describe is not None else ""
+                logger.info("%s loaded: %s%s", self._label, path, details)
+
+            self._cache[key] = _Cached(value=value, stamp=stamp, checked_at=now)
+            return value
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+import re
+from functools import lru_cache
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+_CYRILLIC_RE = re.compile(r"[а-яё]")
+
+
+class Stemmer:
+    """
+    Maps a lowercase token to its normal form (stem or lemma).
+    """
+
+    def stem(self, token: str) -> str:
+        raise NotImplementedError
+
+
+class NoopStemmer(Stemmer):
+    def stem(self, token: str) -> str:
+        return token
+
+
+class SnowballStemmer(Stemmer):
+    """
+    Snowball stemmers for Russian and English, picked by the token's script.
+    """
+
+    def __init__(self) -> None:
+        import snowballstemmer  # type: ignore
+
+        self._russian = snowballstemmer.stemmer("russian")
+        self._english = snowballstemmer.stemmer("english")
+
+    def stem(self, token: str) -> str:
+        if _CYRILLIC_RE.search(token):
+            return self._russian.stemWord(token)
+        return self._english.stemWord(token)
+
+
+class PymorphyStemmer(Stemmer):
+    """
+    Dictionary lemmatizer for Russian (pymorphy3); English tokens go through
+    Snowball when it is installed.
+    """
+
+    def __init__(self) -> None:
+        import pymorphy3  # type: ignore
+
+        self._morph = pymorphy3.MorphAnalyzer()
+        try:
+            self._english: Stemmer = SnowballStemmer()
+        except Exception:
+            self._english = NoopStemmer()
+
+    def stem(self, token: str) -> str:
+        if _CYRILLIC_RE.search(token):
+            return str(self._morph.parse(token)[0].normal_form)
+        return self._english.stem(token)
+
+
+class CachedStemmer(Stemmer):
+    """
+    Bounded per-token memo in front of a (slow) stemmer.
+
+    Chat vocabulary is small and repetitive, so almost every call after
+    warm-up is a dictionary hit.
+    """
+
+    def __init__(self, inner: Stemmer, *, maxsize: int) -> None:
+        self.inner = inner
+        self._stem: Callable[[str], str] = lru_cache(maxsize=maxsize)(inner.stem)
+
+    def stem(self, token: str) -> str:
+        return self._stem(token)
+
+    def cache_info(self):  # type: ignore[no-untyped-def]
+        return self._stem.cache_info()  # type: ignore[attr-defined]
+
+
+def build_stemmer(*, name: str, cache_size: int) -> Stemmer:
+    name = name.strip().lower()
+
+    inner: Stemmer
+    if name in ("", "none"):
+        return NoopStemmer()
+    if name == "snowball":
+        try:
+            inner = SnowballStemmer()
+        except Exception:
+            logger.exception(
+                "Snowball stemmer unavailable (pip install snowballstemmer); "
+                "stemming disabled"
+            )
+            return NoopStemmer()
+    elif name == "pymorphy":
+        try:
+            inner = PymorphyStemmer()
+        except Exception:
+            logger.exception(
+                "pymorphy3 unavailable (pip install pymorphy3); stemming disabled"
+            )
+            return NoopStemmer()
+    else:
+        logger.warning("Unsupported stemmer %r; stemming disabled", name)
+        return NoopStemmer()
+
+    return CachedStemmer(inner, maxsize=cache_size)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from collections.abc import Mapping
+
+
+def max_typos(word: str) -> int:
+    """
+    How many edits a token of this length may be corrected by.
+
+    Short tokens are never corrected: "не"/"на" or "is"/"it" are different
+    words, not typos.
+    """
+    if len(word) < 4:
+        return 0
+    if len(word) < 8:
+        return 1
+    return 2
+
+
+def delete_variants(word: str, distance: int) -> set[str]:
+    """
+    All strings obtained from `word` by deleting 1..`distance` characters.
+    """
+    result: set[str] = set()
+    frontier = {word}
+    for _ in range(distance):
+        next_frontier: set[str] = set()
+        for w in frontier:
+            for i in range(len(w)):
+                next_frontier.add(w[:i] + w[i + 1 :])
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein + adjacent transpositions).
+
+    Returns `max_distance + 1` as soon as the distance is known to exceed
+    `max_distance`.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if (
+                i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                value = min(value, prev_prev[j - 2] + 1)
+            cur[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+    return prev[-1]
+
+
+class SymSpellIndex:
+    """
+    Symmetric-delete spelling index (SymSpell).
+
+    Every vocabulary word is stored under all strings obtained by deleting up
+    to `max_typos(word)` characters. A query token generates its own deletes
+    and looks them up, so only a handful of candidates are verified with a
+    bounded edit distance. There is no scan over the vocabulary per query.
+
+    The delete map is built on the first `correct` call that needs it.
+    Subclasses serving a prebuilt map override `_count` and
+    `_words_for_delete`.
+    """
+
+    def __init__(self, vocabulary: Mapping[str, int] | Iterable[str]) -> None:
+        if isinstance(vocabulary, Mapping):
+            self._frequency = {w: int(c) for w, c in vocabulary.items() if w}
+        else:
+            self._frequency = {w: 1 for w in vocabulary if w}
+        self._deletes: dict[str, tuple[str, ...]] | None = None
+
+    def _delete_map(self) -> dict[str, tuple[str, ...]]:
+        if self._deletes is None:
+            deletes: dict[str, list[str]] = {}
+            for word in self._frequency:
+                for variant in delete_variants(word, max_typos(word)):
+                    deletes.setdefault(variant, []).append(word)
+            self._deletes = {k: tuple(v) for k, v in deletes.items()}
+        return self._deletes
+
+    def _count(self, word: str) -> int | None:
+        """
+        Frequency of a vocabulary word, None for unknown words.
+        """
+        return self._frequency.get(word)
+
+    def _words_for_delete(self, variant: str) -> Iterable[str]:
+        return self._delete_map().get(variant, ())
+
+    def __contains__(self, word: str) -> bool:
+        return self._count(word) is not None
+
+    def correct(self, token: str) -> str | None:
+        """
+        Return the closest vocabulary word within `max_typos(token)` edits.
+
+        Ties are broken by word frequency, then alphabetically. Returns None
+        if nothing is close enough.
+        """
+        if token in self:
+            return token
+
+        limit = max_typos(token)
+        if limit == 0:
+            return None
+
+        candidates: set[str] = set()
+        for variant in delete_variants(token, limit) | {token}:
+            candidates.update(self._words_for_delete(variant))
+            if variant in self:
+                candidates.add(variant)
+
+        best: tuple[int, int, str] | None = None
+        for word in candidates:
+            distance = edit_distance(token, word, limit)
+            if distance > limit:
+                continue
+            key = (distance, -(self._count(word) or 0), word)
+            if best is None or key < best:
+                best = key
+        return None if best is None else best[2]
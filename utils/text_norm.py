@@ -3,6 +3,10 @@ from __future__ import annotations
 import re
 from dataclasses import dataclass
 
+from utils.morphology import NoopStemmer
+from utils.morphology import Stemmer
+from utils.morphology import build_stemmer
+
 
 # Latin + Cyrillic (incl. ё) + digits + apostrophe, for simple keyword matching.
 _TOKEN_RE = re.compile(r"[0-9a-zа-яё']+", flags=re.IGNORECASE)
@@ -25,3 +29,34 @@ def normalize_text(text: str) -> NormalizedText:
     tokens = [t.casefold() for t in _TOKEN_RE.findall(text)]
     return NormalizedText(text=text, tokens=tokens)
 
+
+_stemmer: Stemmer = NoopStemmer()
+_stemmer_name = "none"
+
+
+def configure_stemmer(*, name: str, cache_size: int = 50_000) -> None:
+    """
+    Select the process-wide stemmer used by `stem_token`/`stem_tokens`.
+
+    Call once at startup, before FAQ and practice data are loaded: their
+    keywords are stemmed at load time with whatever stemmer is active then.
+    """
+    global _stemmer, _stemmer_name
+    _stemmer = build_stemmer(name=name, cache_size=cache_size)
+    _stemmer_name = "none" if isinstance(_stemmer, NoopStemmer) else name.strip().lower()
+
+
+def stemmer_name() -> str:
+    """
+    Name of the stemmer actually in effect ("none" if it failed to load).
+    """
+    return _stemmer_name
+
+
+def stem_token(token: str) -> str:
+    return _stemmer.stem(token)
+
+
+def stem_tokens(tokens: list[str]) -> list[str]:
+    stem = _stemmer.stem
+    return [stem(t) for t in tokens]